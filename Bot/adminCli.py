@@ -0,0 +1,114 @@
+"""maintenance commands for the support team
+
+uses the same environment (MONGO_*, STORAGE_BACKEND) as the bot
+
+run from within ./Bot:
+    python adminCli.py export --guild 123 --format ics -o reminders.ics
+    python adminCli.py export --user 456 --format json
+    python adminCli.py import --guild 123 --channel 789 --user 456 calendar.ics
+"""
+import sys
+import time
+import argparse
+import logging
+
+from lib.Connector import Connector
+from lib.ReminderExport import ReminderExport
+from lib.ReminderImport import ReminderImport
+
+
+log = logging.getLogger('Remindme.AdminCli')
+
+
+def export(args):
+    if args.guild:
+        # the support exports all reminders of the guild, no permission check
+        scope = Connector.Scope(is_private=False, guild_id=args.guild, user_id=args.user)
+        all_users = not args.user
+    else:
+        scope = Connector.Scope(is_private=True, user_id=args.user)
+        all_users = False
+
+    instance_id = args.guild or args.user
+    tz_str = Connector.get_timezone(instance_id)
+    legacy = Connector.is_legacy_interval(instance_id)
+
+    reminders = Connector.iter_reminders(scope, all_users=all_users, batch_size=args.batch_size)
+    start = time.perf_counter()
+
+    if args.output == '-':
+        cnt = ReminderExport.write(sys.stdout.buffer, reminders, args.format, tz_str=tz_str, legacy=legacy)
+        sys.stdout.flush()
+    else:
+        with open(args.output, 'wb') as fp:
+            cnt = ReminderExport.write(fp, reminders, args.format, tz_str=tz_str, legacy=legacy)
+
+    log.info(f'exported {cnt} reminders of {instance_id} in {time.perf_counter()-start:.2f}s')
+
+
+def import_(args):
+    instance_id = args.guild or args.user
+
+    importer = ReminderImport(
+        g_id=args.guild,
+        ch_id=args.channel,
+        ch_name=args.channel_name if args.guild else 'DM',
+        author=args.user,
+        tz_str=Connector.get_timezone(instance_id),
+        legacy=Connector.is_legacy_interval(instance_id),
+        keep_targets=args.keep_targets
+    )
+
+    with open(args.file, 'rb') as fp:
+        importer.parse(fp, args.format)
+
+    if not args.dry_run:
+        importer.commit()
+
+    print(importer.get_report())
+    return 1 if importer.errors else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='maintenance commands of the remindme bot')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = commands.add_parser('export', help='stream the reminders of a guild or user into a file')
+    export_parser.add_argument('--guild', type=int, help='guild id, all members unless --user is given')
+    export_parser.add_argument('--user', type=int, help='user id, the private reminders without --guild')
+    export_parser.add_argument('--format', choices=ReminderExport.FORMATS, default='json')
+    export_parser.add_argument('-o', '--output', default='-', help='file, - for stdout')
+    export_parser.add_argument('--batch-size', type=int, default=Connector.EXPORT_BATCH_SIZE, help='documents per round trip')
+    export_parser.set_defaults(func=export)
+
+    import_parser = commands.add_parser('import', help='create the reminders of a calendar or table, all entries are validated first')
+    import_parser.add_argument('file', help='.ics or .csv file, e.g. of an export')
+    import_parser.add_argument('--user', type=int, required=True, help='author and target of the reminders')
+    import_parser.add_argument('--guild', type=int, help='guild id, private reminders without')
+    import_parser.add_argument('--channel', type=int, help='delivery channel, required with --guild')
+    import_parser.add_argument('--channel-name', default='*Unresolved Channel*')
+    import_parser.add_argument('--format', choices=ReminderImport.FORMATS, help='defaults to the file extension')
+    import_parser.add_argument('--keep-targets', action='store_true', help='use channel, author and target of the csv rows, if present')
+    import_parser.add_argument('--dry-run', action='store_true', help='only validate, print the error report')
+    import_parser.set_defaults(func=import_)
+
+    args = parser.parse_args(argv)
+    if args.command == 'export' and not (args.guild or args.user):
+        parser.error('export requires --guild and/or --user')
+    elif args.command == 'import':
+        if bool(args.guild) != bool(args.channel):
+            parser.error('import requires --channel together with --guild')
+
+        args.format = args.format or args.file.rsplit('.', 1)[-1].lower()
+        if args.format not in ReminderImport.FORMATS:
+            parser.error('unknown file format, use --format')
+
+    # keep stdout free for the export
+    logging.basicConfig(stream=sys.stderr, level=logging.INFO)
+
+    Connector.init()
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,3 +1,4 @@
+import io
 import asyncio
 import re
 import logging
@@ -9,7 +10,6 @@ from dateutil import tz
 from bson import ObjectId
 
 import copy
-from pytz import common_timezones as pytz_common_timezones, country_timezones
 
 import discord
 from discord.ext import commands, tasks
@@ -21,6 +21,10 @@ from lib.CommunitySettings import CommunitySettings, CommunityAction
 import lib.input_parser
 import lib.permissions
 import lib.ReminderRepeater
+from lib.ReminderImport import ReminderImport
+from lib.InteractionTiming import InteractionTiming
+from lib.Clock import Clock
+from lib.Timezones import Timezones
 import util.interaction
 import util.reminderInteraction
 
@@ -105,11 +109,11 @@ class NewReminderView(util.interaction.CustomView):
         elif Connector.delete_reminder(self.reminder._id):
             eb_title = 'Deleted the reminder'
             color = Consts.col_warn
-            Analytics.reminder_deleted(Types.DeleteAction.DIRECT_BTN) 
+            Analytics.reminder_deleted(Types.DeleteAction.DIRECT_BTN, shard=Analytics.shard_of(self.reminder.g_id)) 
         elif Connector.delete_interval(self.reminder._id):
             eb_title = 'Deleted the reminder'
             color = Consts.col_warn
-            Analytics.interval_deleted(Types.DeleteAction.DIRECT_BTN) 
+            Analytics.interval_deleted(Types.DeleteAction.DIRECT_BTN, shard=Analytics.shard_of(self.reminder.g_id)) 
         else:
             eb_title = 'Failed to delete reminder due to an unknown issue'
             color = Consts.col_crit
@@ -150,6 +154,14 @@ class ReminderCreation(commands.Cog):
                   'You can contact us on Github or join the support server.'
 
 
+    # larger calendars are imported by the support (adminCli.py)
+    IMPORT_MAX_SIZE = 1024**2
+    IMPORT_MAX_ENTRIES = 500
+
+    # errors listed in the import report
+    IMPORT_REPORT_ERRORS = 20
+
+
     @staticmethod
     def to_int(num_str: str, base: int=10):
         
@@ -168,18 +180,13 @@ class ReminderCreation(commands.Cog):
 
     def __init__(self, client):
         self.client = client
-        
-        self.timezone_country = {}
-        for countrycode in country_timezones:
-            timezones = country_timezones[countrycode]
-            for timezone in timezones:
-                self.timezone_country[timezone] = countrycode
 
 
     async def process_reminder(self, ctx: discord.ApplicationContext, author: Union[discord.User, discord.Member], target, period, message, channel):
 
         if ctx.guild:
             instance_id = ctx.guild.id
+            shard = ctx.guild.shard_id
             # try and get the last message, for providing a jump link
             try:
                 last_msg = await ctx.channel.history(limit=1).flatten()
@@ -189,6 +196,7 @@ class ReminderCreation(commands.Cog):
             author_roles = ctx.author.roles
         else:
             instance_id = author.id
+            shard = 0 # DMs are received by shard 0
             last_msg = None
             author_roles = []
 
@@ -199,8 +207,9 @@ class ReminderCreation(commands.Cog):
         auto_del_action = Connector.get_auto_delete(instance_id)
         is_legacy = Connector.is_legacy_interval(instance_id)
 
-        utcnow = datetime.utcnow()
-        remind_at, info = lib.input_parser.parse(period, utcnow, tz_str)
+        utcnow = Clock.utcnow()
+        with InteractionTiming.phase('parse'):
+            remind_at, info = lib.input_parser.parse(period, utcnow, tz_str)
         rrule = None
 
         if isinstance(remind_at, datetime):
@@ -223,9 +232,9 @@ class ReminderCreation(commands.Cog):
                 await ctx.respond(embed=embed, ephemeral=True)
 
                 if interval == timedelta(hours=0):
-                    Analytics.reminder_creation_failed(Types.CreationFailed.INVALID_F_STR)
+                    Analytics.reminder_creation_failed(Types.CreationFailed.INVALID_F_STR, shard=shard)
                 else:
-                    Analytics.reminder_creation_failed(Types.CreationFailed.PAST_DATE)
+                    Analytics.reminder_creation_failed(Types.CreationFailed.PAST_DATE, shard=shard)
                 return  # error exit
 
         elif remind_at is None:
@@ -238,7 +247,7 @@ class ReminderCreation(commands.Cog):
             embed = discord.Embed(title='Failed to create the reminder', color=0xff0000, description=out_str)
             embed.set_footer(text=ReminderCreation.HELP_FOOTER)
             await ctx.respond(embed=embed, ephemeral=True)
-            Analytics.reminder_creation_failed(Types.CreationFailed.INVALID_F_STR)  
+            Analytics.reminder_creation_failed(Types.CreationFailed.INVALID_F_STR, shard=shard)  
             return  
 
         elif isinstance(remind_at, str):
@@ -246,9 +255,10 @@ class ReminderCreation(commands.Cog):
             if is_legacy:
                 dtstart = utcnow
             else:
-                dtstart = utcnow.replace(tzinfo=tz.UTC).astimezone(tz.gettz(tz_str)).replace(tzinfo=None)
+                dtstart = Timezones.to_local(utcnow, tz_str)
 
-            rrule, info = lib.input_parser.rrule_normalize(remind_at, dtstart=dtstart, instance_id=instance_id)
+            with InteractionTiming.phase('parse'):
+                rrule, info = lib.input_parser.rrule_normalize(remind_at, dtstart=dtstart, instance_id=instance_id)
             if not rrule:
                 if info != '':
                     out_str = f'```Parsing hints:\n{info}```\n'
@@ -260,7 +270,7 @@ class ReminderCreation(commands.Cog):
                 embed = discord.Embed(title='Failed to create the reminder', color=0xff0000, description=out_str)
                 embed.set_footer(text=ReminderCreation.HELP_FOOTER)
                 await ctx.respond(embed=embed, ephemeral=True)
-                Analytics.reminder_creation_failed(Types.CreationFailed.INVALID_F_STR)  
+                Analytics.reminder_creation_failed(Types.CreationFailed.INVALID_F_STR, shard=shard)  
                 return
             
             elif not lib.permissions.check_user_permission(instance_id, author_roles, required_perms=CommunityAction(repeating=True)):
@@ -346,11 +356,11 @@ class ReminderCreation(commands.Cog):
             if rem.at:
                 
                 rem._id = Connector.add_interval(rem)
-                Analytics.reminder_created(rem, country_code=self.timezone_country.get(tz_str, 'UNK'), direct_interval=True)
+                Analytics.reminder_created(rem, shard=shard, country_code=Timezones.country_of(tz_str), direct_interval=True)
         else:
             # the id is required in case the users wishes to abort
             rem._id = Connector.add_reminder(rem)
-            Analytics.reminder_created(rem, country_code=self.timezone_country.get(tz_str, 'UNK'))
+            Analytics.reminder_created(rem, shard=shard, country_code=Timezones.country_of(tz_str))
 
 
         if auto_del_action == Connector.AutoDelete.TIMEOUT:
@@ -443,7 +453,66 @@ class ReminderCreation(commands.Cog):
             channel = channel or ctx.channel # overwrite if not specified
 
         await self.process_reminder(ctx, ctx.author, ctx.author, time, message, channel=channel)
-        
+
+
+    @commands.slash_command(name='reminder_import', description='create many reminders from a calendar (.ics) or table (.csv)')
+    async def reminder_import(self, ctx:discord.ApplicationContext,
+                        file:discord.Option(discord.Attachment, 'calendar or table, e.g. from /reminder_export', required=True)):
+
+        fmt = file.filename.rsplit('.', 1)[-1].lower()
+        if fmt not in ReminderImport.FORMATS:
+            await ctx.respond('Only `.ics` and `.csv` files can be imported', ephemeral=True)
+            return
+        elif file.size > ReminderCreation.IMPORT_MAX_SIZE:
+            await ctx.respond(f'The file is too large, at most {ReminderCreation.IMPORT_MAX_SIZE//1024}KiB can be imported at once', ephemeral=True)
+            return
+
+        if ctx.guild:
+            instance_id = ctx.guild.id
+            err_eb = lib.permissions.get_missing_permissions_embed(ctx.guild.id, ctx.author.roles)
+            if err_eb:
+                await ctx.respond(embed=err_eb, ephemeral=True)
+                return
+
+            # the channel might not be fully loaded (sharding, permissions)
+            ch_name = getattr(ctx.channel, 'name', None)
+            ch_name = ch_name[0:25] if ch_name else '*Unresolved Channel*'
+            allow_repeating = lib.permissions.check_user_permission(instance_id, ctx.author.roles, required_perms=CommunityAction(repeating=True))
+        else:
+            instance_id = ctx.author.id
+            ch_name = 'DM'
+            allow_repeating = True
+
+        await ctx.defer(ephemeral=True)
+
+        # settings snapshot, shared by all entries
+        importer = ReminderImport(
+            g_id=ctx.guild.id if ctx.guild else None,
+            ch_id=ctx.channel_id if ctx.guild else None,
+            ch_name=ch_name,
+            author=ctx.author.id,
+            tz_str=Connector.get_timezone(instance_id),
+            legacy=Connector.is_legacy_interval(instance_id),
+            allow_repeating=allow_repeating,
+            max_entries=ReminderCreation.IMPORT_MAX_ENTRIES
+        )
+
+        data = await file.read()
+        await asyncio.to_thread(importer.parse, io.BytesIO(data), fmt)
+        await asyncio.to_thread(importer.commit)
+
+        if importer.inserted == 0:
+            color = Consts.col_err
+        elif importer.errors:
+            color = Consts.col_warn
+        else:
+            color = Consts.col_good
+
+        report = importer.get_report(max_errors=ReminderCreation.IMPORT_REPORT_ERRORS)
+        eb = discord.Embed(title='Reminder Import', color=color, description=f'```{report[:4000]}```')
+        eb.set_footer(text='Call `/reminder_list` to edit the imported reminders')
+        await ctx.respond(embed=eb, ephemeral=True)
+
 
 
 def setup(client):
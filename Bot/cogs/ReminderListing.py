@@ -1,10 +1,9 @@
 import asyncio
 import logging
 import math
+import tempfile
 from enum import Enum
 import random
-from unidecode import unidecode
-from dateutil import tz
 
 import discord
 from discord.ext import commands, tasks
@@ -12,10 +11,15 @@ from discord.ext import commands, tasks
 from lib.Connector import Connector
 from lib.Reminder import Reminder, IntervalReminder
 import lib.input_parser
+from lib.Timezones import Timezones
+from lib.ReminderSearch import ReminderSearch
+from lib.ReminderExport import ReminderExport
+from lib.Clock import Clock
 
 import util.interaction
 import util.reminderInteraction
 import util.formatting
+import util.verboseErrors
 #import lib.ReminderRepeater
 
 from lib.Analytics import Analytics, Types
@@ -38,6 +42,8 @@ class ReminderListView(util.interaction.CustomView):
         else:
             title_str = f'Reminder list for {self.stm.ctx.guild.name}'        
         footer_str = 'Reminders marked with * belong to other users'
+        if self.stm.search:
+            footer_str = f'{len(self.stm.reminders)} result(s) for "{self.stm.search}"\n' + footer_str
 
         eb = ReminderListing.get_reminder_list_eb(self.stm.reminders, self.stm.page, title_str, self.stm.tz_str, self.stm.scope.user_id)
         eb.set_footer(text=footer_str)
@@ -65,9 +71,26 @@ class ReminderListView(util.interaction.CustomView):
         return reminders[from_idx:to_idx]
 
 
-    def update_dropdown(self):
+    def refresh_reminders(self, reindex=False):
+        """load the reminders of the scope, or the hits of the active search
+
+        Args:
+            reindex (bool, optional): rebuild the session index, after an edit. Defaults to False.
+        """
         roles = self.stm.ctx.author.roles if self.stm.scope.guild_id else []
-        self.stm.reminders = Connector.get_guild_reminders(self.stm.scope, roles)
+
+        if not self.stm.search:
+            self.stm.reminders = Connector.get_guild_reminders(self.stm.scope, roles)
+        elif self.stm.search_index is None:
+            self.stm.reminders = Connector.search_reminders(self.stm.scope, self.stm.search, roles)
+        else:
+            if reindex:
+                self.stm.search_index = ReminderSearch(Connector.get_guild_reminders(self.stm.scope, roles))
+            self.stm.reminders = self.stm.search_index.search(self.stm.search)
+
+
+    def update_dropdown(self, reindex=False):
+        self.refresh_reminders(reindex=reindex)
         page_rems = self.get_reminders_on_page(self.stm.reminders, self.stm.page)
 
         if(len(page_rems) > 25):
@@ -75,13 +98,16 @@ class ReminderListView(util.interaction.CustomView):
             log.warning('too many elements in dropdown in update_dropdown/ReminderListing.py')
             page_rems = page_rems[0:25] # max 25 elements
 
+        # delete old selects
+        old_sel = [x for x in self.children if isinstance(x, discord.ui.Select)]
+        if old_sel:
+            self.children.remove(old_sel[0])
+
         if page_rems:
             reminder_opts = []
             for i, r in enumerate(page_rems):
-                # make sure to always have between 1 and 25 chars in any label
-                # *AFTER* unidecode
-                lbl = unidecode(r.title)[:25] if r.title and unidecode(r.title) else unidecode(r.msg)[:25]
-                lbl = lbl if lbl else '*empty reminder*'
+                # stored label, no transliteration on render
+                lbl = r.get_label() or '*empty reminder*'
 
                 reminder_opts.append(discord.SelectOption(
                     label= lbl, 
@@ -96,11 +122,6 @@ class ReminderListView(util.interaction.CustomView):
                 options=reminder_opts
             )
             dd.callback = self.dropdown_callback
-
-            # delete old selects
-            old_sel = [x for x in self.children if isinstance(x, discord.ui.Select)]
-            if old_sel:
-                self.children.remove(old_sel[0])
             self.add_item(dd)
 
 
@@ -133,6 +154,45 @@ class ReminderListView(util.interaction.CustomView):
 
 
 
+    @discord.ui.button(emoji='🔍', style=discord.ButtonStyle.secondary)
+    async def search(self, button:  discord.ui.Button, interaction: discord.Interaction):
+        modal = util.reminderInteraction.SearchModal(query=self.stm.search,
+                                                     title='Search Reminders',
+                                                     custom_callback=self.search_callback)
+        await interaction.response.send_modal(modal)
+
+
+    @discord.ui.button(emoji='☑️', style=discord.ButtonStyle.secondary)
+    async def bulk_edit(self, button:  discord.ui.Button, interaction: discord.Interaction):
+        view = ReminderBulkView(self.stm, reload=lambda: self.refresh_reminders(reindex=True), message=self.message)
+        await interaction.response.edit_message(embed=view.get_embed(), view=view)
+
+        await view.wait()
+        self.message = view.message # update in case it was transferred
+
+        if view.open_interaction:
+            self.update_dropdown(reindex=True)
+            await view.open_interaction.response.edit_message(embed=self.get_embed(), view=self)
+
+
+    async def search_callback(self, interaction: discord.Interaction, query: str):
+        if query and not self.stm.search:
+            # the full list is already loaded, small lists are indexed for this session
+            # larger ones are searched by the text index of the db
+            if len(self.stm.reminders) <= ReminderSearch.SESSION_LIMIT:
+                self.stm.search_index = ReminderSearch(self.stm.reminders)
+            else:
+                self.stm.search_index = None
+
+        self.stm.search = query or None
+        self.stm.page = 0
+
+        self.update_dropdown()
+        new_eb = self.get_embed()
+        await interaction.response.edit_message(embed=new_eb, view=self)
+
+
+
     async def dropdown_callback(self, interaction: discord.Interaction):
         
 
@@ -161,9 +221,7 @@ class ReminderListView(util.interaction.CustomView):
         self.message = view.message # update in case it was transferred
 
         # update reminder list and dropdown
-        roles = self.stm.ctx.author.roles if self.stm.scope.guild_id else []
-        self.stm.reminders = Connector.get_guild_reminders(self.stm.scope, roles)
-        self.update_dropdown()
+        self.update_dropdown(reindex=True)
         new_eb = self.get_embed()
         await view.open_interaction.response.edit_message(embed=new_eb, view=self) # already responded
         # self is not used anymore, until this is finished
@@ -171,7 +229,211 @@ class ReminderListView(util.interaction.CustomView):
 
 
 
+class ReminderBulkView(util.interaction.CustomView):
+    """select reminders over multiple pages of the list
+       and delete, move or shift all of them with one db write
+    """
+    def __init__(self, stm, reload, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.stm:util.reminderInteraction.STM = stm
+        self.reload = reload  # reloads stm.reminders after a change
+        self.selected = set()  # _id of the selected reminders
+        self.info = None
+
+        # channels can only be picked in a guild
+        if self.stm.scope.is_private:
+            self.remove_item(self.move_selected)
+
+        self.update_dropdown()
+
+
+    def get_embed(self) -> discord.Embed:
+        eb = ReminderListing.get_reminder_list_eb(self.stm.reminders, self.stm.page, 'Bulk edit', self.stm.tz_str, self.stm.scope.user_id)
+        if self.info:
+            eb.add_field(name='\u200b', value=self.info)
+        eb.set_footer(text=f'{len(self.selected)} reminder(s) selected')
+        return eb
+
+
+    def get_selected(self) -> list:
+        return [r for r in self.stm.reminders if r._id in self.selected]
+
+
+    def _remove_selects(self):
+        for sel in [x for x in self.children if isinstance(x, discord.ui.Select)]:
+            self.remove_item(sel)
+
+
+    def update_dropdown(self):
+        page_rems = ReminderListing.get_reminders_on_page(self.stm.reminders, self.stm.page)
+        self._remove_selects()
+
+        for btn in (self.delete_selected, self.move_selected, self.shift_selected):
+            btn.disabled = not self.selected
+
+        if not page_rems:
+            return
+
+        dd = discord.ui.Select(
+            placeholder='Select the reminders to edit',
+            min_values=0,
+            max_values=len(page_rems),
+            options=[discord.SelectOption(
+                        label=r.get_label() or '*empty reminder*',
+                        emoji=lib.input_parser.num_to_emoji(i+1),
+                        value=str(i),
+                        default=(r._id in self.selected)) for i, r in enumerate(page_rems)],
+            row=1
+        )
+        dd.callback = self.dropdown_callback
+        self.add_item(dd)
+
+
+    async def _after_change(self, interaction: discord.Interaction, info: str):
+        self.selected.clear()
+        self.reload()
+
+        page_cnt = max(1, math.ceil(len(self.stm.reminders) / 9))
+        self.stm.page = min(self.stm.page, page_cnt-1)
+
+        self.info = info
+        self.update_dropdown()
+        await interaction.edit_original_response(embed=self.get_embed(), view=self)
+
+
+    async def dropdown_callback(self, interaction: discord.Interaction):
+        page_rems = ReminderListing.get_reminders_on_page(self.stm.reminders, self.stm.page)
+
+        # the selection of the other pages is kept
+        self.selected.difference_update(r._id for r in page_rems)
+        self.selected.update(page_rems[int(v)]._id for v in interaction.data['values'] if int(v) < len(page_rems))
+
+        self.info = None
+        self.update_dropdown()
+        await interaction.response.edit_message(embed=self.get_embed(), view=self)
+
+
+    async def _turn_page(self, step: int, interaction: discord.Interaction):
+        page_cnt = max(1, math.ceil(len(self.stm.reminders) / 9))
+        self.stm.page = (self.stm.page + step) % page_cnt
+
+        self.update_dropdown()
+        await interaction.response.edit_message(embed=self.get_embed(), view=self)
+
+
+    @discord.ui.button(emoji='⏪', style=discord.ButtonStyle.secondary, row=0)
+    async def prev_page(self, button:  discord.ui.Button, interaction: discord.Interaction):
+        await self._turn_page(-1, interaction)
+
+
+    @discord.ui.button(emoji='⏩', style=discord.ButtonStyle.secondary, row=0)
+    async def next_page(self, button:  discord.ui.Button, interaction: discord.Interaction):
+        await self._turn_page(1, interaction)
+
+
+    @discord.ui.button(label='Delete', style=discord.ButtonStyle.danger, row=2)
+    async def delete_selected(self, button:  discord.ui.Button, interaction: discord.Interaction):
+        selected = self.get_selected()
+
+        view = util.interaction.ConfirmDenyView(dangerous_action=True)
+        eb = discord.Embed(title=f'Delete {len(selected)} Reminder(s)?',
+                           description='This cannot be undone')
+        await interaction.response.edit_message(embed=eb, view=view)
+        await view.wait()
+
+        info = None
+        if view.value:
+            rem_cnt, intvl_cnt = Connector.bulk_delete(selected)
+
+            shard = self.stm.ctx.guild.shard_id if self.stm.ctx.guild else 0
+            if rem_cnt:
+                Analytics.reminder_deleted(Types.DeleteAction.BULK, shard=shard, count=rem_cnt)
+            if intvl_cnt:
+                Analytics.interval_deleted(Types.DeleteAction.BULK, shard=shard, count=intvl_cnt)
+
+            info = f'Deleted {rem_cnt+intvl_cnt} reminder(s)'
+
+        await self._after_change(interaction, info)
+
+
+    @discord.ui.button(label='Move', style=discord.ButtonStyle.primary, row=2)
+    async def move_selected(self, button:  discord.ui.Button, interaction: discord.Interaction):
+        self._remove_selects()
+
+        dd = discord.ui.Select(
+            select_type=discord.ComponentType.channel_select,
+            channel_types=[discord.ChannelType.text, discord.ChannelType.voice],
+            placeholder='Move the selected reminders to',
+            row=1
+        )
+        dd.callback = self.channel_callback
+        self.add_item(dd)
+
+        await interaction.response.edit_message(view=self)
+
+
+    async def channel_callback(self, interaction: discord.Interaction):
+        await interaction.response.defer()
+
+        ch_id = int(interaction.data['values'][0])
+        channel = self.stm.ctx.guild.get_channel(ch_id)
+
+        r_type = Connector.get_reminder_type(self.stm.scope.instance_id)
+        if not channel:
+            info = 'Couldn\'t resolve the selected channel. Ensure that I have sufficient permissions.'
+        elif r_type == Connector.ReminderType.TEXT_ONLY and not util.verboseErrors.VerboseErrors.has_permission(discord.Permissions(send_messages=True), channel):
+            info = 'Missing permissions in the new channel'
+        elif r_type != Connector.ReminderType.TEXT_ONLY and not util.verboseErrors.VerboseErrors.can_send_messages(channel):
+            info = 'Missing permissions in the new channel'
+        else:
+            moved = Connector.bulk_set_channel(self.get_selected(), ch_id, channel.name)
+            info = f'Moved {moved} reminder(s) to `{channel.name}`'
+
+        await self._after_change(interaction, info)
+
+
+    @discord.ui.button(label='Shift', style=discord.ButtonStyle.primary, row=2)
+    async def shift_selected(self, button:  discord.ui.Button, interaction: discord.Interaction):
+        modal = util.reminderInteraction.RuleModal(field='Shift by (e.g. 1h 30m, 2d, -1w)',
+                                                   title='Shift Reminders',
+                                                   custom_callback=self.shift_callback,
+                                                   mode=None)
+        await interaction.response.send_modal(modal)
+
+
+    async def shift_callback(self, interaction: discord.Interaction, value: str, mode):
+        await interaction.response.defer()
+
+        utcnow = Clock.utcnow()
+        delta, info = lib.input_parser.parse_duration(value, utcnow)
+        selected = self.get_selected()
+
+        if delta is None:
+            info = f'Invalid duration\n{info}'
+        elif any(r.at and r.at + delta < utcnow for r in selected):
+            info = 'The shifted reminders must be in the future'
+        else:
+            shifted = Connector.bulk_shift(selected, delta)
+            info = f'Shifted {shifted} reminder(s)'
+
+        await self._after_change(interaction, info)
+
+
+    @discord.ui.button(label='Done', style=discord.ButtonStyle.secondary, row=2)
+    async def done(self, button:  discord.ui.Button, interaction: discord.Interaction):
+        self.disable_all()
+        self.open_interaction = interaction
+        self.stop() # gives back control to the list menu
+
+
+
+
 class ReminderListing(commands.Cog):
+
+    # upload limit of a DM, guilds use their boost dependent limit
+    DM_UPLOAD_LIMIT = 10 * 1024**2
+
     def __init__(self, client):
         self.client = client
 
@@ -201,16 +463,14 @@ class ReminderListing(commands.Cog):
         Returns:
             str: reminder list string
         """
-        out_str = 'Sorted by date\n\n'
+        MAX_FIELD_LEN = 33
+        MAX_MSG_LEN = 26
 
-        rows = []
-        for i, r in enumerate(reminders):
-
-            MAX_FIELD_LEN = 33
-            MAX_MSG_LEN = 26
-
-            at_local = r.at.replace(tzinfo=tz.UTC).astimezone(tz.gettz(tz_str)) if r.at else None
+        # zone lookup once, not per row
+        local_times = Timezones.to_local_many([r.at for r in reminders], tz_str)
 
+        rows = []
+        for i, (r, at_local) in enumerate(zip(reminders, local_times)):
 
             content = r.title[0:MAX_MSG_LEN] if r.title else r.msg[0:MAX_MSG_LEN]
 
@@ -282,6 +542,26 @@ class ReminderListing(commands.Cog):
 
         return reminders[from_idx:to_idx]
 
+
+    @staticmethod
+    def _export_file(scope, roles, fmt, tz_str, legacy):
+        """stream the reminders of the scope into a temporary file
+           blocking, the file is positioned at its start
+
+        Returns:
+            tuple(file, int, int): the file, number of reminders, file size
+        """
+        fp = tempfile.TemporaryFile()
+        try:
+            cnt = ReminderExport.write(fp, Connector.iter_reminders(scope, roles), fmt, tz_str=tz_str, legacy=legacy)
+        except:
+            fp.close()
+            raise
+
+        size = fp.tell()
+        fp.seek(0)
+        return fp, cnt, size
+
  
     # =====================
     # stm core
@@ -314,5 +594,37 @@ class ReminderListing(commands.Cog):
         stm.tz_str = Connector.get_timezone(scope.instance_id)
         await self.reminder_stm(stm)
 
+
+    @commands.slash_command(name='reminder_export', description='Download all your reminders as file')
+    async def reminder_export(self, ctx,
+                        fmt:discord.Option(str, 'file format, ics can be imported into most calendars', name='format',
+                                           choices=list(ReminderExport.FORMATS), required=False, default='ics')):
+
+        if ctx.guild:
+            scope = Connector.Scope(is_private=False, guild_id=ctx.guild.id, user_id=ctx.author.id)
+        else:
+            scope = Connector.Scope(is_private=True, user_id=ctx.author.id)
+
+        # a large export may take longer than the interaction timeout
+        await ctx.defer(ephemeral=True)
+
+        roles = ctx.author.roles if scope.guild_id else []
+        tz_str = Connector.get_timezone(scope.instance_id)
+        legacy = Connector.is_legacy_interval(scope.instance_id)
+
+        fp, cnt, size = await asyncio.to_thread(ReminderListing._export_file, scope, roles, fmt, tz_str, legacy)
+
+        with fp:
+            limit = ctx.guild.filesize_limit if ctx.guild else ReminderListing.DM_UPLOAD_LIMIT
+
+            if cnt == 0:
+                await ctx.respond('You don\'t have any reminders to export', ephemeral=True)
+            elif size > limit:
+                await ctx.respond(f'The export of {cnt} reminders exceeds the upload limit ({size/1024**2:.1f}MiB), '\
+                                    'please contact the support', ephemeral=True)
+            else:
+                await ctx.respond(f'Exported {cnt} reminders', file=discord.File(fp, filename=f'reminders.{fmt}'), ephemeral=True)
+                Analytics.reminder_exported(fmt, cnt)
+
 def setup(client):
     client.add_cog(ReminderListing(client))
\ No newline at end of file
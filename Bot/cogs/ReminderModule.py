@@ -9,7 +9,6 @@ from dateutil import tz
 from bson import ObjectId
 
 import copy
-from pytz import common_timezones as pytz_common_timezones, country_timezones
 
 import discord
 from discord.ext import commands, tasks
@@ -23,6 +22,9 @@ from util.verboseErrors import VerboseErrors
 from util.consts import Consts
 
 from lib.Analytics import Analytics, Types
+from lib.Counters import Counters
+from lib.GuildPurge import GuildPurge
+from lib.Clock import Clock
 
 log = logging.getLogger('Remindme.Core')
 
@@ -147,7 +149,7 @@ class ReminderModule(commands.Cog):
             eb = await rem.get_embed(self.client, is_dm=True)
             text = rem.get_embed_text(is_dm=True)
         
-        view = util.interaction.UndeliveredView(reminder_id=rem._id, timeout=300)
+        view = util.interaction.UndeliveredView(reminder_id=rem._id)
 
         # first fallback is string-only message
         # second fallback is dm to user
@@ -161,35 +163,39 @@ class ReminderModule(commands.Cog):
             log.warning(f'failed to send reminder as DM to {rem.target}')
             await self.warn_author_dm(rem, Types.DeliverFailureReason.TARGET_DM, channel=channel, err_msg=err_msg)
             return
+        finally:
+            view.release()
 
 
     async def print_reminder(self, rem: Reminder):
 
         async def send_message(guild, channel, text, embed, rem_type: Connector.ReminderType, reminder):
             if isinstance(channel, discord.Thread) or VerboseErrors.can_embed(channel):
+                # assigned before the try, the finally must not hide an error of the view constructor
+                view = None
                 try:
                     if rem_type != Connector.ReminderType.EMBED_ONLY and \
                         rem_type != Connector.ReminderType.HYBRID:
                         view = None
                     elif  isinstance(reminder, IntervalReminder):                        
-                        view = util.interaction.SnoozeIntervalView(reminder, timeout=500)
+                        view = util.interaction.SnoozeIntervalView(reminder._id)
                     else:
-                        view = util.interaction.SnoozeView(reminder, timeout=500)
+                        view = util.interaction.SnoozeView(reminder._id)
 
 
-                    tmp_msg = await channel.send(text, embed=embed, 
+                    await channel.send(text, embed=embed, 
                                     allowed_mentions=discord.AllowedMentions.all(),
                                     view=view)
-
-                    if view:
-                        # for timeout functionality
-                        view.message = tmp_msg
                                     
                     return True
                 except discord.errors.Forbidden:
                     if isinstance(channel, discord.Thread) and channel.locked:
                         return False # no error on locked threads
                     log.error('failed to send embed, even though permissions had been assured')
+                finally:
+                    # clicks are routed by custom_id, do not keep the view alive
+                    if view:
+                        view.release()
 
             elif VerboseErrors.can_send_messages(channel):
                 try:
@@ -212,6 +218,10 @@ class ReminderModule(commands.Cog):
             await self.print_reminder_dm(rem)
             return
 
+        # the bot left the guild, the reminder is about to be deleted
+        if GuildPurge.is_pending(rem.g_id):
+            return
+
         guild = self.client.get_guild(rem.g_id)
         channel = guild.get_channel_or_thread(rem.ch_id) if guild else None
 
@@ -282,6 +292,12 @@ class ReminderModule(commands.Cog):
         log.info('loaded')
 
 
+    @commands.Cog.listener()
+    async def on_interaction(self, interaction: discord.Interaction):
+        # snooze/delete buttons of delivered reminders
+        await util.interaction.dispatch_persistent(interaction)
+
+
     @tasks.loop(hours=24)
     async def clean_interval_orphans(self):
         cnt = Connector.delete_orphaned_intervals()
@@ -292,9 +308,10 @@ class ReminderModule(commands.Cog):
 
     @tasks.loop(seconds=45)
     async def check_pending_intervals(self):   
-        now = datetime.utcnow()
+        now = Clock.utcnow()
         
         pending_intvls = Connector.get_pending_intervals(now.timestamp())
+        Analytics.reminder_backlog(pending_intvls, is_interval=True, shard_ids=self.client.shards.keys())
 
         for interval in pending_intvls:
             # must be evaluated before new at is assigned
@@ -314,9 +331,9 @@ class ReminderModule(commands.Cog):
                 log.error(f'interval not delivered, skipping. See exception below')
                 t = (type(e), e, e.__traceback__)
                 log.error(''.join(traceback.format_exception(*t)))
-                Analytics.register_exception(e) # add these to ex counter
+                Analytics.register_exception(e, shard=Analytics.shard_of(interval.g_id)) # add these to ex counter
 
-        self.last_loop = datetime.utcnow()
+        self.last_loop = Clock.utcnow()
         sent_in = (self.last_loop-now).total_seconds()
         if sent_in > 1:
             log.debug(f'intervals sent in {sent_in}s')
@@ -324,9 +341,10 @@ class ReminderModule(commands.Cog):
 
     @tasks.loop(seconds=50)
     async def check_pending_reminders(self):
-        now = datetime.utcnow()
+        now = Clock.utcnow()
 
         pending_rems = Connector.pop_elapsed_reminders(now.timestamp())
+        Analytics.reminder_backlog(pending_rems, shard_ids=self.client.shards.keys())
         
         for reminder in pending_rems:
             try:
@@ -335,26 +353,28 @@ class ReminderModule(commands.Cog):
                 log.error(f'reminder not delivered, skipping. See exception below')
                 t = (type(e), e, e.__traceback__)
                 log.error(''.join(traceback.format_exception(*t)))
-                Analytics.register_exception(e) # add these to ex counter
+                Analytics.register_exception(e, shard=Analytics.shard_of(reminder.g_id)) # add these to ex counter
 
             Analytics.reminder_delay(reminder, now=now, allowed_delay=1*60)
 
 
-        sent_in = (datetime.utcnow()-now).total_seconds()
+        sent_in = (Clock.utcnow()-now).total_seconds()
         if sent_in > 1:
             log.debug(f'reminders sent in {sent_in}s')
         
     
    
+    # the counts are maintained on every insert/delete
+    # the loops only correct the drift with the estimated count
     @tasks.loop(minutes=15)
     async def check_reminder_cnt(self):
         rems = Connector.get_reminder_cnt()
-        Analytics.reminder_cnt(rems)
+        Counters.reconcile_reminders(rems)
 
     @tasks.loop(minutes=15)
     async def check_interval_cnt(self):
         intvls = Connector.get_interval_cnt()
-        Analytics.interval_cnt(intvls)
+        Counters.reconcile_intervals(intvls)
     
 
     @clean_interval_orphans.before_loop
@@ -11,7 +11,6 @@ from bson import ObjectId
 import copy
 from datetime import datetime
 from dateutil import tz
-from pytz import common_timezones as pytz_common_timezones, country_timezones
 
 import discord
 from discord.ext import commands, tasks
@@ -22,6 +21,7 @@ import util.interaction
 from lib.Connector import Connector
 from lib.CommunitySettings import CommunitySettings, CommunityAction
 from lib.Analytics import Analytics, Types
+from lib.Timezones import Timezones
 
 
 log = logging.getLogger('Remindme.Settings')
@@ -657,7 +657,7 @@ class SettingsModule(commands.Cog):
     @staticmethod
     def get_tz_info_eb(name):
         
-        zone = tz.gettz(name)
+        zone = Timezones.get(name)
 
         offset = datetime.now(zone).strftime('%z')
         local_time = datetime.now(zone).strftime('%H:%M')
@@ -669,7 +669,7 @@ class SettingsModule(commands.Cog):
             info_str += '\n• Consider using `MST7MDT` to respect daylight saving during winter'
         elif name.lower() == 'est':
             info_str += '\n• Consider using `EST5EDT` to respect daylight saving during winter'
-        elif name not in pytz_common_timezones:
+        elif not Timezones.is_common(name):
             info_str += f'\n• `{name}` seems to be a deprecated timezone and could be discontinued in future versions.\n'\
                         f'• Try and use a geo-referenced timezone that _observes_ `{name}` instead (e.g. `Europe/Berlin`)'
 
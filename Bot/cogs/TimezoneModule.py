@@ -1,4 +1,5 @@
 import re
+import asyncio
 import logging
 
 from datetime import datetime
@@ -8,8 +9,6 @@ import copy
 import difflib
 from datetime import datetime
 from dateutil import tz
-from dateutil.zoneinfo import getzoneinfofile_stream, ZoneInfoFile
-from pytz import common_timezones as pytz_common_timezones, country_timezones
 
 import discord
 from discord.ext import commands, tasks
@@ -19,6 +18,8 @@ import util.interaction
 from lib.CommunitySettings import CommunityAction
 from lib.Connector import Connector
 from lib.Analytics import Analytics
+from lib.TimezoneIndex import TimezoneIndex
+from lib.Timezones import Timezones
 
 
 log = logging.getLogger('Remindme.Timezones')
@@ -26,21 +27,8 @@ log = logging.getLogger('Remindme.Timezones')
 
 class TimezoneModule(discord.Cog):
 
-    ##################
-    # Statics
-    #################
-
-    timezones = list(ZoneInfoFile(getzoneinfofile_stream()).zones.keys())
-
-    
     def __init__(self, client):
         self.client = client
-        
-        self.timezone_country = {}
-        for countrycode in country_timezones:
-            timezones = country_timezones[countrycode]
-            for timezone in timezones:
-                self.timezone_country[timezone] = countrycode
     
 
     ################
@@ -48,9 +36,8 @@ class TimezoneModule(discord.Cog):
     ################
      
     async def get_timezone_autocomplete(ctx: discord.AutocompleteContext):
-        """Returns a list of colors that begin with the characters entered so far."""
-        user_input = ctx.value.upper()
-        return list(filter(lambda z: user_input in z.upper(), TimezoneModule.timezones)) # upper every iteration, to return case-sinsitive result to user
+        """Returns the best matching timezones for the characters entered so far."""
+        return TimezoneIndex.search(ctx.value)
 
 
         
@@ -70,7 +57,7 @@ class TimezoneModule(discord.Cog):
             info_str += '\n• Consider using `MST7MDT` to respect daylight saving during winter'
         elif name.lower() == 'est':
             info_str += '\n• Consider using `EST5EDT` to respect daylight saving during winter'
-        elif name not in pytz_common_timezones:
+        elif not Timezones.is_common(name):
             info_str += f'\n• `{name}` seems to be a deprecated timezone and could be discontinued in future versions.\n'\
                         f'• Try and use a geo-referenced timezone that _observes_ `{name}` instead (e.g. `Europe/Berlin`)'
 
@@ -121,9 +108,9 @@ class TimezoneModule(discord.Cog):
         if re.match(re_utc, value):
             value = value.upper()
 
-        tz_obj = tz.gettz(value)
+        tz_obj = Timezones.get(value)
         if not tz_obj:
-            all_zones = list(ZoneInfoFile(getzoneinfofile_stream()).zones.keys())
+            all_zones = Timezones.zones()
 
             closest_tz = difflib.get_close_matches(value, all_zones, n=5)
             if not closest_tz:
@@ -141,7 +128,7 @@ class TimezoneModule(discord.Cog):
             # create a dropdown list
             options = [discord.SelectOption(
                     label=opt,
-                    emoji='🔹' if opt in pytz_common_timezones else '🔸',
+                    emoji='🔹' if Timezones.is_common(opt) else '🔸',
                     value=opt) for opt in closest_tz
                 ]
             # hand the dropdown to managing class
@@ -160,7 +147,7 @@ class TimezoneModule(discord.Cog):
             await view.wait()
 
             value = view.value
-            tz_obj = tz.gettz(value)
+            tz_obj = Timezones.get(value)
 
 
             if not value:
@@ -183,8 +170,9 @@ class TimezoneModule(discord.Cog):
         if view.value:
             Connector.set_timezone(instance_id, value)
             Analytics.set_timezone(value, 
-                                country_code=self.timezone_country.get(value, 'UNK'),
-                                deprecated=value not in pytz_common_timezones)
+                                country_code=Timezones.country_of(value),
+                                deprecated=not Timezones.is_common(value),
+                                shard=ctx.guild.shard_id if ctx.guild else 0)
 
         
 
@@ -194,6 +182,8 @@ class TimezoneModule(discord.Cog):
 
     @discord.Cog.listener()
     async def on_ready(self):
+        # the first keystroke shouldn't pay for the index
+        await asyncio.to_thread(TimezoneIndex.load)
         log.info('loaded')
 
 
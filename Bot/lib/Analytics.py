@@ -1,17 +1,18 @@
 import os
+import math
+import asyncio
 from datetime import datetime, timedelta
 from enum import Enum
 import logging
 
 import prometheus_client
-from prometheus_client import Counter, Histogram, Gauge
+from prometheus_client import Counter, Histogram, Gauge, CollectorRegistry, multiprocess
 
-import _thread
-
-from flask import Flask, request, Response
-from waitress import serve
+from aiohttp import web
 
 from lib.Reminder import Reminder, IntervalReminder
+from lib.Clock import Clock
+import lib.Connector  # KEEP this syntax, circular import
 
 
 log = logging.getLogger('Remindme.Analytics')
@@ -40,6 +41,7 @@ class Types:
         DIRECT_BTN = 1
         ORPHAN = 2
         KICK = 3
+        BULK = 4
 
     class CreationFailed(Enum):
         INVALID_F_STR = 0
@@ -122,13 +124,17 @@ class Analytics:
         'guild_removed_cnt', 'Guilds the bot left/was removed from'
     )
 
+    # multiprocess_mode is only used, if PROMETHEUS_MULTIPROC_DIR is set
+    # db-wide values are reported by each process, per-process values are summed up
     GUILD_CNT = Gauge(
-        'guild_cnt', 'Total guild count of the bot'
+        'guild_cnt', 'Total guild count of the bot',
+        multiprocess_mode='livesum'
     )
 
     REMINDER_CNT = Gauge(
         'reminder_cnt', 'Total count of reminders',
-        ['shard', 'type']
+        ['shard', 'type'],
+        multiprocess_mode='max'
     )
 
     REMINDER_CREATION_FAILED = Counter(
@@ -151,6 +157,38 @@ class Analytics:
         ['shard']
     )
 
+    REMINDER_EXPORTED_CNT = Counter(
+        'reminder_exported_cnt', 'Reminders downloaded with /reminder_export',
+        ['format']
+    )
+
+    REMINDER_IMPORTED_CNT = Counter(
+        'reminder_imported_cnt', 'Entries of bulk imports, by result (imported, failed)',
+        ['format', 'result']
+    )
+
+    REMINDER_IMPORT_PHASE = Histogram(
+        'reminder_import_phase', 'Duration of the bulk import phases (parse, commit) in seconds',
+        ['phase'],
+        buckets=(
+            0.01,
+            0.05,
+            0.1,
+            0.5,
+            1,
+            5,
+            10,
+            30,
+            float('inf')
+        )
+    )
+
+    REMINDER_IMPORT_THROUGHPUT = Gauge(
+        'reminder_import_throughput', 'Entries per second of the last bulk import',
+        ['format'],
+        multiprocess_mode='max'
+    )
+
     UNEXPECTED_EXCEPTION = Counter(
         'unexpected_exception_cnt', 'Hold all caught unhandled exceptions',
         ['shard', 'ex_type']
@@ -177,38 +215,277 @@ class Analytics:
     )
     
     COMMUNITY_CNT = Gauge(
-        'community_cnt', 'Number of servers set to community mode'
+        'community_cnt', 'Number of servers set to community mode',
+        multiprocess_mode='max'
     )
     
     EXPERIMENTAL_CNT = Gauge(
-        'experimental_cnt', 'Number of servers set to experimental mode'
+        'experimental_cnt', 'Number of servers set to experimental mode',
+        multiprocess_mode='max'
     )
     
     COMMAND_DENIED = Counter(
         'command_denied', 'Command execution was denied due to missing permissions',
         ['shard']
     )
+
+    SHARD_LATENCY = Gauge(
+        'shard_latency', 'Gateway heartbeat latency of a shard in seconds',
+        ['shard'],
+        multiprocess_mode='livemax'
+    )
+
+    SHARD_GUILD_CNT = Gauge(
+        'shard_guild_cnt', 'Guild count of a shard',
+        ['shard'],
+        multiprocess_mode='livesum'
+    )
+
+    SHARD_BACKLOG = Gauge(
+        'shard_backlog', 'Due reminders found by the last scan, by shard',
+        ['shard', 'type'],
+        multiprocess_mode='livesum'
+    )
+
+    LOOP_LAG = Histogram(
+        'loop_lag', 'Wakeup latency of the event loop in seconds',
+        buckets=(
+            0.005,
+            0.01,
+            0.025,
+            0.05,
+            0.1,
+            0.25,
+            0.5,
+            1,
+            2.5,
+            5,
+            10,
+            float('inf')
+        )
+    )
+
+    LOOP_STALL = Histogram(
+        'loop_stall', 'Duration of event loop stalls by the blocking callback',
+        ['callback'],
+        buckets=(
+            0.1,
+            0.25,
+            0.5,
+            1,
+            2.5,
+            5,
+            10,
+            30,
+            float('inf')
+        )
+    )
+
+    DB_OP_LATENCY = Histogram(
+        'db_op_latency', 'Latency of Connector operations in seconds',
+        ['method', 'collection'],
+        buckets=(
+            0.001,
+            0.0025,
+            0.005,
+            0.01,
+            0.025,
+            0.05,
+            0.1,
+            0.25,
+            0.5,
+            1,
+            float('inf')
+        )
+    )
+
+    DB_OP_FAILED = Counter(
+        'db_op_failed', 'Connector operations which raised an exception',
+        ['method', 'collection']
+    )
+
+    DB_OP_DOCUMENTS = Histogram(
+        'db_op_documents', 'Documents returned per Connector operation',
+        ['method', 'collection'],
+        buckets=(
+            0,
+            1,
+            5,
+            10,
+            50,
+            100,
+            500,
+            1000,
+            5000,
+            float('inf')
+        )
+    )
+
+    INTERACTION_LATENCY = Histogram(
+        'interaction_latency', 'Total latency of commands and component callbacks in seconds',
+        ['kind', 'name'],
+        buckets=(
+            0.1,
+            0.25,
+            0.5,
+            1,
+            2,
+            3,
+            5,
+            10,
+            30,
+            60,
+            float('inf')
+        )
+    )
+
+    INTERACTION_FIRST_RESPONSE = Histogram(
+        'interaction_first_response', 'Time until the first response/defer of an interaction in seconds',
+        ['kind', 'name'],
+        buckets=(
+            0.1,
+            0.25,
+            0.5,
+            1,
+            1.5,
+            2,
+            2.5,
+            3,
+            5,
+            float('inf')
+        )
+    )
+
+    INTERACTION_PHASE = Histogram(
+        'interaction_phase', 'Time spent per phase (parse, db, http) of an interaction in seconds',
+        ['kind', 'name', 'phase'],
+        buckets=(
+            0.001,
+            0.005,
+            0.01,
+            0.05,
+            0.1,
+            0.25,
+            0.5,
+            1,
+            3,
+            float('inf')
+        )
+    )
+
+    INTERACTION_DEADLINE_MISSED = Counter(
+        'interaction_deadline_missed', 'Interactions without a response within the Discord deadline',
+        ['kind', 'name']
+    )
+
+    STARTUP_PHASE = Gauge(
+        'startup_phase', 'Duration of the startup phases (imports, init, extensions, gateway) in seconds',
+        ['phase'],
+        multiprocess_mode='max'
+    )
+
+    STARTUP_IMPORT = Gauge(
+        'startup_import', 'Cumulative import time of the slowest modules in seconds (STARTUP_PROFILE)',
+        ['module'],
+        multiprocess_mode='max'
+    )
     
 
-    app = Flask(__name__)
+    bot = None
+    registry = prometheus_client.REGISTRY
+    _runner: web.AppRunner = None
+
 
     @staticmethod
-    def _waitress_thread(name, app, host, port):
-        serve(app, host=host, port=port)
+    def init(bot=None):
+        """schedule the metrics exporter on the event loop of the bot
+           the server is started together with the loop
 
+           if PROMETHEUS_MULTIPROC_DIR is set, /metrics exposes
+           the merged registry of all processes sharing this directory
+
+        Args:
+            bot (discord.Bot, optional): bot used for the health endpoints
+        """
+        Analytics.bot = bot
+
+        if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+            Analytics.registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(Analytics.registry)
+            log.info('exporting in multiprocess mode')
 
-    @staticmethod
-    def init():
         host = '0.0.0.0'
         port = int(os.getenv('PROMETHEUS_PORT'))
 
-        _thread.start_new_thread(Analytics._waitress_thread, ('flask server', Analytics.app, host, port))
+        loop = bot.loop if bot else asyncio.get_event_loop()
+        loop.create_task(Analytics._serve(host, port))
+
+
+    @staticmethod
+    def close():
+        """release the live gauges of this process in multiprocess mode"""
+        if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+            multiprocess.mark_process_dead(os.getpid())
+
+
+    @staticmethod
+    async def _serve(host, port):
+        app = web.Application()
+        app.router.add_get('/metrics', Analytics.metrics)
+        app.router.add_get('/healthz', Analytics.healthz)
+        app.router.add_get('/readyz', Analytics.readyz)
+
+        Analytics._runner = web.AppRunner(app, access_log=None)
+        await Analytics._runner.setup()
+        await web.TCPSite(Analytics._runner, host, port).start()
         log.info(f'Webserver started on {host}:{port}')
 
 
-    @app.route('/metrics')
-    def metrics():
-        return Response(prometheus_client.generate_latest(), mimetype=Analytics.CONTENT_TYPE_LATEST)
+    @staticmethod
+    async def metrics(request: web.Request):
+        body = prometheus_client.generate_latest(Analytics.registry)
+        return web.Response(body=body, headers={'Content-Type': Analytics.CONTENT_TYPE_LATEST})
+
+
+    @staticmethod
+    async def _status():
+        """collect the gateway and database status
+
+        Returns:
+            dict: status report, holds the bool 'gateway' and 'db'
+        """
+        bot = Analytics.bot
+        status = {'gateway': False, 'db': False}
+
+        if bot and not bot.is_closed():
+            status['gateway'] = bot.is_ready()
+            status['latency'] = None if math.isnan(bot.latency) else bot.latency # nan before first heartbeat
+            if getattr(bot, 'shards', None):
+                status['shards'] = {str(s_id): not shard.is_closed() for s_id, shard in bot.shards.items()}
+
+        try:
+            # pymongo is blocking, don't stall the loop on a dead db
+            await asyncio.wait_for(asyncio.to_thread(lib.Connector.Connector.ping), timeout=5)
+            status['db'] = True
+        except Exception as e:
+            log.warning(f'database health check failed: {type(e).__name__}')
+
+        return status
+
+
+    @staticmethod
+    async def healthz(request: web.Request):
+        # liveness, the loop is serving this request
+        # no db ping, a slow database must not get the process restarted (see readyz)
+        alive = Analytics.bot is None or not Analytics.bot.is_closed()
+        return web.json_response({'alive': alive}, status=200 if alive else 503)
+
+
+    @staticmethod
+    async def readyz(request: web.Request):
+        status = await Analytics._status()
+        ready = status['gateway'] and status['db']
+        return web.json_response(status, status=200 if ready else 503)
 
     #=========================
     # Analytics interface
@@ -216,8 +493,65 @@ class Analytics:
     #=========================
 
     @staticmethod
-    def reminder_created(reminder: Reminder, shard:int =0, from_interval=False, direct_interval=False, country_code='UNK'):
+    def shard_of(guild_id) -> int:
+        """get the shard which receives the events of the given guild
+           DMs are always received by shard 0
+
+        Args:
+            guild_id (int): guild id, None for DMs
+
+        Returns:
+            int: shard id
+        """
+        if not guild_id or not Analytics.bot:
+            return 0
+
+        shard_count = Analytics.bot.shard_count or 1
+        return (int(guild_id) >> 22) % shard_count
+
+
+    @staticmethod
+    def shard_stats(bot):
+        """update latency and guild count of all shards of this process
+        """
+        guild_cnt = {shard_id: 0 for shard_id in bot.shards}
+        for guild in bot.guilds:
+            guild_cnt[guild.shard_id] = guild_cnt.get(guild.shard_id, 0) + 1
+
+        for shard_id, shard in bot.shards.items():
+            if not math.isnan(shard.latency):
+                Analytics.SHARD_LATENCY.labels(str(shard_id)).set(shard.latency)
+            Analytics.SHARD_GUILD_CNT.labels(str(shard_id)).set(guild_cnt[shard_id])
+
+
+    @staticmethod
+    def reminder_backlog(reminders: list, is_interval=False, shard_ids=None):
+        """expose the due reminders of the last scan per shard
+
+        Args:
+            reminders (list): due reminders or intervals
+            is_interval (bool): the scan was over intervals
+            shard_ids (list, optional): shards to reset to 0 if they have no due reminders
+        """
+        if is_interval:
+            r_type = Types.ReminderType.REPEATING
+        else:
+            r_type = Types.ReminderType.ONE_SHOT
+
+        backlog = {shard_id: 0 for shard_id in (shard_ids or [])}
+        for reminder in reminders:
+            shard = Analytics.shard_of(reminder.g_id)
+            backlog[shard] = backlog.get(shard, 0) + 1
+
+        for shard, cnt in backlog.items():
+            Analytics.SHARD_BACKLOG.labels(str(shard), r_type.name).set(cnt)
+
+    @staticmethod
+    def reminder_created(reminder: Reminder, shard:int =None, from_interval=False, direct_interval=False, country_code='UNK'):
         
+        if shard is None:
+            shard = Analytics.shard_of(reminder.g_id)
+
         if isinstance(reminder, IntervalReminder):
             r_type = Types.ReminderType.REPEATING
         else:
@@ -240,7 +574,7 @@ class Analytics:
         else:
             r_creation = Types.ReminderCreation.NEW
 
-        interval = (reminder.at - datetime.utcnow()).total_seconds()
+        interval = (reminder.at - Clock.utcnow()).total_seconds()
 
 
         Analytics.REMINDER_CREATED_CNT.labels(str(shard), 
@@ -301,6 +635,21 @@ class Analytics:
     def ruleset_removed(shard:int =0):
         Analytics.RULESET_REMOVED_CNT.labels(str(shard)).inc()
 
+    @staticmethod
+    def reminder_exported(fmt: str, count: int):
+        Analytics.REMINDER_EXPORTED_CNT.labels(fmt).inc(count)
+
+    @staticmethod
+    def reminder_import(fmt: str, imported: int, failed: int, parse_time: float, commit_time: float):
+        Analytics.REMINDER_IMPORTED_CNT.labels(fmt, 'imported').inc(imported)
+        Analytics.REMINDER_IMPORTED_CNT.labels(fmt, 'failed').inc(failed)
+        Analytics.REMINDER_IMPORT_PHASE.labels('parse').observe(parse_time)
+        Analytics.REMINDER_IMPORT_PHASE.labels('commit').observe(commit_time)
+
+        total_time = parse_time + commit_time
+        if total_time > 0:
+            Analytics.REMINDER_IMPORT_THROUGHPUT.labels(fmt).set((imported + failed) / total_time)
+
     @staticmethod
     def register_exception(exception, shard:int = 0):
         ex_type = type(exception).__name__
@@ -308,8 +657,11 @@ class Analytics:
         Analytics.UNEXPECTED_EXCEPTION.labels(str(shard), ex_type).inc()
         
     @staticmethod
-    def reminder_not_delivered(reminder, reason:Types.DeliverFailureReason, shard:int = 0):
+    def reminder_not_delivered(reminder, reason:Types.DeliverFailureReason, shard:int = None):
         
+        if shard is None:
+            shard = Analytics.shard_of(reminder.g_id)
+
         if isinstance(reminder, IntervalReminder):
             r_type = Types.ReminderType.REPEATING
         else:
@@ -328,10 +680,13 @@ class Analytics:
         Analytics.UNDELIVERED_REMINDER.labels(str(shard), r_type.name, r_scope.name, r_tgt.name, reason.name).inc()
         
     @staticmethod
-    def reminder_delay(reminder, now=None, shard:int=0, allowed_delay=0):
+    def reminder_delay(reminder, now=None, shard:int=None, allowed_delay=0):
+
+        if shard is None:
+            shard = Analytics.shard_of(reminder.g_id)
 
         if not now:
-            now = datetime.utcnow()
+            now = Clock.utcnow()
 
         interval = (now-reminder.at).total_seconds()
 
@@ -372,4 +727,56 @@ class Analytics:
     @staticmethod
     def command_denied(shard:int = 0):
         Analytics.COMMAND_DENIED.labels(str(shard)).inc()
-        
\ No newline at end of file
+        
+
+
+    @staticmethod
+    def loop_lag(lag_seconds: float):
+        Analytics.LOOP_LAG.observe(lag_seconds)
+
+
+    @staticmethod
+    def loop_stall(callback: str, duration: float):
+        Analytics.LOOP_STALL.labels(callback).observe(duration)
+
+
+    @staticmethod
+    def db_operation(method: str, collection: str, duration: float):
+        Analytics.DB_OP_LATENCY.labels(method, collection).observe(duration)
+
+
+    @staticmethod
+    def db_operation_failed(method: str, collection: str):
+        Analytics.DB_OP_FAILED.labels(method, collection).inc()
+
+
+    @staticmethod
+    def db_documents(method: str, collection: str, documents: int):
+        Analytics.DB_OP_DOCUMENTS.labels(method, collection).observe(documents)
+
+
+    @staticmethod
+    def interaction_latency(kind: str, name: str, total: float, first_response: float = None):
+        Analytics.INTERACTION_LATENCY.labels(kind, name).observe(total)
+        if first_response is not None:
+            Analytics.INTERACTION_FIRST_RESPONSE.labels(kind, name).observe(first_response)
+
+
+    @staticmethod
+    def interaction_phase(kind: str, name: str, phase: str, duration: float):
+        Analytics.INTERACTION_PHASE.labels(kind, name, phase).observe(duration)
+
+
+    @staticmethod
+    def interaction_deadline_missed(kind: str, name: str):
+        Analytics.INTERACTION_DEADLINE_MISSED.labels(kind, name).inc()
+
+
+    @staticmethod
+    def startup_phase(phase: str, duration: float):
+        Analytics.STARTUP_PHASE.labels(phase).set(duration)
+
+
+    @staticmethod
+    def startup_import(module: str, duration: float):
+        Analytics.STARTUP_IMPORT.labels(module).set(duration)
@@ -0,0 +1,176 @@
+import time
+import asyncio
+import threading
+import logging
+
+import discord
+from pymongo.errors import OperationFailure, PyMongoError
+
+from lib.Connector import Connector
+from lib.TTLCache import TTLCache
+
+
+log = logging.getLogger('Remindme.Changes')
+
+
+class ChangeListener:
+    """publish changes of other processes (or manual db fixes)
+       to the in-process caches and subscribers
+
+       a change stream on the database is watched by a separate thread,
+       the changes are dispatched on the event loop of the bot.
+       Change streams require a replica set (a single-node set is sufficient),
+       without a replica set the caches fall back to a short ttl
+    """
+
+    COLLECTIONS = ('settings', 'reminders', 'intervals')
+
+    # cache ttl while changes are published, only a safety net
+    STREAM_TTL = 10*60
+
+    # cache ttl if no change stream is available
+    FALLBACK_TTL = 30
+
+    # seconds between reconnects of a broken stream
+    RETRY_INTERVAL = 10
+
+    # code of mongod, if not running as replica set
+    _NOT_REPLICA_SET = 40573
+
+    _loop: asyncio.AbstractEventLoop = None
+    _thread: threading.Thread = None
+
+    # collection -> (cache, key_field), entries are aliased with the document _id
+    _caches = {coll: [] for coll in COLLECTIONS}
+    # collection -> callbacks(operation, document_id)
+    _subscribers = {coll: [] for coll in COLLECTIONS}
+
+    streaming = False
+
+
+    @staticmethod
+    def init(bot: discord.Bot):
+        """start watching the database
+        """
+        if Connector.backend is not None:
+            # the embedded storages are not shared between processes
+            return
+
+        ChangeListener.register_cache('settings', Connector.settings_cache, key_field='g_id')
+
+        ChangeListener._loop = bot.loop
+        ChangeListener._set_ttl(ChangeListener.FALLBACK_TTL)
+
+        ChangeListener._thread = threading.Thread(target=ChangeListener._watch, name='change-listener', daemon=True)
+        ChangeListener._thread.start()
+
+
+    @staticmethod
+    def register_cache(collection: str, cache: TTLCache, key_field: str = None):
+        """invalidate the cache on changes of the collection
+           the entries must be aliased with the _id of the cached document
+
+        Args:
+            collection (str): 'settings', 'reminders' or 'intervals'
+            cache (TTLCache): the cache
+            key_field (str, optional): document field used as cache key,
+                                       inserts invalidate a cached absence of this key
+        """
+        if (cache, key_field) not in ChangeListener._caches[collection]:
+            ChangeListener._caches[collection].append((cache, key_field))
+
+
+    @staticmethod
+    def subscribe(collection: str, callback):
+        """call the callback on the event loop for each change of the collection
+
+        Args:
+            collection (str): 'settings', 'reminders' or 'intervals'
+            callback (function): called with (operation_type, document_id),
+                                 document_id is None if the whole collection is invalid
+        """
+        ChangeListener._subscribers[collection].append(callback)
+
+
+    @staticmethod
+    def _set_ttl(ttl: float):
+        for caches in ChangeListener._caches.values():
+            for cache, _ in caches:
+                cache.ttl = ttl
+
+
+    @staticmethod
+    def _watch():
+        pipeline = [{'$match': {'ns.coll': {'$in': list(ChangeListener.COLLECTIONS)}}}]
+        resume_token = None
+
+        while True:
+            try:
+                with Connector.db.watch(pipeline, resume_after=resume_token) as stream:
+                    if not ChangeListener.streaming:
+                        log.info('listening for database changes')
+                        ChangeListener.streaming = True
+                        ChangeListener._loop.call_soon_threadsafe(ChangeListener._set_ttl, ChangeListener.STREAM_TTL)
+                        # changes before the stream was opened are unknown
+                        ChangeListener._publish_all()
+
+                    for change in stream:
+                        resume_token = stream.resume_token
+                        ChangeListener._loop.call_soon_threadsafe(ChangeListener._publish, change)
+
+            except OperationFailure as e:
+                if e.code == ChangeListener._NOT_REPLICA_SET:
+                    log.info(f'change streams not available, caches use a ttl of {ChangeListener.FALLBACK_TTL}s')
+                    ChangeListener._fallback()
+                    return
+
+                # e.g. the resume token is not in the oplog anymore
+                log.warning(f'change stream failed ({e.code}), reconnecting')
+                resume_token = None
+                ChangeListener._fallback()
+
+            except PyMongoError as e:
+                log.warning(f'change stream interrupted ({type(e).__name__}), reconnecting')
+                ChangeListener._fallback()
+
+            time.sleep(ChangeListener.RETRY_INTERVAL)
+
+
+    @staticmethod
+    def _fallback():
+        ChangeListener.streaming = False
+        ChangeListener._loop.call_soon_threadsafe(ChangeListener._set_ttl, ChangeListener.FALLBACK_TTL)
+
+
+    @staticmethod
+    def _publish_all():
+        def publish():
+            for collection in ChangeListener.COLLECTIONS:
+                for cache, _ in ChangeListener._caches[collection]:
+                    cache.clear()
+                for callback in ChangeListener._subscribers[collection]:
+                    callback('invalidate', None)
+
+        ChangeListener._loop.call_soon_threadsafe(publish)
+
+
+    @staticmethod
+    def _publish(change: dict):
+        collection = change['ns']['coll']
+        operation = change['operationType']
+        doc_id = change.get('documentKey', {}).get('_id')
+
+        for cache, key_field in ChangeListener._caches[collection]:
+            if operation == 'insert' and key_field:
+                # the absence of the document might be cached
+                cache.invalidate(change['fullDocument'].get(key_field))
+            elif doc_id is not None:
+                cache.invalidate_alias(doc_id)
+            else:
+                cache.clear()
+
+        for callback in ChangeListener._subscribers[collection]:
+            try:
+                callback(operation, doc_id)
+            except Exception:
+                log.exception(f'change subscriber failed for {collection}')
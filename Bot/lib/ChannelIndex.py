@@ -0,0 +1,161 @@
+import bisect
+import math
+from collections import OrderedDict
+
+import discord
+from unidecode import unidecode
+
+
+# pseudo category of all channels without a category
+NO_CATEGORY = -1
+
+
+class _GuildChannels:
+    """categories and text/voice channels of a guild, with their select labels
+
+       the lists are kept sorted like the client shows them,
+       each entry is (sort key, id, label)
+    """
+
+    def __init__(self, guild: discord.Guild):
+        self.categories = [((-1, NO_CATEGORY), NO_CATEGORY, 'No category')]
+        self.channels = {}  # category id -> entries
+        self._entries = {}  # channel id -> (list, entry)
+
+        for channel in guild.channels:
+            self.add(channel)
+
+
+    def add(self, channel):
+        if isinstance(channel, discord.CategoryChannel):
+            entries = self.categories
+            entry = ((channel.position, channel.id), channel.id, unidecode(channel.name)[:25] or '*unknown category name*')
+
+        elif isinstance(channel, (discord.TextChannel, discord.VoiceChannel)):
+            is_text = isinstance(channel, discord.TextChannel)
+
+            entries = self.channels.setdefault(channel.category_id or NO_CATEGORY, [])
+            # text channels are listed above voice channels
+            entry = ((0 if is_text else 1, channel.position, channel.id), channel.id,
+                     ('#️⃣ ' if is_text else '🔉 ') + unidecode(channel.name)[:23])
+        else:
+            return
+
+        bisect.insort(entries, entry)
+        self._entries[channel.id] = (entries, entry)
+
+
+    def remove(self, channel_id: int):
+        entries, entry = self._entries.pop(channel_id, (None, None))
+        if entries is not None:
+            del entries[bisect.bisect_left(entries, entry)]
+
+
+
+class ChannelIndex:
+    """per-guild index of category -> channels for the channel picker
+
+       a guild is indexed on its first use and then kept
+       up to date by the guild channel events.
+       Rendering a page is O(page), independent of the channel count
+    """
+
+    # discord limit of select options
+    PAGE_SIZE = 25
+
+    # indexed guilds, the least recently used guild is dropped
+    MAX_GUILDS = 1000
+
+    _guilds = OrderedDict()
+
+
+    @staticmethod
+    def _get(guild: discord.Guild) -> _GuildChannels:
+        index = ChannelIndex._guilds.get(guild.id, None)
+        if index is None:
+            index = ChannelIndex._guilds[guild.id] = _GuildChannels(guild)
+            while len(ChannelIndex._guilds) > ChannelIndex.MAX_GUILDS:
+                ChannelIndex._guilds.popitem(last=False)
+        else:
+            ChannelIndex._guilds.move_to_end(guild.id)
+
+        return index
+
+
+    @staticmethod
+    def _page(entries: list, page: int):
+        """
+        Returns:
+            tuple(list, int): (id, label) of the entries on the page, number of pages
+        """
+        page_cnt = max(1, math.ceil(len(entries) / ChannelIndex.PAGE_SIZE))
+        page = page % page_cnt
+
+        start = page * ChannelIndex.PAGE_SIZE
+        return [(e[1], e[2]) for e in entries[start:start+ChannelIndex.PAGE_SIZE]], page_cnt
+
+
+    @staticmethod
+    def categories(guild: discord.Guild, page: int = 0):
+        """categories on the given page, the first entry is NO_CATEGORY
+
+        Args:
+            guild (discord.Guild): guild
+            page (int, optional): page, wraps around. Defaults to 0.
+
+        Returns:
+            tuple(list, int): (id, label) of the categories, number of pages
+        """
+        return ChannelIndex._page(ChannelIndex._get(guild).categories, page)
+
+
+    @staticmethod
+    def channels(guild: discord.Guild, category_id: int, page: int = 0):
+        """text and voice channels of a category on the given page
+
+        Args:
+            guild (discord.Guild): guild
+            category_id (int): category, NO_CATEGORY for channels without category
+            page (int, optional): page, wraps around. Defaults to 0.
+
+        Returns:
+            tuple(list, int): (id, label) of the channels, number of pages
+        """
+        return ChannelIndex._page(ChannelIndex._get(guild).channels.get(category_id, []), page)
+
+
+    @staticmethod
+    def channel_created(channel: discord.abc.GuildChannel):
+        index = ChannelIndex._guilds.get(channel.guild.id, None)
+        if index:
+            index.add(channel)
+
+
+    @staticmethod
+    def channel_updated(channel: discord.abc.GuildChannel):
+        """re-index a renamed/moved channel"""
+        index = ChannelIndex._guilds.get(channel.guild.id, None)
+        if index:
+            index.remove(channel.id)
+            index.add(channel)
+
+
+    @staticmethod
+    def channel_deleted(channel: discord.abc.GuildChannel):
+        index = ChannelIndex._guilds.get(channel.guild.id, None)
+        if index:
+            index.remove(channel.id)
+
+
+    @staticmethod
+    def guild_available(guild_id: int):
+        """the guild was (re-)sent by the gateway, channel events
+           missed during a re-identify are not replayed.
+           The guild is re-indexed on its next use
+        """
+        ChannelIndex._guilds.pop(guild_id, None)
+
+
+    @staticmethod
+    def guild_removed(guild_id: int):
+        ChannelIndex._guilds.pop(guild_id, None)
@@ -0,0 +1,63 @@
+from datetime import datetime
+
+
+class Clock:
+    """source of the current (utc) time for the scheduling code
+
+       all scheduling and interval code must use Clock.utcnow()
+       instead of datetime.utcnow(). Simulations can install
+       another source to advance a virtual time
+    """
+
+    _source = None
+
+
+    @staticmethod
+    def utcnow() -> datetime:
+        """current utc time
+
+        Returns:
+            datetime: non tz-aware utc time
+        """
+        if Clock._source:
+            return Clock._source()
+        return datetime.utcnow()
+
+
+    @staticmethod
+    def install(source):
+        """replace the time source
+
+        Args:
+            source (callable): returns the current non tz-aware utc datetime
+        """
+        Clock._source = source
+
+
+    @staticmethod
+    def reset():
+        """use the system time again"""
+        Clock._source = None
+
+
+
+class VirtualClock:
+    """manually advanced time source, for simulations
+    """
+
+    def __init__(self, start: datetime):
+        self.now = start
+
+
+    def __call__(self) -> datetime:
+        return self.now
+
+
+    def advance(self, delta):
+        self.now += delta
+        return self.now
+
+
+    def set(self, now: datetime):
+        self.now = now
+        return self.now
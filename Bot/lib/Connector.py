@@ -1,4 +1,8 @@
 import os
+import time
+import inspect
+import functools
+import contextvars
 from datetime import datetime
 from enum import Enum
 from typing import Union
@@ -8,6 +12,12 @@ from pymongo import MongoClient
 
 from lib.Reminder import Reminder, IntervalReminder
 from lib.CommunitySettings import CommunitySettings
+from lib.Analytics import Analytics
+from lib.Counters import Counters
+from lib.TTLCache import TTLCache
+from lib.ReminderSearch import ReminderSearch
+from lib.InteractionTiming import InteractionTiming
+from lib.Clock import Clock
 
 
 import logging
@@ -16,12 +26,151 @@ import logging
 
 log = logging.getLogger('Remindme.Connector')
 
+# set while an instrumented operation runs, nested operations are part of the outer one
+_in_operation = contextvars.ContextVar('instrumented_operation', default=False)
+
+# operations which return documents, a None result is a miss
+_READ_PREFIXES = ('get_', 'pop_', '_get_')
+
+
+def _returned_documents(method: str, result):
+    """estimate the number of documents an operation returned
+
+    Args:
+        method (str): name of the operation
+        result: return value of the operation
+
+    Returns:
+        int: document count, None if the result is no document (e.g. a flag or a setter)
+    """
+    if result is None:
+        return 0 if method.startswith(_READ_PREFIXES) else None
+    elif isinstance(result, (list, tuple)):
+        return len(result)
+    elif isinstance(result, (Reminder, CommunitySettings, dict)):
+        return 1
+    else:
+        return None
+
+
+def instrumented(collection: str):
+    """record latency, errors and returned documents of a Connector operation
+       the call count is the _count of the latency histogram
+       only the outermost operation is recorded, calls to other operations are part of its latency
+
+       public operations are forwarded to Connector.backend, if installed.
+       Generators are timed while they produce items (not while the consumer holds them),
+       the yielded items are the returned documents
+
+    Args:
+        collection (str): the collection(s) touched by the operation
+    """
+    def decorator(func):
+        method = func.__name__
+        public = not method.startswith('_')
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            impl = func
+            if public and Connector.backend is not None:
+                impl = getattr(Connector.backend, method)
+
+            if _in_operation.get():
+                return impl(*args, **kwargs)
+
+            token = _in_operation.set(True)
+            start = time.perf_counter()
+            try:
+                with InteractionTiming.phase('db'):
+                    result = impl(*args, **kwargs)
+            except Exception:
+                Analytics.db_operation_failed(method, collection)
+                raise
+            finally:
+                Analytics.db_operation(method, collection, time.perf_counter()-start)
+                _in_operation.reset(token)
+
+            docs = _returned_documents(method, result)
+            if docs is not None:
+                Analytics.db_documents(method, collection, docs)
+            return result
+
+
+        @functools.wraps(func)
+        def gen_wrapper(*args, **kwargs):
+            impl = func
+            if public and Connector.backend is not None:
+                impl = getattr(Connector.backend, method)
+
+            if _in_operation.get():
+                yield from impl(*args, **kwargs)
+                return
+
+            gen = impl(*args, **kwargs)
+            elapsed = 0
+            docs = 0
+            try:
+                while True:
+                    # the guard must not leak to the consumer between the items
+                    token = _in_operation.set(True)
+                    start = time.perf_counter()
+                    try:
+                        with InteractionTiming.phase('db'):
+                            item = next(gen)
+                    except StopIteration:
+                        break
+                    except Exception:
+                        Analytics.db_operation_failed(method, collection)
+                        raise
+                    finally:
+                        elapsed += time.perf_counter()-start
+                        _in_operation.reset(token)
+
+                    docs += 1
+                    yield item
+            finally:
+                gen.close()
+                Analytics.db_operation(method, collection, elapsed)
+                Analytics.db_documents(method, collection, docs)
+
+        return gen_wrapper if inspect.isgeneratorfunction(func) else wrapper
+    return decorator
+
 
 
 class Connector:
 
     client = None
     db = None
+
+    # alternative storage (see StorageBackend), None for MongoDB
+    backend = None
+
+    # delivered reminders are kept for the snooze buttons
+    DELIVERED_TTL = 24*60*60
+
+    # id of the aggregated settings counts in the stats collection
+    SETTINGS_STATS = 'settings'
+
+    # optional scheduling layout, enabled by DUE_BUCKETS
+    # due_buckets references all reminders/intervals due within the same minute
+    due_buckets = False
+    BUCKET_SECONDS = 60
+    DUE_BUCKETS_STATS = 'due_buckets'
+
+    # max. number of search hits
+    SEARCH_LIMIT = 250
+
+    # documents per round trip of an export cursor
+    EXPORT_BATCH_SIZE = 500
+
+    # progress of the reminder schema migration in the stats collection
+    SCHEMA_MIGRATION_STATS = 'schema_migration'
+
+    # settings documents by g_id, None if the instance has no settings
+    # the ttl is lowered by the ChangeListener if no change stream is available
+    settings_cache = TTLCache(ttl=10*60)
+
     class Scope():
         def __init__(self, is_private=False, guild_id=None, user_id=None):
             self.is_private = is_private
@@ -48,6 +197,14 @@ class Connector:
 
     @staticmethod
     def init():
+        if os.getenv('STORAGE_BACKEND', 'mongo') == 'sqlite':
+            from lib.SQLiteBackend import SQLiteBackend
+            Connector.backend = SQLiteBackend(os.getenv('SQLITE_PATH', 'data/remindme.sqlite'))
+
+            Counters.reconcile_reminders(Connector.get_reminder_cnt())
+            Counters.reconcile_intervals(Connector.get_interval_cnt())
+            return
+
         host = os.getenv('MONGO_CONN')
         port = int(os.getenv('MONGO_PORT'))
 
@@ -57,23 +214,374 @@ class Connector:
         Connector.client = MongoClient(host=host, username=uname, password=pw, port=port)
         Connector.db = Connector.client.reminderBot
 
+        Connector.db.delivered.create_index('delivered_at', expireAfterSeconds=Connector.DELIVERED_TTL)
+
+        # every search is bound to a guild (None for DMs), g_id as prefix keeps the scanned keys small
+        # no language: the messages are written in any language, stemming would be wrong for most
+        for collection in (Connector.db.reminders, Connector.db.intervals):
+            collection.create_index([('g_id', pymongo.ASCENDING), ('title', pymongo.TEXT), ('msg', pymongo.TEXT)],
+                                    name='search', default_language='none',
+                                    weights={'title': ReminderSearch.TITLE_WEIGHT, 'msg': ReminderSearch.MSG_WEIGHT})
+
+        Connector._init_settings_stats()
+        Connector._init_due_buckets(bool(os.getenv('DUE_BUCKETS')))
+        Counters.reconcile_reminders(Connector.get_reminder_cnt())
+        Counters.reconcile_intervals(Connector.get_interval_cnt())
+
 
     @staticmethod
-    def delete_guild(guild_id: int):
-        Connector.db.settings.delete_one({'g_id': str(guild_id)})
-        rem_cursor = Connector.db.reminders.delete_many({'g_id': str(guild_id)})
-        intvl_cursor = Connector.db.intervals.delete_many({'g_id': str(guild_id)})
-        
-        return (rem_cursor.deleted_count, intvl_cursor.deleted_count)
+    @instrumented('settings,stats')
+    def _init_settings_stats():
+        """create the aggregated settings counts, if not existing yet
+           this is the only full scan of the settings, all later
+           changes are applied incrementally
+        """
+        if Connector.db.stats.find_one({'_id': Connector.SETTINGS_STATS}, {'_id': 1}):
+            return
+
+        log.info('creating settings stats document')
+        community = Connector.db.settings.count_documents({'community': Connector.CommunityMode.ENABLED.name})
+        experimental = Connector.db.settings.count_documents({'experimental': True})
+
+        # another process might have created the document in the meantime
+        Connector.db.stats.update_one({'_id': Connector.SETTINGS_STATS},
+                                      {'$setOnInsert': {'community': community, 'experimental': experimental}},
+                                      upsert=True)
+
+
+    @staticmethod
+    @instrumented('reminders,intervals,due_buckets,stats')
+    def _init_due_buckets(enabled: bool):
+        """enable/disable the due buckets
+           the buckets are built from all existing reminders once,
+           and dropped when disabled (rebuilt on the next enable)
+        """
+        built = Connector.db.stats.find_one({'_id': Connector.DUE_BUCKETS_STATS}) is not None
+
+        if not enabled:
+            if built:
+                log.info('dropping due buckets')
+                Connector.db.stats.delete_one({'_id': Connector.DUE_BUCKETS_STATS})
+                Connector.db.due_buckets.drop()
+            Connector.due_buckets = False
+            return
+
+        # writes must already maintain the buckets while they are built
+        Connector.due_buckets = True
+        if built:
+            return
+
+        log.info('building due buckets')
+        for collection, field in ((Connector.db.reminders, 'reminders'), (Connector.db.intervals, 'intervals')):
+            ops = []
+            for doc in collection.find({'at': {'$ne': None}}, {'at': 1}):
+                ops.append(pymongo.UpdateOne({'_id': Connector._bucket_of(doc['at'])},
+                                             {'$addToSet': {field: doc['_id']}}, upsert=True))
+                if len(ops) >= 1000:
+                    Connector.db.due_buckets.bulk_write(ops, ordered=False)
+                    ops = []
+            if ops:
+                Connector.db.due_buckets.bulk_write(ops, ordered=False)
+
+        Connector.db.stats.insert_one({'_id': Connector.DUE_BUCKETS_STATS, 'built_at': Clock.utcnow()})
+
+
+    @staticmethod
+    def _snowflake(snowflake: int):
+        """match a snowflake of both schema versions
+           (v1: string, v2: int64)
+        """
+        return {'$in': [str(snowflake), int(snowflake)]}
+
+
+    @staticmethod
+    def _due_before(timestamp: float):
+        """match documents with 'at' before timestamp, for both schema versions
+           mongo only compares values of the same type (v1: float, v2: date)
+        """
+        return {'$or': [{'at': {'$lt': timestamp}},
+                        {'at': {'$lt': datetime.fromtimestamp(timestamp)}}]}
+
+
+    @staticmethod
+    def _timestamp(at):
+        """timestamp of an 'at' value of both schema versions"""
+        if isinstance(at, datetime):
+            return datetime.timestamp(at)
+        return at
+
+
+    @staticmethod
+    def _at_equal(at: datetime):
+        """match documents with 'at' equal to the given time, for both schema versions
+           v1 floats are matched within a millisecond, datetime has no more precision than BSON dates
+        """
+        at_ts = Connector._timestamp(at)
+        return {'$or': [{'at': at},
+                        {'at': {'$gt': at_ts - 0.001, '$lt': at_ts + 0.001}}]}
+
+
+    @staticmethod
+    def _bucket_of(at) -> int:
+        at_ts = Connector._timestamp(at)
+        return int(at_ts // Connector.BUCKET_SECONDS) * Connector.BUCKET_SECONDS
+
+
+    @staticmethod
+    def _bucket_move(field: str, doc_id, old_at: float = None, new_at: float = None):
+        """move the reference of the document into the bucket of new_at
+
+        Args:
+            field (str): 'reminders' or 'intervals'
+            doc_id (ObjectId): id of the referenced document
+            old_at (float, optional): previous timestamp, None if not referenced yet
+            new_at (float, optional): new timestamp, None to only remove the reference
+        """
+        if not Connector.due_buckets:
+            return
+
+        old_bucket = Connector._bucket_of(old_at) if old_at is not None else None
+        new_bucket = Connector._bucket_of(new_at) if new_at is not None else None
+
+        if old_bucket == new_bucket:
+            return
+        if new_bucket is not None:
+            Connector.db.due_buckets.update_one({'_id': new_bucket}, {'$addToSet': {field: doc_id}}, upsert=True)
+        if old_bucket is not None:
+            Connector.db.due_buckets.update_one({'_id': old_bucket}, {'$pull': {field: doc_id}})
+
+
+    @staticmethod
+    def _due_from_buckets(collection, field: str, timestamp: float):
+        """fetch the documents due before timestamp
+           only the buckets up to timestamp are read
+
+        Returns:
+            tuple(list[dict], list): due documents, buckets which were read
+        """
+        buckets = list(Connector.db.due_buckets.find({'_id': {'$lte': timestamp}}, {field: 1}))
+        ids = [doc_id for b in buckets for doc_id in b.get(field, [])]
+
+        if not ids:
+            return ([], buckets)
+
+        docs = list(collection.find({'_id': {'$in': ids}, **Connector._due_before(timestamp)}))
+        return (docs, buckets)
+
+
+    @staticmethod
+    def _release_buckets(field: str, buckets: list, timestamp: float, due_ids: list, released_ids: list):
+        """remove the references of released documents and the stale references of passed buckets
+           stale references (deleted/moved documents) are not removed on the
+           write path, they are cleaned up once their bucket has passed
+
+        Args:
+            due_ids (list): ids of the due documents returned by the scan
+            released_ids (list): due ids which are not referenced anymore (e.g. popped)
+        """
+        due_ids = set(due_ids)
+        released_ids = set(released_ids)
+        ops = []
+
+        for bucket in buckets:
+            passed = bucket['_id'] + Connector.BUCKET_SECONDS <= timestamp
+            pull = [i for i in bucket.get(field, []) if i in released_ids or (passed and i not in due_ids)]
+
+            if pull:
+                ops.append(pymongo.UpdateOne({'_id': bucket['_id']}, {'$pullAll': {field: pull}}))
+
+        if ops:
+            Connector.db.due_buckets.bulk_write(ops, ordered=False)
+
+        Connector.db.due_buckets.delete_many({'_id': {'$lte': timestamp},
+                                              '$and': [{'$or': [{'reminders': {'$size': 0}}, {'reminders': {'$exists': False}}]},
+                                                       {'$or': [{'intervals': {'$size': 0}}, {'intervals': {'$exists': False}}]}]})
+
+
+    @staticmethod
+    @instrumented('stats')
+    def _inc_settings_stats(**deltas):
+        """apply the given deltas to the aggregated settings counts
+
+        Args:
+            deltas (int): change of the count, by name of the count
+        """
+        deltas = {k: v for k, v in deltas.items() if v}
+        if not deltas:
+            return
+
+        stats = Connector.db.stats.find_one_and_update({'_id': Connector.SETTINGS_STATS}, {'$inc': deltas},
+                                                       upsert=True, return_document=pymongo.ReturnDocument.AFTER)
+        Counters.settings_stats(stats)
+
+
+    @staticmethod
+    @instrumented('admin')
+    def ping():
+        """raise if the database is not reachable"""
+        Connector.client.admin.command('ping')
+
+
+    @staticmethod
+    @instrumented('settings,purges')
+    def queue_guild_purge(guild_id: int, shard: int = 0):
+        """drop the settings of the guild and queue its reminders for deletion
+           the reminders are deleted in batches by purge_guild_batch
+        """
+        settings = Connector.db.settings.find_one_and_delete({'g_id': str(guild_id)}, {'community': 1, 'experimental': 1})
+        Connector.settings_cache.invalidate(str(guild_id))
+
+        if settings:
+            Connector._inc_settings_stats(community=-int(settings.get('community') == Connector.CommunityMode.ENABLED.name),
+                                          experimental=-int(settings.get('experimental', False) is True))
+
+        Connector.db.purges.update_one({'_id': str(guild_id)},
+                                       {'$setOnInsert': {'shard': shard, 'queued_at': Clock.utcnow(),
+                                                         'reminders': 0, 'intervals': 0}},
+                                       upsert=True)
+
+
+    @staticmethod
+    @instrumented('purges')
+    def get_pending_purges():
+        """return the queued guild purges
+
+        Returns:
+            list[dict]: purge documents, the guild id is the _id
+        """
+        return list(Connector.db.purges.find({}))
+
+
+    @staticmethod
+    @instrumented('reminders,intervals,purges')
+    def purge_guild_batch(guild_id: int, batch_size: int):
+        """delete up to batch_size reminders of the guild,
+           intervals are deleted once all reminders are gone
+
+        Returns:
+            tuple(int, int): deleted reminders and intervals of this batch
+        """
+
+        for collection, field in ((Connector.db.reminders, 'reminders'), (Connector.db.intervals, 'intervals')):
+            ids = [doc['_id'] for doc in collection.find({'g_id': Connector._snowflake(guild_id)}, {'_id': 1}).limit(batch_size)]
+            if not ids:
+                continue
+
+            deleted = collection.delete_many({'_id': {'$in': ids}}).deleted_count
+            Connector.db.purges.update_one({'_id': str(guild_id)}, {'$inc': {field: deleted}})
+
+            if field == 'reminders':
+                Counters.reminders_changed(-deleted)
+                return (deleted, 0)
+            else:
+                Counters.intervals_changed(-deleted)
+                return (0, deleted)
+
+        return (0, 0)
+
+
+    @staticmethod
+    @instrumented('purges')
+    def finish_guild_purge(guild_id: int):
+        """remove the guild from the purge queue
+
+        Returns:
+            dict: the purge document with the total deleted counts, None if not queued
+        """
+        return Connector.db.purges.find_one_and_delete({'_id': str(guild_id)})
+
+
+    @staticmethod
+    @instrumented('reminders,intervals,stats')
+    def migrate_schema_batch(kind: str, batch_size: int):
+        """convert the next batch of documents into the current schema version
+           the progress is kept in the stats collection, the migration
+           continues after the last converted document after a restart
+
+        Args:
+            kind (str): 'reminders' or 'intervals'
+            batch_size (int): documents read per batch
+
+        Returns:
+            tuple(int, bool): converted documents, True if the collection is done
+        """
+        collection = Connector.db[kind]
+        rem_class = Reminder if kind == 'reminders' else IntervalReminder
+
+        # the progress is kept per schema version, a new version starts from the first document
+        progress_id = f'{Connector.SCHEMA_MIGRATION_STATS}_v{Reminder.SCHEMA_VERSION}'
+        progress = Connector.db.stats.find_one({'_id': progress_id}) or {}
+        if progress.get(f'{kind}_done'):
+            return (0, True)
+
+        query = {}
+        if progress.get(kind):
+            query['_id'] = {'$gt': progress[kind]}
+
+        docs = list(collection.find(query).sort('_id', pymongo.ASCENDING).limit(batch_size))
+        if not docs:
+            Connector.db.stats.update_one({'_id': progress_id}, {'$set': {f'{kind}_done': True}}, upsert=True)
+            return (0, True)
+
+        ops = []
+        for doc in docs:
+            if doc.get('v') == Reminder.SCHEMA_VERSION:
+                continue
+
+            reminder = rem_class(doc)
+
+            # keep fields which are unknown to the Reminder class
+            new_doc = {k: v for k, v in doc.items() if k not in vars(reminder) and v is not None}
+            new_doc.update(reminder._to_json())
+
+            # the filter skips documents which were modified since they were read
+            ops.append(pymongo.ReplaceOne(doc, new_doc))
+
+        converted = 0
+        if ops:
+            converted = collection.bulk_write(ops, ordered=False).modified_count
+
+        Connector.db.stats.update_one({'_id': progress_id}, {'$set': {kind: docs[-1]['_id']}}, upsert=True)
+        return (converted, False)
+
+
+    @staticmethod
+    def _get_settings(instance_id: int):
+        """return the settings document of the instance, served from the cache if possible
+
+        Returns:
+            dict: the settings, None if the instance has no settings
+        """
+        key = str(instance_id)
+
+        if Connector.settings_cache.contains(key):
+            return Connector.settings_cache.get(key)
+
+        settings = Connector.db.settings.find_one({'g_id': key})
+        Connector.settings_cache.set(key, settings, alias=settings['_id'] if settings else None)
+        return settings
 
 
     @staticmethod
+    def _update_settings(instance_id: int, update: dict, projection: dict = None):
+        """upsert the settings of the instance and drop them from the cache
+
+        Returns:
+            dict: the settings before the update, None if not existing
+        """
+        old = Connector.db.settings.find_one_and_update({'g_id': str(instance_id)}, update, projection, upsert=True)
+        Connector.settings_cache.invalidate(str(instance_id))
+        return old
+
+
+    @staticmethod
+    @instrumented('settings')
     def get_timezone(instance_id: int):
         
         # the settings key is 'g_id'
         # however guilds aswell as user ids are supported as key
         # for backwards compatibility with the database, the key name wasn't changed to instance_id
-        tz_json = Connector.db.settings.find_one({'g_id': str(instance_id)}, {'timezone': 1})
+        tz_json = Connector._get_settings(instance_id)
 
         if not tz_json:
             return 'UTC'
@@ -82,19 +590,21 @@ class Connector:
 
 
     @staticmethod
+    @instrumented('settings')
     def set_timezone(instance_id: int, timezone_str):
         
         # the settings key is 'g_id'
         # however guilds aswell as user ids are supported as key
         # for backwards compatibility with the database, the key name wasn't changed to instance_id
-        Connector.db.settings.find_one_and_update({'g_id': str(instance_id)}, {'$set': {'timezone': timezone_str}}, new=False, upsert=True)
+        Connector._update_settings(instance_id, {'$set': {'timezone': timezone_str}})
         
         
     @staticmethod
+    @instrumented('settings')
     def  get_reminder_type(instance_id: int) -> ReminderType:
         
         # keep g_id as key for backwards compatibility
-        rem_json = Connector.db.settings.find_one({'g_id': str(instance_id)}, {'reminder_type': 1})
+        rem_json = Connector._get_settings(instance_id)
         
         if not rem_json:
             return Connector.ReminderType.HYBRID
@@ -103,16 +613,18 @@ class Connector:
     
         
     @staticmethod
+    @instrumented('settings')
     def set_auto_delete(instance_id: int, delete_type: AutoDelete):
         
         # keep g_id as key for backwards compatibility
-        Connector.db.settings.find_one_and_update({'g_id': str(instance_id)}, {'$set': {'auto_delete': delete_type.name}}, new=False, upsert=True)
+        Connector._update_settings(instance_id, {'$set': {'auto_delete': delete_type.name}})
         
     @staticmethod
+    @instrumented('settings')
     def  get_auto_delete(instance_id: int):
         
         # keep g_id as key for backwards compatibility
-        rem_json = Connector.db.settings.find_one({'g_id': str(instance_id)}, {'auto_delete': 1})
+        rem_json = Connector._get_settings(instance_id)
         
         if not rem_json:
             return Connector.AutoDelete.TIMEOUT
@@ -120,16 +632,22 @@ class Connector:
             return Connector.AutoDelete[rem_json.get('auto_delete', Connector.AutoDelete.TIMEOUT.name)]
         
     @staticmethod
+    @instrumented('settings')
     def set_community_mode(instance_id: int, comm_type: CommunityMode):
         
         # keep g_id as key for backwards compatibility
-        Connector.db.settings.find_one_and_update({'g_id': str(instance_id)}, {'$set': {'community': comm_type.name}}, new=False, upsert=True)
+        old = Connector._update_settings(instance_id, {'$set': {'community': comm_type.name}}, {'community': 1})
+
+        was_enabled = bool(old) and old.get('community') == Connector.CommunityMode.ENABLED.name
+        is_enabled = comm_type == Connector.CommunityMode.ENABLED
+        Connector._inc_settings_stats(community=int(is_enabled)-int(was_enabled))
         
     @staticmethod
+    @instrumented('settings')
     def get_community_mode(instance_id: int):
         
         # keep g_id as key for backwards compatibility
-        rem_json = Connector.db.settings.find_one({'g_id': str(instance_id)}, {'community': 1})
+        rem_json = Connector._get_settings(instance_id)
         
         if not rem_json:
             return Connector.CommunityMode.DISABLED
@@ -138,21 +656,24 @@ class Connector:
 
 
     @staticmethod
+    @instrumented('settings')
     def get_legacy_interval_count():
         return Connector.db.settings.count_documents({'legacy_interval': True})
 
 
     @staticmethod
+    @instrumented('settings')
     def set_legacy_interval(instance_id: int, mode: bool):
-        Connector.db.settings.find_one_and_update({'g_id': str(instance_id)}, {'$set': {'legacy_interval': mode}}, new=False, upsert=True)
+        Connector._update_settings(instance_id, {'$set': {'legacy_interval': mode}})
 
 
     @staticmethod
+    @instrumented('settings')
     def is_legacy_interval(instance_id: int) -> bool:
         """check if the instance uses legacy intervals
            if no entry exists, legacy is assumed for backwards compatibility
         """
-        exp_json = Connector.db.settings.find_one({'g_id': str(instance_id)}, {'legacy_interval': 1})
+        exp_json = Connector._get_settings(instance_id)
         
         if not exp_json:
             return True
@@ -161,18 +682,25 @@ class Connector:
 
 
     @staticmethod
+    @instrumented('stats')
     def get_experimental_count():
-        return Connector.db.settings.count_documents({'experimental': True})
+        stats = Connector.db.stats.find_one({'_id': Connector.SETTINGS_STATS}, {'experimental': 1})
+        return stats.get('experimental', 0) if stats else 0
 
 
     @staticmethod
+    @instrumented('settings')
     def set_experimental(instance_id: int, mode: bool):
-        Connector.db.settings.find_one_and_update({'g_id': str(instance_id)}, {'$set': {'experimental': mode}}, new=False, upsert=True)
+        old = Connector._update_settings(instance_id, {'$set': {'experimental': mode}}, {'experimental': 1})
+
+        was_enabled = bool(old) and old.get('experimental', False) is True
+        Connector._inc_settings_stats(experimental=int(mode is True)-int(was_enabled))
     
     @staticmethod
+    @instrumented('settings')
     def is_experimental(instance_id: int):
         
-        exp_json = Connector.db.settings.find_one({'g_id': str(instance_id)}, {'experimental': 1})
+        exp_json = Connector._get_settings(instance_id)
         
         if not exp_json:
             return False
@@ -181,31 +709,36 @@ class Connector:
 
 
     @staticmethod
+    @instrumented('stats')
     def get_community_count():
-        return Connector.db.settings.count_documents({'community': 'ENABLED'})
+        stats = Connector.db.stats.find_one({'_id': Connector.SETTINGS_STATS}, {'community': 1})
+        return stats.get('community', 0) if stats else 0
 
 
     @staticmethod
+    @instrumented('settings')
     def set_community_settings(instance_id: int, settings: CommunitySettings) -> CommunitySettings:
         
         settings_json = settings._to_json()
-        Connector.db.settings.find_one_and_update({'g_id': str(instance_id)}, {'$set': {'community_settings': settings_json}}, new=False, upsert=True)
+        Connector._update_settings(instance_id, {'$set': {'community_settings': settings_json}})
     
     
     @staticmethod
+    @instrumented('settings')
     def set_community_setting(instance_id: int, setting_name: str, value: bool):
         
         dummy_settings = CommunitySettings()
         if not hasattr(dummy_settings, setting_name):
             raise ValueError(f'{setting_name} is not an attribute of CommunitySettings')
         
-        Connector.db.settings.find_one_and_update({'g_id': str(instance_id)}, {'$set': {f'community_settings.{setting_name}': value}}, new=False, upsert=True)
+        Connector._update_settings(instance_id, {'$set': {f'community_settings.{setting_name}': value}})
     
     @staticmethod
+    @instrumented('settings')
     def get_community_settings(instance_id: int) -> CommunitySettings:
         
         # keep g_id as key for backwards compatibility
-        comm_json = Connector.db.settings.find_one({'g_id': str(instance_id)}, {'community_settings': 1})
+        comm_json = Connector._get_settings(instance_id)
         
         if not comm_json:
             return CommunitySettings()
@@ -214,6 +747,7 @@ class Connector:
 
 
     @staticmethod
+    @instrumented('settings')
     def set_moderators(guild_id: int, moderators: list[Union[int, str]]):
         """set a list as new moderators, this list overwrites all existing mods
 
@@ -223,14 +757,15 @@ class Connector:
         """
         
         # keep g_id as key for backwards compatibility
-        Connector.db.settings.find_one_and_update({'g_id': str(guild_id)}, {'$set': {'moderators': list(map(str, moderators))}}, new=False, upsert=True)
+        Connector._update_settings(guild_id, {'$set': {'moderators': list(map(str, moderators))}})
 
 
     @staticmethod
+    @instrumented('settings')
     def get_moderators(instance_id: int):
         
         # keep g_id as key for backwards compatibility
-        mod_json = Connector.db.settings.find_one({'g_id': str(instance_id)}, {'moderators': 1})
+        mod_json = Connector._get_settings(instance_id)
         
         if not mod_json:
             return []
@@ -238,6 +773,7 @@ class Connector:
             return list(map(int, mod_json.get('moderators', [])))
     
     @staticmethod
+    @instrumented('settings')
     def is_moderator(user_roles: list):
         """check if any of the user roles are within the noted moderator lists
            query is implicitely protected from cross-guild access
@@ -277,13 +813,15 @@ class Connector:
 
         
     @staticmethod
+    @instrumented('settings')
     def set_reminder_type(instance_id: int, reminder_type: ReminderType):
         
         # keep g_id as key for backwards compatibility
-        Connector.db.settings.find_one_and_update({'g_id': str(instance_id)}, {'$set': {'reminder_type': reminder_type.name}}, new=False, upsert=True)
+        Connector._update_settings(instance_id, {'$set': {'reminder_type': reminder_type.name}})
 
 
     @staticmethod
+    @instrumented('reminders')
     def add_reminder(reminder: Reminder):
         """save the reminder into the database
 
@@ -293,17 +831,25 @@ class Connector:
         Returns:
             ObjectId: id of the database entry
         """
-        insert_obj = Connector.db.reminders.insert_one(reminder._to_json())
+        rem_js = reminder._to_json()
+        insert_obj = Connector.db.reminders.insert_one(rem_js)
+        Connector._bucket_move('reminders', insert_obj.inserted_id, new_at=rem_js.get('at'))
+        Counters.reminders_changed(1)
         return insert_obj.inserted_id
 
     @staticmethod
+    @instrumented('intervals')
     def add_interval(interval: IntervalReminder):
         
-        insert_obj = Connector.db.intervals.insert_one(interval._to_json())
+        intvl_js = interval._to_json()
+        insert_obj = Connector.db.intervals.insert_one(intvl_js)
+        Connector._bucket_move('intervals', insert_obj.inserted_id, new_at=intvl_js.get('at'))
+        Counters.intervals_changed(1)
         return insert_obj.inserted_id
 
 
     @staticmethod
+    @instrumented('intervals')
     def update_interval_rules(interval: IntervalReminder):
 
         intvl_js = interval._to_json()
@@ -313,35 +859,45 @@ class Connector:
                                                                                     'exrules': intvl_js['exrules']}}, new=False, upsert=False)
 
     @staticmethod
+    @instrumented('reminders')
     def update_reminder_at(reminder: Reminder):
 
-        at_ts = reminder._to_json()['at']
-        Connector.db.reminders.find_one_and_update({'_id': reminder._id}, {'$set': {'at': at_ts}}, new=False, upsert=False)
+        old = Connector.db.reminders.find_one_and_update({'_id': reminder._id}, {'$set': {'at': reminder.at}}, {'at': 1}, new=False, upsert=False)
+
+        if old:
+            Connector._bucket_move('reminders', reminder._id, old.get('at'), reminder.at)
 
 
     @staticmethod
+    @instrumented('intervals')
     def update_interval_at(interval: IntervalReminder):
         
         if not interval.at:
             log.warning(f'Orphaned interval reminder {interval._id}.')
-            at_ts = None
+            update = {'$unset': {'at': ''}}
         else:
-            at_ts = interval._to_json()['at']
+            update = {'$set': {'at': interval.at}}
+
+        old = Connector.db.intervals.find_one_and_update({'_id': interval._id}, update, {'at': 1}, new=False, upsert=False)
 
-        Connector.db.intervals.find_one_and_update({'_id': interval._id}, {'$set': {'at': at_ts}}, new=False, upsert=False)
+        if old:
+            Connector._bucket_move('intervals', interval._id, old.get('at'), interval.at)
 
 
     @staticmethod
+    @instrumented('intervals')
     def delete_orphaned_intervals():
 
         op = Connector.db.intervals.delete_many({'at': {'$eq': None}})
+        Counters.intervals_changed(-op.deleted_count)
         return op.deleted_count
 
 
     @staticmethod
+    @instrumented('reminders')
     def get_elapsed_reminders(timestamp):
 
-        rems =  list(Connector.db.reminders.find({'at': {'$lt': timestamp}}))
+        rems =  list(Connector.db.reminders.find(Connector._due_before(timestamp)))
         rems = list(map(Reminder, rems))
 
         # this method gets the entries
@@ -350,36 +906,67 @@ class Connector:
 
 
     @staticmethod
+    @instrumented('reminders,delivered,due_buckets')
     def pop_elapsed_reminders(timestamp):
 
-        rems =  list(Connector.db.reminders.find({'at': {'$lt': timestamp}}))
-        rems = list(map(Reminder, rems))
+        if Connector.due_buckets:
+            rem_docs, buckets = Connector._due_from_buckets(Connector.db.reminders, 'reminders', timestamp)
+        else:
+            rem_docs =  list(Connector.db.reminders.find(Connector._due_before(timestamp)))
+        rems = list(map(Reminder, rem_docs))
+
+        # keep a copy for the snooze buttons of the delivered message
+        # the copy is dropped by the ttl index
+        # upsert, the copy may already exist (crash before the delete, concurrent pop)
+        if rem_docs:
+            delivered_at = datetime.utcnow()
+            for doc in rem_docs:
+                doc['delivered_at'] = delivered_at
+            Connector.db.delivered.bulk_write([pymongo.ReplaceOne({'_id': doc['_id']}, doc, upsert=True) for doc in rem_docs],
+                                              ordered=False)
 
         # this method pops the entries
-        Connector.db.reminders.delete_many({'at': {'$lt': timestamp}})
+        if Connector.due_buckets:
+            rem_ids = [doc['_id'] for doc in rem_docs]
+            op = Connector.db.reminders.delete_many({'_id': {'$in': rem_ids}})
+            Connector._release_buckets('reminders', buckets, timestamp, rem_ids, rem_ids)
+        else:
+            op = Connector.db.reminders.delete_many(Connector._due_before(timestamp))
+        Counters.reminders_changed(-op.deleted_count)
 
         return rems
 
     @staticmethod
+    @instrumented('intervals,due_buckets')
     def get_pending_intervals(timestamp):
 
-        intvl =  list(Connector.db.intervals.find({'at': {'$lt': timestamp}}))
+        if Connector.due_buckets:
+            # the references are moved by update_interval_at
+            intvl, buckets = Connector._due_from_buckets(Connector.db.intervals, 'intervals', timestamp)
+            Connector._release_buckets('intervals', buckets, timestamp, [i['_id'] for i in intvl], [])
+        else:
+            intvl =  list(Connector.db.intervals.find(Connector._due_before(timestamp)))
         intvl = list(map(IntervalReminder, intvl))
 
         return intvl
 
 
     @staticmethod
+    @instrumented('reminders')
     def get_reminder_cnt():
-        return Connector.db.reminders.count_documents({})
+        """estimated count from the collection metadata"""
+        return Connector.db.reminders.estimated_document_count()
 
 
     @staticmethod
+    @instrumented('intervals')
     def get_interval_cnt():
-        return Connector.db.intervals.count_documents({})
+        """estimated count from the collection metadata"""
+        return Connector.db.intervals.estimated_document_count()
 
 
     @staticmethod
+    @instrumented('reminders')
     def get_reminder_by_id(reminder_id):
 
         reminder = Connector.db.reminders.find_one({'_id': reminder_id})
@@ -390,6 +977,7 @@ class Connector:
             return None
         
     @staticmethod
+    @instrumented('intervals')
     def get_interval_by_id(interval_id):
 
         interval = Connector.db.intervals.find_one({'_id': interval_id})
@@ -401,6 +989,24 @@ class Connector:
 
 
     @staticmethod
+    @instrumented('delivered,intervals')
+    def get_snoozable_by_id(reminder_id):
+        """return the reminder/interval a delivered message belongs to
+           delivered reminders are only kept for DELIVERED_TTL
+
+           None if id not found
+        """
+
+        reminder = Connector.db.delivered.find_one({'_id': reminder_id})
+
+        if reminder:
+            return Reminder(reminder)
+        else:
+            return Connector.get_interval_by_id(reminder_id)
+
+
+    @staticmethod
+    @instrumented('reminders,intervals')
     def get_author_of_id(reminder_id):
         """return the author id of the given reminder id
            can be a plain reminder or an interval
@@ -421,6 +1027,7 @@ class Connector:
 
 
     @staticmethod
+    @instrumented('reminders')
     def delete_reminder(reminder_id):
         """delete the reminder with the given id
 
@@ -428,10 +1035,12 @@ class Connector:
             bool: True if reminder deleted successfully
         """
         action = Connector.db.reminders.delete_one({'_id': reminder_id})
+        Counters.reminders_changed(-action.deleted_count)
         return (action.deleted_count > 0)
 
 
     @staticmethod
+    @instrumented('intervals')
     def delete_interval(reminder_id):
         """delete the reminder with the given id
 
@@ -439,11 +1048,180 @@ class Connector:
             bool: True if reminder deleted successfully
         """
         action = Connector.db.intervals.delete_one({'_id': reminder_id})
+        Counters.intervals_changed(-action.deleted_count)
         return (action.deleted_count > 0)
 
 
 
     @staticmethod
+    def _bulk_write(reminders: list, make_op):
+        """one bulk_write per collection for the given reminders/intervals
+
+        Args:
+            reminders (list): Reminder and IntervalReminder objects
+            make_op (callable): returns the write operation of a reminder, None to skip it
+
+        Returns:
+            tuple(BulkWriteResult, BulkWriteResult): result of reminders and intervals, None if no operation
+        """
+        results = []
+        for collection, is_interval in ((Connector.db.reminders, False), (Connector.db.intervals, True)):
+            ops = [make_op(r) for r in reminders if isinstance(r, IntervalReminder) == is_interval]
+            ops = [op for op in ops if op is not None]
+
+            results.append(collection.bulk_write(ops, ordered=False) if ops else None)
+
+        return tuple(results)
+
+
+    @staticmethod
+    @instrumented('reminders,intervals')
+    def bulk_delete(reminders: list):
+        """delete all given reminders/intervals
+
+        Args:
+            reminders (list): Reminder and IntervalReminder objects
+
+        Returns:
+            tuple(int, int): number of deleted reminders and intervals
+        """
+        rem_res, intvl_res = Connector._bulk_write(reminders, lambda r: pymongo.DeleteOne({'_id': r._id}))
+
+        rem_cnt = rem_res.deleted_count if rem_res else 0
+        intvl_cnt = intvl_res.deleted_count if intvl_res else 0
+
+        Counters.reminders_changed(-rem_cnt)
+        Counters.intervals_changed(-intvl_cnt)
+        return (rem_cnt, intvl_cnt)
+
+
+    @staticmethod
+    @instrumented('reminders,intervals')
+    def bulk_set_channel(reminders: list, channel_id: int, channel_name: str):
+        """move all given reminders/intervals into the channel
+
+        Returns:
+            int: number of modified documents
+        """
+        update = {'$set': {'ch_id': int(channel_id), 'ch_name': str(channel_name)}}
+        results = Connector._bulk_write(reminders, lambda r: pymongo.UpdateOne({'_id': r._id}, update))
+
+        return sum(res.modified_count for res in results if res)
+
+
+    @staticmethod
+    @instrumented('reminders,intervals')
+    def bulk_shift(reminders: list, delta):
+        """delay the next occurrence of all given reminders/intervals
+           documents which were delivered (at changed) since they were read are skipped
+
+        Args:
+            reminders (list): Reminder and IntervalReminder objects
+            delta (timedelta, relativedelta): the shift, applied to the 'at' of each reminder
+
+        Returns:
+            int: number of modified documents
+        """
+        def shift(r):
+            if not r.at:
+                return None
+            return pymongo.UpdateOne({'_id': r._id, **Connector._at_equal(r.at)}, {'$set': {'at': r.at + delta}})
+
+        results = Connector._bulk_write(reminders, shift)
+
+        if Connector.due_buckets:
+            ops = []
+            for res, collection, field in zip(results, (Connector.db.reminders, Connector.db.intervals), ('reminders', 'intervals')):
+                if not res or not res.modified_count:
+                    continue
+
+                shifted = [r for r in reminders if r.at and isinstance(r, IntervalReminder) == (field == 'intervals')]
+                if res.modified_count < len(shifted):
+                    # some were delivered since they were read, their bucket is maintained by the delivery
+                    docs = collection.find({'_id': {'$in': [r._id for r in shifted]}}, {'at': 1})
+                    new_at = {doc['_id']: Connector._timestamp(doc.get('at')) for doc in docs}
+                    shifted = [r for r in shifted if new_at.get(r._id) is not None and
+                                                     abs(new_at[r._id] - Connector._timestamp(r.at + delta)) < 0.001]
+
+                for r in shifted:
+                    old_bucket, new_bucket = Connector._bucket_of(r.at), Connector._bucket_of(r.at + delta)
+                    if old_bucket != new_bucket:
+                        ops.append(pymongo.UpdateOne({'_id': new_bucket}, {'$addToSet': {field: r._id}}, upsert=True))
+                        ops.append(pymongo.UpdateOne({'_id': old_bucket}, {'$pull': {field: r._id}}))
+            if ops:
+                Connector.db.due_buckets.bulk_write(ops, ordered=False)
+
+        return sum(res.modified_count for res in results if res)
+
+
+    @staticmethod
+    @instrumented('reminders,intervals')
+    def bulk_insert(reminders: list):
+        """save all given reminders/intervals, one unordered insert_many per collection
+           a rejected document does not abort the others.
+           The _id of each inserted reminder is set
+
+        Args:
+            reminders (list): Reminder and IntervalReminder objects
+
+        Returns:
+            list: (reminder, error message) of the rejected documents
+        """
+        failed = []
+
+        for collection, field, is_interval in ((Connector.db.reminders, 'reminders', False), (Connector.db.intervals, 'intervals', True)):
+            batch = [r for r in reminders if isinstance(r, IntervalReminder) == is_interval]
+            if not batch:
+                continue
+
+            docs = [r._to_json() for r in batch]
+            try:
+                collection.insert_many(docs, ordered=False)
+                errors = {}
+            except pymongo.errors.BulkWriteError as e:
+                errors = {err['index']: err.get('errmsg', 'write error') for err in e.details.get('writeErrors', [])}
+
+            inserted = []
+            for idx, (rem, doc) in enumerate(zip(batch, docs)):
+                if idx in errors:
+                    failed.append((rem, errors[idx]))
+                else:
+                    # insert_many sets the _id of the document
+                    rem._id = doc['_id']
+                    inserted.append(rem)
+
+            if Connector.due_buckets:
+                buckets = {}
+                for rem in filter(lambda r: r.at, inserted):
+                    buckets.setdefault(Connector._bucket_of(rem.at), []).append(rem._id)
+
+                ops = [pymongo.UpdateOne({'_id': bucket}, {'$addToSet': {field: {'$each': ids}}}, upsert=True) for bucket, ids in buckets.items()]
+                if ops:
+                    Connector.db.due_buckets.bulk_write(ops, ordered=False)
+
+            if is_interval:
+                Counters.intervals_changed(len(inserted))
+            else:
+                Counters.reminders_changed(len(inserted))
+
+        return failed
+
+
+    @staticmethod
+    def _update_label(collection, before: dict, title: str, msg: str):
+        """store the label after the title or message of a reminder changed
+
+        Args:
+            collection (Collection): collection of the reminder
+            before (dict): the document before the change
+        """
+        label = Reminder.make_label(title, msg)
+        if label != before.get('label', None):
+            collection.update_one({'_id': before['_id']}, {'$set': {'label': label}})
+
+
+    @staticmethod
+    @instrumented('reminders,intervals')
     def set_reminder_message(reminder_id, message: str):
         """set the message of the given reminder
            can be Reminder or Interval
@@ -457,19 +1235,25 @@ class Connector:
             _type_: _description_
         """
 
-        result = Connector.db.reminders.find_one_and_update({
+        collection = Connector.db.reminders
+        result = collection.find_one_and_update({
             '_id': reminder_id,}, {'$set': {'msg': message}}, new=False, upsert=False
         )
 
         if not result:
-            result = Connector.db.intervals.find_one_and_update({
+            collection = Connector.db.intervals
+            result = collection.find_one_and_update({
             '_id': reminder_id,}, {'$set': {'msg': message}}, new=False, upsert=False
         )
 
+        if result:
+            Connector._update_label(collection, result, result.get('title', None), message)
+
         return (result is not None)
 
 
     @staticmethod
+    @instrumented('reminders,intervals')
     def set_reminder_title(reminder_id, title: str):
         """set the optional title for the given reminder Id
            can be Reminder or Interval
@@ -483,18 +1267,30 @@ class Connector:
             bool: True if set was successfull
         """
 
-        result = Connector.db.reminders.find_one_and_update({
-            '_id': reminder_id,}, {'$set': {'title': title}}, new=False, upsert=False
+        # the label falls back to the message if the title has no ascii representation
+        update = {'title': title}
+        label = Reminder.make_label(title, None)
+        if label:
+            update['label'] = label
+
+        collection = Connector.db.reminders
+        result = collection.find_one_and_update({
+            '_id': reminder_id,}, {'$set': update}, new=False, upsert=False
         )
 
         if not result:
-            result = Connector.db.intervals.find_one_and_update({
-            '_id': reminder_id,}, {'$set': {'title': title}}, new=False, upsert=False
+            collection = Connector.db.intervals
+            result = collection.find_one_and_update({
+            '_id': reminder_id,}, {'$set': update}, new=False, upsert=False
         )
 
+        if result and not label:
+            Connector._update_label(collection, result, title, result.get('msg', None))
+
         return (result is not None)
 
     @staticmethod
+    @instrumented('reminders,intervals')
     def set_reminder_img_url(reminder_id, img_url: str):
         """set the optional image url for the given reminder Id
            can be Reminder or Interval
@@ -520,6 +1316,7 @@ class Connector:
 
 
     @staticmethod
+    @instrumented('reminders,intervals')
     def set_reminder_channel(reminder_id, channel_id: int, channel_name:str=None):
         """change the channel id of a given reminder
            method tries to find reminder, if not exists
@@ -535,25 +1332,25 @@ class Connector:
         # upsert with channel_name
         if channel_name:
             result = Connector.db.reminders.find_one_and_update({'_id': reminder_id}, 
-                                                            {'$set': {'ch_id': str(channel_id), 'ch_name': str(channel_name)}}, 
+                                                            {'$set': {'ch_id': int(channel_id), 'ch_name': str(channel_name)}}, 
                                                             new=False, 
                                                             upsert=False)
             if not result:
                 result = Connector.db.intervals.find_one_and_update({'_id': reminder_id}, 
-                                                                {'$set': {'ch_id': str(channel_id), 'ch_name': str(channel_name)}}, 
+                                                                {'$set': {'ch_id': int(channel_id), 'ch_name': str(channel_name)}}, 
                                                                 new=False, 
                                                                 upsert=False)
 
         # upsert without channel name
         else:
             result = Connector.db.reminders.find_one_and_update({'_id': reminder_id}, 
-                                                            {'$set': {'ch_id': str(channel_id)}}, 
+                                                            {'$set': {'ch_id': int(channel_id)}}, 
                                                             new=False, 
                                                             upsert=False)
         
             if not result:
                 result = Connector.db.intervals.find_one_and_update({'_id': reminder_id}, 
-                                                                    {'$set': {'ch_id': str(channel_id)}}, 
+                                                                    {'$set': {'ch_id': int(channel_id)}}, 
                                                                     new=False, 
                                                                     upsert=False)
             
@@ -561,6 +1358,68 @@ class Connector:
         
     
     @staticmethod
+    def _has_guild_scope(scope: Scope, user_roles=[]) -> bool:
+        """True if the user can access the reminders of all guild members
+           requires community mode and moderator permissions
+        """
+        if scope.guild_id and Connector.get_community_mode(scope.guild_id) == Connector.CommunityMode.ENABLED:
+            return Connector.is_moderator(user_roles)
+        return False
+
+
+    @staticmethod
+    def _scope_filter(scope: Scope, all_users=False):
+        """query filter of the reminders in the scope
+
+        Args:
+            scope (Scope): request scope (guild or private, always user bound)
+            all_users (bool, optional): include the reminders of all guild members. Defaults to False.
+
+        Returns:
+            dict: filter, None if the scope holds no reminders
+        """
+        if all_users and scope.guild_id:
+            return {'g_id': Connector._snowflake(scope.guild_id)}
+        elif scope.is_private and scope.user_id:
+            return {'g_id': None, 'author': Connector._snowflake(scope.user_id)}
+        elif scope.user_id and scope.guild_id:
+            return {'g_id': Connector._snowflake(scope.guild_id), 'author': Connector._snowflake(scope.user_id)}
+        else:
+            return None
+
+
+    @staticmethod
+    @instrumented('reminders,intervals')
+    def iter_reminders(scope: Scope, user_roles=[], all_users=False, batch_size=None):
+        """stream the reminders, then the intervals of the scope
+           the scope is the same as for get_guild_reminders.
+           The cursors fetch batch_size documents per round trip,
+           only one batch is held in memory (unsorted)
+
+        Args:
+            scope (Scope): request scope (guild or private, always user bound)
+            user_roles (list, optional): all roles of the user on given server. Defaults to [].
+            all_users (bool, optional): include the reminders of all guild members, without permission check. Defaults to False.
+            batch_size (int, optional): documents per batch. Defaults to EXPORT_BATCH_SIZE.
+
+        Yields:
+            Reminder: reminder or interval
+        """
+        all_users = all_users or Connector._has_guild_scope(scope, user_roles)
+        query_filter = Connector._scope_filter(scope, all_users)
+        if query_filter is None:
+            return
+
+        batch_size = batch_size or Connector.EXPORT_BATCH_SIZE
+
+        for collection, rem_class in ((Connector.db.reminders, Reminder), (Connector.db.intervals, IntervalReminder)):
+            with collection.find(query_filter, batch_size=batch_size) as cursor:
+                for doc in cursor:
+                    yield rem_class(doc)
+
+
+    @staticmethod
+    @instrumented('settings,reminders,intervals')
     def get_guild_reminders(scope: Scope, user_roles=[], sort_return=True):
         """request all reminders/intervals of the given guild
            will only return foreign reminders if all conditions are true
@@ -575,21 +1434,15 @@ class Connector:
         Returns:
             list: list of reminders
         """
-        has_perms = False
-
-        if scope.guild_id and Connector.get_community_mode(scope.guild_id) == Connector.CommunityMode.ENABLED:
-            if Connector.is_moderator(user_roles):
-                has_perms = True
-            
-        if not has_perms:
+        if not Connector._has_guild_scope(scope, user_roles):
             return Connector.get_scoped_reminders(scope, sort_return=sort_return)
         
         guild_id = scope.guild_id
         
-        rems = list(Connector.db.reminders.find({'g_id': str(guild_id)}))
+        rems = list(Connector.db.reminders.find({'g_id': Connector._snowflake(guild_id)}))
         rems = list(map(Reminder, rems))
 
-        intvl = list(Connector.db.intervals.find({'g_id': str(guild_id)}))
+        intvl = list(Connector.db.intervals.find({'g_id': Connector._snowflake(guild_id)}))
         intvl = list(map(IntervalReminder, intvl))
 
 
@@ -603,6 +1456,46 @@ class Connector:
 
 
     @staticmethod
+    @instrumented('settings,reminders,intervals')
+    def search_reminders(scope: Scope, query: str, user_roles=[], limit=None):
+        """full-text search over title and message of the reminders/intervals
+           the scope is the same as for get_guild_reminders
+
+        Args:
+            scope (Scope): request scope (guild or private, always user bound)
+            query (str): search words
+            user_roles (list, optional): all roles of the user on given server. Defaults to [].
+            limit (int, optional): max. number of hits. Defaults to SEARCH_LIMIT.
+
+        Returns:
+            list: matching reminders, best match first
+        """
+        limit = limit or Connector.SEARCH_LIMIT
+
+        query_filter = Connector._scope_filter(scope, Connector._has_guild_scope(scope, user_roles))
+        if query_filter is None:
+            return []
+
+        # the text index requires an equality match on its g_id prefix ($in is rejected)
+        # one query per snowflake type (v1: string, v2: int64)
+        g_id = query_filter.pop('g_id')
+        g_ids = g_id['$in'] if isinstance(g_id, dict) else [g_id]
+
+        query_filter['$text'] = {'$search': query}
+        score = {'score': {'$meta': 'textScore'}}
+
+        hits = []
+        for collection, rem_class in ((Connector.db.reminders, Reminder), (Connector.db.intervals, IntervalReminder)):
+            for g_id in g_ids:
+                docs = collection.find({'g_id': g_id, **query_filter}, score).sort([('score', {'$meta': 'textScore'})]).limit(limit)
+                hits.extend((doc['score'], rem_class(doc)) for doc in docs)
+
+        hits.sort(key=lambda hit: hit[0], reverse=True)
+        return [rem for _, rem in hits[:limit]]
+
+
+    @staticmethod
+    @instrumented('reminders,intervals')
     def get_scoped_reminders(scope: Scope, sort_return=True):
         """request all reminders from the db
            which match the required scope
@@ -633,23 +1526,25 @@ class Connector:
 
 
     @staticmethod
+    @instrumented('reminders,intervals')
     def _get_user_reminders(guild_id: int, user_id: int):
 
-        rems = list(Connector.db.reminders.find({'g_id': str(guild_id), 'author': str(user_id)}))
+        rems = list(Connector.db.reminders.find({'g_id': Connector._snowflake(guild_id), 'author': Connector._snowflake(user_id)}))
         rems = list(map(Reminder, rems))
 
-        intvl = list(Connector.db.intervals.find({'g_id': str(guild_id), 'author': str(user_id)}))
+        intvl = list(Connector.db.intervals.find({'g_id': Connector._snowflake(guild_id), 'author': Connector._snowflake(user_id)}))
         intvl = list(map(IntervalReminder, intvl))
 
         return rems + intvl
 
     @staticmethod
+    @instrumented('reminders,intervals')
     def _get_user_private_reminders(user_id: int):
 
-        rems = list(Connector.db.reminders.find({'g_id': None, 'author': str(user_id)}))
+        rems = list(Connector.db.reminders.find({'g_id': None, 'author': Connector._snowflake(user_id)}))
         rems = list(map(Reminder, rems))
 
-        intvl = list(Connector.db.intervals.find({'g_id': None, 'author': str(user_id)}))
+        intvl = list(Connector.db.intervals.find({'g_id': None, 'author': Connector._snowflake(user_id)}))
         intvl = list(map(IntervalReminder, intvl))
 
         return rems + intvl
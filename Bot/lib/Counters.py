@@ -0,0 +1,90 @@
+import logging
+
+from lib.Analytics import Analytics
+
+
+log = logging.getLogger('Remindme.Counters')
+
+
+class Counters:
+    """incrementally maintained document counts
+
+       the Connector reports every insert/delete of reminders and intervals,
+       the periodic loops only reconcile the counts with the
+       collection metadata (no collection scan)
+
+       the community/experimental counts are aggregated
+       into the stats document by the Connector
+    """
+
+    reminders = 0
+    intervals = 0
+
+    # drift (in documents) which is logged on reconciliation
+    DRIFT_WARN = 10
+
+
+    @staticmethod
+    def reminders_changed(delta: int):
+        if not delta:
+            return
+
+        Counters.reminders = max(0, Counters.reminders + delta)
+        Analytics.reminder_cnt(Counters.reminders)
+
+
+    @staticmethod
+    def intervals_changed(delta: int):
+        if not delta:
+            return
+
+        Counters.intervals = max(0, Counters.intervals + delta)
+        Analytics.interval_cnt(Counters.intervals)
+
+
+    @staticmethod
+    def reconcile_reminders(reminder_cnt: int):
+        """overwrite the tracked reminder count with the estimated count
+           of the database
+
+        Args:
+            reminder_cnt (int): estimated document count of the collection
+        """
+        Counters._log_drift('reminder', Counters.reminders, reminder_cnt)
+
+        Counters.reminders = reminder_cnt
+        Analytics.reminder_cnt(reminder_cnt)
+
+
+    @staticmethod
+    def reconcile_intervals(interval_cnt: int):
+        """overwrite the tracked interval count with the estimated count
+           of the database
+
+        Args:
+            interval_cnt (int): estimated document count of the collection
+        """
+        Counters._log_drift('interval', Counters.intervals, interval_cnt)
+
+        Counters.intervals = interval_cnt
+        Analytics.interval_cnt(interval_cnt)
+
+
+    @staticmethod
+    def settings_stats(stats: dict):
+        """expose the aggregated settings counts of the stats document
+
+        Args:
+            stats (dict): the stats document, can be None
+        """
+        if not stats:
+            return
+
+        Analytics.community_count(stats.get('community', 0))
+        Analytics.experimental_count(stats.get('experimental', 0))
+
+
+    @staticmethod
+    def _log_drift(name: str, tracked: int, actual: int):
+        if abs(tracked - actual) >= Counters.DRIFT_WARN:
+            log.debug(f'{name} count drifted by {actual - tracked} (tracked {tracked}, db {actual})')
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+
+import discord
+
+from lib.Connector import Connector
+from lib.Analytics import Analytics, Types
+
+
+log = logging.getLogger('Remindme.Purge')
+
+
+class GuildPurge:
+    """background deletion of the reminders of left guilds
+
+       on_guild_remove only queues the guild (persisted in the db),
+       the reminders are then deleted in small batches.
+       Reminders of queued guilds are not delivered anymore.
+       Queued purges are resumed after a restart
+    """
+
+    # documents deleted per batch
+    BATCH_SIZE = 500
+
+    # seconds between two batches, limits the load on the db
+    BATCH_INTERVAL = 1.0
+
+    # guild id -> shard of all queued purges
+    _pending = {}
+    _wakeup: asyncio.Event = None
+    _task: asyncio.Task = None
+
+
+    @staticmethod
+    def init(bot: discord.Bot):
+        """load the queued purges and start the worker
+           on the loop of the bot
+        """
+        for purge in Connector.get_pending_purges():
+            GuildPurge._pending[int(purge['_id'])] = purge.get('shard', 0)
+
+        if GuildPurge._pending:
+            log.info(f'resuming {len(GuildPurge._pending)} guild purge(s)')
+
+        GuildPurge._wakeup = asyncio.Event()
+        GuildPurge._task = bot.loop.create_task(GuildPurge._worker())
+
+
+    @staticmethod
+    def queue(guild: discord.Guild):
+        """queue the guild for deletion
+           its reminders are not delivered from now on
+        """
+        Connector.queue_guild_purge(guild.id, shard=guild.shard_id)
+        GuildPurge._pending[guild.id] = guild.shard_id
+
+        if GuildPurge._wakeup:
+            GuildPurge._wakeup.set()
+
+
+    @staticmethod
+    def cancel(guild_id: int):
+        """stop the purge of a guild the bot re-joined
+           already deleted reminders are not restored
+        """
+        if GuildPurge._pending.pop(guild_id, None) is None:
+            return
+
+        purge = Connector.finish_guild_purge(guild_id)
+        log.debug(f'cancelled purge of guild {guild_id} ({purge})')
+
+
+    @staticmethod
+    def is_pending(guild_id: int) -> bool:
+        return guild_id in GuildPurge._pending
+
+
+    @staticmethod
+    async def _worker():
+        while True:
+            if not GuildPurge._pending:
+                GuildPurge._wakeup.clear()
+                await GuildPurge._wakeup.wait()
+
+            guild_id = next(iter(GuildPurge._pending))
+            try:
+                await GuildPurge._purge_batch(guild_id)
+            except Exception as e:
+                # retried with the next batch
+                log.error(f'failed to purge guild {guild_id}', exc_info=e)
+                Analytics.register_exception(e, shard=GuildPurge._pending.get(guild_id, 0))
+
+            await asyncio.sleep(GuildPurge.BATCH_INTERVAL)
+
+
+    @staticmethod
+    async def _purge_batch(guild_id: int):
+        # pymongo blocks, keep the loop free for the gateway
+        del_rem, del_intvl = await asyncio.to_thread(Connector.purge_guild_batch, guild_id, GuildPurge.BATCH_SIZE)
+
+        if del_rem or del_intvl:
+            return
+
+        # nothing left, report the totals
+        if guild_id not in GuildPurge._pending:
+            # cancelled while the batch was running
+            return
+
+        purge = await asyncio.to_thread(Connector.finish_guild_purge, guild_id)
+        shard = GuildPurge._pending.pop(guild_id, 0)
+
+        if not purge:
+            return
+
+        Analytics.reminder_deleted(Types.DeleteAction.KICK, shard=shard, count=purge.get('reminders', 0))
+        Analytics.interval_deleted(Types.DeleteAction.KICK, shard=shard, count=purge.get('intervals', 0))
+        log.debug(f'purged guild {guild_id} ({purge.get("reminders", 0)} reminders, {purge.get("intervals", 0)} intervals)')
@@ -0,0 +1,157 @@
+import time
+import asyncio
+import functools
+import contextvars
+import logging
+from contextlib import contextmanager
+
+import discord
+from discord.webhook.async_ import AsyncWebhookAdapter
+
+from lib.Analytics import Analytics
+
+
+log = logging.getLogger('Remindme.Timing')
+
+
+class Timing:
+    """timing record of a single interaction
+       phases are accumulated while the interaction is handled
+    """
+
+    def __init__(self, interaction: discord.Interaction, kind: str, name: str):
+        self.interaction_id = interaction.id
+        self.kind = kind
+        self.name = name
+
+        # discord starts the response deadline when the interaction is created
+        created_at = discord.utils.snowflake_time(interaction.id).timestamp()
+        self.start = time.monotonic() - max(0, time.time() - created_at)
+
+        self.first_response = None
+        self.phases = {}
+        self._active = set()
+
+
+class InteractionTiming:
+    """latency instrumentation for application commands
+       and component interactions
+
+       records total latency, time to first response/defer and
+       the time spent in parsing, database and Discord HTTP calls
+    """
+
+    # discord fails the interaction if no response was sent within this time
+    RESPONSE_DEADLINE = 3.0
+
+    PHASES = ('parse', 'db', 'http')
+
+    _current: contextvars.ContextVar = contextvars.ContextVar('interaction_timing', default=None)
+
+
+    @staticmethod
+    def init(bot: discord.Bot):
+        """install the hooks into the bot and the response/http layer
+        """
+        bot.before_invoke(InteractionTiming._before_invoke)
+
+        bot.http.request = InteractionTiming._wrap_http(bot.http.request)
+        AsyncWebhookAdapter.request = InteractionTiming._wrap_http(AsyncWebhookAdapter.request)
+
+        for name in ('defer', 'send_message', 'edit_message', 'send_modal'):
+            func = getattr(discord.InteractionResponse, name)
+            setattr(discord.InteractionResponse, name, InteractionTiming._wrap_response(func))
+
+
+    @staticmethod
+    def start(interaction: discord.Interaction, kind: str, name: str):
+        """start timing the interaction handled by the current task
+           the record is closed once the task is done
+
+        Args:
+            interaction (discord.Interaction): the handled interaction
+            kind (str): 'command' or 'component'
+            name (str): name of the command or callback
+        """
+        if InteractionTiming._current.get() is not None:
+            # already timed by an outer hook
+            return
+
+        timing = Timing(interaction, kind, name)
+        InteractionTiming._current.set(timing)
+
+        task = asyncio.current_task()
+        if task:
+            task.add_done_callback(lambda _: InteractionTiming._finish(timing))
+
+
+    @staticmethod
+    @contextmanager
+    def phase(name: str):
+        """accumulate the enclosed time into the given phase
+           of the current interaction, nested calls are counted once
+        """
+        timing = InteractionTiming._current.get()
+        if timing is None or name in timing._active:
+            yield
+            return
+
+        timing._active.add(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timing._active.discard(name)
+            timing.phases[name] = timing.phases.get(name, 0) + time.perf_counter() - start
+
+
+    @staticmethod
+    def responded(interaction: discord.Interaction):
+        timing = InteractionTiming._current.get()
+        if timing is None or timing.first_response is not None:
+            return
+        if timing.interaction_id != interaction.id:
+            return
+
+        timing.first_response = time.monotonic() - timing.start
+
+
+    @staticmethod
+    async def _before_invoke(ctx: discord.ApplicationContext):
+        InteractionTiming.start(ctx.interaction, 'command', ctx.command.qualified_name)
+
+
+    @staticmethod
+    def _finish(timing: Timing):
+        total = time.monotonic() - timing.start
+        Analytics.interaction_latency(timing.kind, timing.name, total, timing.first_response)
+
+        for phase in InteractionTiming.PHASES:
+            Analytics.interaction_phase(timing.kind, timing.name, phase, timing.phases.get(phase, 0))
+
+        if timing.first_response is None or timing.first_response > InteractionTiming.RESPONSE_DEADLINE:
+            log.debug(f'{timing.kind} {timing.name} missed the response deadline ({timing.first_response})')
+            Analytics.interaction_deadline_missed(timing.kind, timing.name)
+
+
+    @staticmethod
+    def _wrap_http(request):
+
+        @functools.wraps(request)
+        async def wrapper(*args, **kwargs):
+            with InteractionTiming.phase('http'):
+                return await request(*args, **kwargs)
+
+        return wrapper
+
+
+    @staticmethod
+    def _wrap_response(func):
+
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            ret = await func(self, *args, **kwargs)
+            InteractionTiming.responded(self._parent)
+            return ret
+
+        return wrapper
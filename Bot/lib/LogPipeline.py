@@ -0,0 +1,195 @@
+import os
+import time
+import queue
+import random
+import logging
+import datetime
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+
+TEXT_FORMAT = '%(asctime)s:%(levelname)s:%(name)s: %(message)s'
+CONSOLE_FORMAT = logging.BASIC_FORMAT
+
+
+class JsonFormatter(logging.Formatter):
+    """one json object per line, serialized with orjson"""
+
+    def __init__(self):
+        super().__init__()
+        import orjson
+        self._dumps = orjson.dumps
+
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.datetime.fromtimestamp(record.created, tz=datetime.timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+
+        # the QueueHandler already merged the traceback into the message
+        if getattr(record, 'suppressed', 0):
+            entry['suppressed'] = record.suppressed
+
+        return self._dumps(entry, default=str).decode()
+
+
+class RateLimitFilter(logging.Filter):
+    """limit the number of records per call site (file, line) and period
+       only records up to max_level are limited, warnings/errors always pass
+
+       the number of dropped records is attached to the next passing record
+    """
+
+    def __init__(self, rate: int, period: float = 60.0, max_level: int = logging.DEBUG):
+        super().__init__()
+        self.rate = rate
+        self.period = period
+        self.max_level = max_level
+
+        self._lock = threading.Lock()
+        self._sites = {}  # (path, line) -> [window start, count, suppressed]
+
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level:
+            return True
+
+        now = time.monotonic()
+        key = (record.pathname, record.lineno)
+
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None or now - site[0] >= self.period:
+                suppressed = site[2] if site else 0
+                self._sites[key] = [now, 1, 0]
+            elif site[1] < self.rate:
+                site[1] += 1
+                suppressed = 0
+            else:
+                site[2] += 1
+                return False
+
+        if suppressed:
+            record.suppressed = suppressed
+            record.msg = f'{record.getMessage()} [{suppressed} similar suppressed]'
+            record.args = None
+
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """pass only a fraction of the records of a logger (and its children)
+       only records up to max_level are sampled
+    """
+
+    def __init__(self, rates: dict, max_level: int = logging.DEBUG):
+        super().__init__()
+        self.rates = rates
+        self.max_level = max_level
+
+
+    def _rate(self, name: str):
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition('.')[0]
+        return None
+
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level:
+            return True
+
+        rate = self._rate(record.name)
+        return rate is None or random.random() < rate
+
+
+
+class LogPipeline:
+    """non-blocking logging
+
+       all records are put into a queue by the QueueHandler of the root logger,
+       a listener thread writes them into the console and a rotating log file.
+       Hot debug lines are sampled/rate limited before they are queued
+
+       configured by
+         LOG_FORMAT        text (default) or json (file only)
+         LOG_MAX_BYTES     size of a log file before it's rotated
+         LOG_BACKUP_COUNT  number of rotated files which are kept
+         LOG_RATE_LIMIT    debug records per call site and minute, 0 disables the limit
+         LOG_SAMPLING      fraction of debug records per logger, e.g. Remindme.Analytics=0.1,Remindme.Core=0.5
+    """
+
+    _listener: QueueListener = None
+    _handler: QueueHandler = None
+
+
+    @staticmethod
+    def _parse_sampling(value: str) -> dict:
+        rates = {}
+        for entry in filter(None, (e.strip() for e in value.split(','))):
+            name, _, rate = entry.partition('=')
+            rates[name.strip()] = float(rate)
+        return rates
+
+
+    @staticmethod
+    def init(filename: str, level=logging.INFO):
+        """install the pipeline on the root logger
+
+        Args:
+            filename (str): log file, the file of the previous run is rotated
+            level (optional): level of the root logger. Defaults to logging.INFO.
+        """
+        if LogPipeline._listener:
+            return
+
+        file_handler = RotatingFileHandler(filename, encoding='utf-8',
+                                           maxBytes=int(os.getenv('LOG_MAX_BYTES', 20*1024*1024)),
+                                           backupCount=int(os.getenv('LOG_BACKUP_COUNT', 5)),
+                                           delay=True)
+        # each start used to truncate the file, keep the last run instead
+        if os.path.isfile(filename) and os.path.getsize(filename) > 0:
+            file_handler.doRollover()
+
+        if os.getenv('LOG_FORMAT', 'text').lower() == 'json':
+            file_handler.setFormatter(JsonFormatter())
+        else:
+            file_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+
+        log_queue = queue.SimpleQueue()
+        handler = QueueHandler(log_queue)
+
+        rate = int(os.getenv('LOG_RATE_LIMIT', 30))
+        if rate > 0:
+            handler.addFilter(RateLimitFilter(rate))
+
+        sampling = LogPipeline._parse_sampling(os.getenv('LOG_SAMPLING', ''))
+        if sampling:
+            handler.addFilter(SamplingFilter(sampling))
+
+        root = logging.getLogger()
+        root.setLevel(level)
+        root.addHandler(handler)
+
+        LogPipeline._handler = handler
+        LogPipeline._listener = QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+        LogPipeline._listener.start()
+
+
+    @staticmethod
+    def close():
+        """write all queued records and stop the listener"""
+        if not LogPipeline._listener:
+            return
+
+        LogPipeline._listener.stop()
+        logging.getLogger().removeHandler(LogPipeline._handler)
+        LogPipeline._listener = None
+        LogPipeline._handler = None
@@ -0,0 +1,157 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import traceback
+import logging
+
+from lib.Analytics import Analytics
+
+
+log = logging.getLogger('Remindme.Watchdog')
+
+
+class LoopWatchdog:
+    """opt-in detector for a blocked event loop
+
+       a heartbeat coroutine measures the wakeup latency of the loop
+       (scheduled vs. actual wakeup). A sampling thread watches the heartbeat
+       and captures the stack of the loop thread, as soon as the loop
+       is blocked longer than the threshold.
+
+       enabled by setting LOOP_WATCHDOG_MS to the stall threshold in ms
+    """
+
+    # interval of the heartbeat coroutine
+    BEAT_INTERVAL = 0.25
+
+    # minimum seconds between two log entries of the same callback
+    LOG_INTERVAL = 60
+
+    # frames inside these files are not blamed for a stall
+    _SKIP_FILES = ('asyncio', 'threading.py', 'selectors.py', os.path.join('discord', ''))
+
+    _bot_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    _threshold = None
+    _loop = None
+    _loop_thread_id = None
+    _last_beat = None
+    _beat_task = None
+    _sampler = None
+    _last_log = {}
+
+
+    @staticmethod
+    def init(loop: asyncio.AbstractEventLoop = None):
+        """start the watchdog, if enabled by environment
+           must be called from within the event loop
+
+        Returns:
+            bool: True if the watchdog is running
+        """
+        threshold_ms = os.getenv('LOOP_WATCHDOG_MS')
+        if not threshold_ms:
+            return False
+
+        if LoopWatchdog._beat_task and not LoopWatchdog._beat_task.done():
+            return True
+
+        LoopWatchdog._threshold = int(threshold_ms) / 1000
+        LoopWatchdog._loop = loop or asyncio.get_running_loop()
+        LoopWatchdog._loop_thread_id = threading.get_ident()
+        LoopWatchdog._last_beat = time.monotonic()
+
+        LoopWatchdog._beat_task = LoopWatchdog._loop.create_task(LoopWatchdog._heartbeat())
+
+        LoopWatchdog._sampler = threading.Thread(target=LoopWatchdog._sample, name='loop-watchdog', daemon=True)
+        LoopWatchdog._sampler.start()
+
+        log.info(f'watchdog started (threshold {threshold_ms}ms)')
+        return True
+
+
+    @staticmethod
+    def stop():
+        if LoopWatchdog._beat_task:
+            LoopWatchdog._beat_task.cancel()
+            LoopWatchdog._beat_task = None
+
+
+    @staticmethod
+    async def _heartbeat():
+        while True:
+            scheduled = time.monotonic() + LoopWatchdog.BEAT_INTERVAL
+            await asyncio.sleep(LoopWatchdog.BEAT_INTERVAL)
+
+            now = time.monotonic()
+            LoopWatchdog._last_beat = now
+            Analytics.loop_lag(max(0, now - scheduled))
+
+
+    @staticmethod
+    def _sample():
+        """sampling thread, captures the stack of the loop thread
+           once per stall
+        """
+        stall_stack = None
+        stall_callback = None
+        stall_since = None
+
+        while LoopWatchdog._beat_task is not None:
+            time.sleep(LoopWatchdog._threshold / 2)
+
+            last_beat = LoopWatchdog._last_beat
+            blocked = time.monotonic() - last_beat - LoopWatchdog.BEAT_INTERVAL
+
+            if blocked > LoopWatchdog._threshold:
+                if stall_stack is None:
+                    frame = sys._current_frames().get(LoopWatchdog._loop_thread_id)
+                    if frame is None:
+                        continue
+                    stall_stack = traceback.extract_stack(frame)
+                    stall_callback = LoopWatchdog._blame(stall_stack)
+                    stall_since = last_beat
+
+            elif stall_stack is not None:
+                # the loop recovered, the next beat closes the stall
+                duration = max(0, last_beat - stall_since - LoopWatchdog.BEAT_INTERVAL)
+                LoopWatchdog._report(stall_stack, stall_callback, duration)
+                stall_stack = None
+                stall_callback = None
+                stall_since = None
+
+
+    @staticmethod
+    def _blame(stack: traceback.StackSummary) -> str:
+        """find the innermost frame of the bot code
+
+        Returns:
+            str: label of the blocking callback, 'unknown' if not within the bot code
+        """
+        for frame in reversed(stack):
+            if not frame.filename.startswith(LoopWatchdog._bot_dir):
+                continue
+            if any(skip in frame.filename for skip in LoopWatchdog._SKIP_FILES):
+                continue
+            if frame.filename == os.path.abspath(__file__):
+                continue
+
+            module = os.path.splitext(os.path.basename(frame.filename))[0]
+            return f'{module}.{frame.name}'
+
+        return 'unknown'
+
+
+    @staticmethod
+    def _report(stack: traceback.StackSummary, callback: str, duration: float):
+        Analytics.loop_stall(callback, duration)
+
+        now = time.monotonic()
+        if now - LoopWatchdog._last_log.get(callback, 0) < LoopWatchdog.LOG_INTERVAL:
+            return
+        LoopWatchdog._last_log[callback] = now
+
+        stack_str = ''.join(stack.format())
+        log.warning(f'event loop blocked for {duration:.3f}s by {callback}\n{stack_str}')
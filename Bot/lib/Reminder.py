@@ -3,16 +3,43 @@ import discord # for reminder
 from datetime import datetime
 from dateutil import tz
 import dateutil.rrule as rr
+from unidecode import unidecode
 
 import lib.input_parser
+from lib.Clock import Clock
+from lib.Timezones import Timezones
 import lib.Connector  # KEEP this syntax, circular import
 
+
+def _read_time(value):
+    """read a time of either schema version
+       v1 stores float timestamps, v2 stores (naive utc) BSON dates
+    """
+    if not value:
+        return None
+    elif isinstance(value, datetime):
+        return value
+    else:
+        return datetime.fromtimestamp(value)
+
+
 class Reminder:
 
+    # v1: snowflakes as strings, float timestamps, null fields are stored
+    # v2: int64 snowflakes, BSON dates, null fields are omitted
+    # v3: ascii label for select menus
+    SCHEMA_VERSION = 3
+
+    # discord limit of a select option label
+    LABEL_LEN = 25
+
     def __init__(self, json = {}):
         if not json:
             json = {}
 
+        # snowflakes are strings in v1 and int64 in v2
+        # int() reads both versions
+
         self.msg = json.get('msg', None)
         self.title = json.get('title', None)
         self.img_url = json.get('img_url', None)
@@ -38,13 +65,33 @@ class Reminder:
         last_msg_id = json.get('last_msg_id', None)
         self.last_msg_id = int(last_msg_id) if last_msg_id else None
 
-        self.at = json.get('at', None)
-        if self.at:
-            self.at = datetime.fromtimestamp(self.at)
+        self.at = _read_time(json.get('at', None))
+        self.created_at = _read_time(json.get('created_at', None))
 
-        self.created_at = json.get('created_at', None)
-        if self.created_at:
-            self.created_at = datetime.fromtimestamp(self.created_at)
+        # missing before v3
+        self.label = json.get('label', None)
+
+
+    @staticmethod
+    def make_label(title: str, msg: str) -> str:
+        """ascii label of a reminder, transliterated title or message
+
+        Returns:
+            str: up to LABEL_LEN chars, empty if neither has a printable representation
+        """
+        # the title is only used if it has chars *AFTER* unidecode
+        label = unidecode(title)[:Reminder.LABEL_LEN] if title else ''
+        if not label and msg:
+            label = unidecode(msg)[:Reminder.LABEL_LEN]
+
+        return label
+
+
+    def get_label(self) -> str:
+        """stored ascii label, computed for documents which don't have one yet"""
+        if self.label is None:
+            self.label = Reminder.make_label(self.title, self.msg)
+        return self.label
 
 
     def __eq__(self, other):
@@ -52,16 +99,16 @@ class Reminder:
         return self.at == other.at
 
     def __lt__(self, other):
-        return (self.at or datetime.utcnow()) < (other.at or datetime.utcnow())
+        return (self.at or Clock.utcnow()) < (other.at or Clock.utcnow())
 
     def __le__(self, other):
-        return (self.at or datetime.utcnow()) <= (other.at or datetime.utcnow())
+        return (self.at or Clock.utcnow()) <= (other.at or Clock.utcnow())
 
     def __gt__(self, other):
-        return (self.at or datetime.utcnow()) > (other.at or datetime.utcnow())
+        return (self.at or Clock.utcnow()) > (other.at or Clock.utcnow())
 
     def __ge__(self, other):
-        return (self.at or datetime.utcnow()) >= (other.at or datetime.utcnow())
+        return (self.at or Clock.utcnow()) >= (other.at or Clock.utcnow())
 
     def __ne__(self, other):
         # unequals allows None
@@ -69,31 +116,35 @@ class Reminder:
 
 
     def _to_json(self):
+        """serialize into the current schema version
+           fields without value are omitted
+
+        Returns:
+            dict: the database document, without _id
+        """
         d = dict()
 
+        d['v'] = Reminder.SCHEMA_VERSION
         d['msg'] = self.msg
 
-
         d['title'] = self.title if self.title else None
         d['img_url'] = self.img_url if self.img_url else None
-        d['g_id'] = str(self.g_id) if self.g_id else None
-        d['ch_id'] = str(self.ch_id) if self.ch_id else None
-        d['target'] = str(self.target) if self.target else None
+        d['g_id'] = int(self.g_id) if self.g_id else None
+        d['ch_id'] = int(self.ch_id) if self.ch_id else None
+        d['target'] = int(self.target) if self.target else None
         d['target_mention'] = self.target_mention
         d['target_name'] = self.target_name
         d['ch_name'] = self.ch_name
-        d['author'] = str(self.author) if self.author else None
-        d['last_msg_id'] = str(self.last_msg_id) if self.last_msg_id else None
+        d['author'] = int(self.author) if self.author else None
+        d['last_msg_id'] = int(self.last_msg_id) if self.last_msg_id else None
         
-        if self.created_at:
-            d['created_at'] = datetime.timestamp(self.created_at)
+        d['created_at'] = self.created_at
+        d['at'] = self.at
 
-        if self.at:
-            d['at'] = datetime.timestamp(self.at)
-        else:
-            d['at'] = None
+        # title/msg may have been changed since the label was read
+        d['label'] = Reminder.make_label(self.title, self.msg)
 
-        return d
+        return {k: v for k, v in d.items() if v is not None}
 
 
     
@@ -109,7 +160,7 @@ class Reminder:
             return 'No future occurrence'
         
         if not now:
-            now = datetime.utcnow()  
+            now = Clock.utcnow()  
             
             
         if use_timestamp:
@@ -193,7 +244,7 @@ class Reminder:
             if tz_str == 'UTC':
                 at_str = self.created_at.strftime('%Y-%m-%d %H:%M UTC')
             else:
-                at_str = self.created_at.replace(tzinfo=tz.UTC).astimezone(tz.gettz(tz_str)).strftime('%Y/%m/%d %H:%M %Z')
+                at_str = self.created_at.replace(tzinfo=tz.UTC).astimezone(Timezones.get(tz_str)).strftime('%Y/%m/%d %H:%M %Z')
 
             eb.timestamp = self.created_at
             eb.set_footer(text='created: ')
@@ -220,7 +271,7 @@ class Reminder:
         """
 
         if not now:
-            now = datetime.utcnow()
+            now = Clock.utcnow()
         
         if self.target == self.author:
             description = 'Reminding you '
@@ -338,9 +389,7 @@ class IntervalReminder(Reminder):
         super().__init__(json)
 
 
-        self.first_at = json.get('first_at', None)
-        if self.first_at:
-            self.first_at = datetime.fromtimestamp(self.first_at)
+        self.first_at = _read_time(json.get('first_at', None))
 
         self.exdates = json.get('exdates', [])
         self.exrules = json.get('exrules', [])
@@ -357,7 +406,7 @@ class IntervalReminder(Reminder):
         d['rrules'] = self.rrules
 
         if self.first_at:
-            d['first_at'] = datetime.timestamp(self.first_at)
+            d['first_at'] = self.first_at
 
         return d
 
@@ -372,7 +421,7 @@ class IntervalReminder(Reminder):
         """
 
         if not now:
-            now = datetime.utcnow()
+            now = Clock.utcnow()
         
         if self.target == self.author:
             description = 'Reminding you '
@@ -527,7 +576,7 @@ class IntervalReminder(Reminder):
         return
 
 
-    def next_trigger(self, utcnow, tz_str=None):
+    def next_trigger(self, utcnow, tz_str=None, legacy=None):
 
         def valid_rule(rule_str):
             if 'interval=0' in rule_str.lower():
@@ -536,7 +585,11 @@ class IntervalReminder(Reminder):
             return True
 
         instance_id = self.g_id if self.g_id else self.author
-        legacy_mode = lib.Connector.Connector.is_legacy_interval(instance_id)
+        if legacy is None:
+            legacy_mode = lib.Connector.Connector.is_legacy_interval(instance_id)
+        else:
+            # settings were read by the caller (bulk operations)
+            legacy_mode = legacy
 
         ruleset = rr.rruleset()
 
@@ -568,18 +621,22 @@ class IntervalReminder(Reminder):
             if not tz_str:
                 tz_str = lib.Connector.Connector.get_timezone(instance_id)
 
-            local_now = utcnow.replace(tzinfo=tz.UTC)
-            local_now = local_now.astimezone(tz.gettz(tz_str))
-            local_now = local_now.replace(tzinfo=None)
+            local_now = Timezones.to_local(utcnow, tz_str)
             
 
             next_trigger = ruleset.after(local_now)
             
             if next_trigger:
                 # back to UTC, for DB queries
-                next_trigger = next_trigger.replace(tzinfo=tz.gettz(tz_str))
-                next_trigger = next_trigger.astimezone(tz.UTC)
-                next_trigger = next_trigger.replace(tzinfo=None)
+                local_trigger = next_trigger
+                next_trigger = Timezones.to_utc(local_trigger, tz_str)
+
+                # the local time is skipped by the DST transition (e.g. 02:30)
+                # deliver it after the transition (03:30), not one hour early
+                # the early time would be re-scheduled and delivered again until the transition
+                skipped = local_trigger - Timezones.to_local(next_trigger, tz_str)
+                if skipped:
+                    next_trigger += skipped
             
         else:
             next_trigger = ruleset.after(utcnow)
@@ -0,0 +1,208 @@
+import io
+import csv
+from datetime import datetime
+
+import orjson
+
+from lib.Reminder import IntervalReminder
+from lib.Clock import Clock
+
+
+# columns of the csv export, the json objects use the same keys
+FIELDS = ['id', 'kind', 'at', 'created_at', 'g_id', 'ch_id', 'ch_name', 'author', 'target', 'target_name',
+          'title', 'msg', 'img_url', 'timezone', 'first_at', 'rrules', 'exrules', 'rdates', 'exdates']
+
+
+def _utc_iso(utc: datetime):
+    return utc.strftime('%Y-%m-%dT%H:%M:%SZ') if utc else None
+
+
+def _local_iso(local: datetime):
+    return local.strftime('%Y-%m-%dT%H:%M:%S') if local else None
+
+
+def _rule_body(rule_str: str) -> str:
+    """the RRULE part of a stored rule, without its DTSTART line"""
+    lines = [l for l in rule_str.splitlines() if not l.startswith('DTSTART')]
+    return lines[0].split(':', 1)[-1] if lines else ''
+
+
+def _ics_escape(text: str) -> str:
+    return text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n')
+
+
+def _ics_line(line: str) -> bytes:
+    """fold the content line at 75 octets, without splitting a multi-byte character"""
+    raw = line.encode('utf-8')
+    if len(raw) <= 75:
+        return raw + b'\r\n'
+
+    out = []
+    start, limit = 0, 75
+    while len(raw) - start > limit:
+        end = start + limit
+        # utf-8 continuation bytes are 0b10xxxxxx
+        while raw[end] & 0xC0 == 0x80:
+            end -= 1
+        out.append(raw[start:end])
+        start, limit = end, 74  # the leading space counts as well
+    out.append(raw[start:])
+
+    return b'\r\n '.join(out) + b'\r\n'
+
+
+class ReminderExport:
+    """serialize a stream of reminders into a binary file
+
+       each reminder is written as soon as it is read,
+       the memory use is independent of the number of reminders
+    """
+
+    FORMATS = ('json', 'csv', 'ics')
+
+
+    @staticmethod
+    def to_dict(rem, tz_str='UTC', legacy=False) -> dict:
+        """flat representation of a reminder
+           the times of an interval rule are local to 'timezone' (UTC for legacy intervals),
+           all other times are UTC
+
+        Returns:
+            dict: keys as in FIELDS
+        """
+        is_interval = isinstance(rem, IntervalReminder)
+        local_time = _utc_iso if legacy else _local_iso
+
+        return {
+            'id': str(rem._id) if rem._id else None,
+            'kind': 'interval' if is_interval else 'reminder',
+            'at': _utc_iso(rem.at),
+            'created_at': _utc_iso(rem.created_at),
+            'g_id': rem.g_id,
+            'ch_id': rem.ch_id,
+            'ch_name': rem.ch_name,
+            'author': rem.author,
+            'target': rem.target,
+            'target_name': rem.target_name,
+            'title': rem.title,
+            'msg': rem.msg,
+            'img_url': rem.img_url,
+            'timezone': ('UTC' if legacy else tz_str) if is_interval else None,
+            'first_at': local_time(rem.first_at) if is_interval else None,
+            'rrules': [_rule_body(r) for r in rem.rrules] if is_interval else [],
+            'exrules': [_rule_body(r) for r in rem.exrules] if is_interval else [],
+            'rdates': [local_time(d) for d in rem.rdates] if is_interval else [],
+            'exdates': [local_time(d) for d in rem.exdates] if is_interval else [],
+        }
+
+
+    @staticmethod
+    def _write_json(fp, reminders, tz_str, legacy) -> int:
+        cnt = 0
+        fp.write(b'[')
+        for rem in reminders:
+            fp.write(b'\n' if cnt == 0 else b',\n')
+            fp.write(orjson.dumps(ReminderExport.to_dict(rem, tz_str, legacy)))
+            cnt += 1
+        fp.write(b'\n]\n')
+
+        return cnt
+
+
+    @staticmethod
+    def _write_csv(fp, reminders, tz_str, legacy) -> int:
+        cnt = 0
+        text = io.TextIOWrapper(fp, encoding='utf-8', newline='')
+        writer = csv.DictWriter(text, fieldnames=FIELDS)
+        writer.writeheader()
+
+        for rem in reminders:
+            row = ReminderExport.to_dict(rem, tz_str, legacy)
+            for key in ('rrules', 'exrules', 'rdates', 'exdates'):
+                row[key] = ' '.join(row[key])  # neither rules nor dates contain spaces
+            writer.writerow(row)
+            cnt += 1
+
+        # leave the binary file open for the caller
+        text.flush()
+        text.detach()
+
+        return cnt
+
+
+    @staticmethod
+    def _write_ics(fp, reminders, tz_str, legacy) -> int:
+        """one VEVENT per reminder, intervals are expanded into RRULE/EXRULE/RDATE/EXDATE lines
+           all rules of an interval share its first occurrence as DTSTART
+
+           the TZID is the IANA name, no VTIMEZONE is emitted
+        """
+        cnt = 0
+        dtstamp = Clock.utcnow().strftime('%Y%m%dT%H%M%SZ')
+
+        if legacy:
+            local_prop = lambda name: name
+            local_fmt = lambda d: d.strftime('%Y%m%dT%H%M%SZ')
+        else:
+            local_prop = lambda name: f'{name};TZID={tz_str}'
+            local_fmt = lambda d: d.strftime('%Y%m%dT%H%M%S')
+
+        fp.write(_ics_line('BEGIN:VCALENDAR'))
+        fp.write(_ics_line('VERSION:2.0'))
+        fp.write(_ics_line('PRODID:-//RemindmeBot//Reminder Export//EN'))
+
+        for rem in reminders:
+            lines = ['BEGIN:VEVENT', f'UID:{rem._id}@remindmebot', f'DTSTAMP:{dtstamp}']
+
+            if isinstance(rem, IntervalReminder) and rem.first_at:
+                lines.append(f'{local_prop("DTSTART")}:{local_fmt(rem.first_at)}')
+                lines.extend(f'RRULE:{_rule_body(r)}' for r in rem.rrules)
+                lines.extend(f'EXRULE:{_rule_body(r)}' for r in rem.exrules)
+                if rem.rdates:
+                    lines.append(f'{local_prop("RDATE")}:' + ','.join(map(local_fmt, rem.rdates)))
+                if rem.exdates:
+                    lines.append(f'{local_prop("EXDATE")}:' + ','.join(map(local_fmt, rem.exdates)))
+            elif rem.at:
+                lines.append(f'DTSTART:{rem.at.strftime("%Y%m%dT%H%M%SZ")}')
+
+            if rem.created_at:
+                lines.append(f'CREATED:{rem.created_at.strftime("%Y%m%dT%H%M%SZ")}')
+
+            summary = rem.title or (rem.msg.splitlines()[0] if rem.msg else None) or 'Reminder'
+            lines.append('SUMMARY:' + _ics_escape(summary))
+            if rem.msg:
+                lines.append('DESCRIPTION:' + _ics_escape(rem.msg))
+            if rem.ch_name:
+                lines.append('LOCATION:' + _ics_escape(f'#{rem.ch_name}'))
+            lines.append('END:VEVENT')
+
+            fp.write(b''.join(map(_ics_line, lines)))
+            cnt += 1
+
+        fp.write(_ics_line('END:VCALENDAR'))
+
+        return cnt
+
+
+    @staticmethod
+    def write(fp, reminders, fmt: str, tz_str='UTC', legacy=False) -> int:
+        """write the reminders into the file
+
+        Args:
+            fp: binary file, is not closed
+            reminders (iterable): reminders and intervals, e.g. Connector.iter_reminders
+            fmt (str): one of FORMATS
+            tz_str (str, optional): timezone of the interval rules. Defaults to 'UTC'.
+            legacy (bool, optional): the interval rules are in UTC (legacy intervals). Defaults to False.
+
+        Returns:
+            int: number of written reminders
+        """
+        if fmt == 'json':
+            return ReminderExport._write_json(fp, reminders, tz_str, legacy)
+        elif fmt == 'csv':
+            return ReminderExport._write_csv(fp, reminders, tz_str, legacy)
+        elif fmt == 'ics':
+            return ReminderExport._write_ics(fp, reminders, tz_str, legacy)
+        else:
+            raise ValueError(f'unknown export format {fmt}')
@@ -0,0 +1,448 @@
+import io
+import re
+import csv
+import time
+import logging
+
+from dateutil import tz
+from dateutil.parser import isoparse
+
+import lib.input_parser
+from lib.Connector import Connector
+from lib.Reminder import Reminder, IntervalReminder
+from lib.Timezones import Timezones
+from lib.Analytics import Analytics
+from lib.Clock import Clock
+
+
+log = logging.getLogger('Remindme.Import')
+
+
+_ICS_ESCAPED = re.compile(r'\\([\\;,nN])')
+
+# UNTIL in UTC, required by RFC 5545 if DTSTART has a TZID or is in UTC
+_UTC_UNTIL = re.compile(r';?UNTIL=(\d{8}T\d{6}Z)')
+
+
+class _EntryError(ValueError):
+    """invalid entry, the message is shown in the error report"""
+
+
+def _ics_unescape(text: str) -> str:
+    return _ICS_ESCAPED.sub(lambda m: '\n' if m.group(1) in 'nN' else m.group(1), text)
+
+
+def _ics_property(line: str):
+    """split a content line into name, parameters and value
+       the value starts at the first colon outside of a quoted parameter
+
+    Returns:
+        tuple(str, dict, str): upper case name, parameters, value
+    """
+    quoted = False
+    for i, c in enumerate(line):
+        if c == '"':
+            quoted = not quoted
+        elif c == ':' and not quoted:
+            break
+    else:
+        return None, {}, ''
+
+    name, *params = line[:i].split(';')
+    params = dict(p.partition('=')[::2] for p in params)
+    params = {k.upper(): v.strip('"') for k, v in params.items()}
+
+    return name.upper(), params, line[i+1:]
+
+
+class ReminderImport:
+    """create many reminders from a calendar (ics) or table (csv) at once
+
+       the settings of the instance are read once by the caller,
+       every distinct rule is normalized only once.
+       All entries are validated before anything is written,
+       the valid ones are inserted with one insert_many per collection.
+
+       The csv columns are the ones of /reminder_export,
+       only 'msg' (or 'title') and 'at' (or 'first_at') are required
+    """
+
+    FORMATS = ('ics', 'csv')
+
+    # the rules of an interval are edited with a select menu
+    MAX_RULES = 25
+
+    # limit of an embed title
+    TITLE_LEN = 256
+
+    # limit of an embed description
+    MSG_LEN = 4096
+
+
+    def __init__(self, g_id: int, ch_id: int, ch_name: str, author: int, tz_str='UTC', legacy=False,
+                 allow_repeating=True, keep_targets=False, max_entries=None, utcnow=None):
+        """
+        Args:
+            g_id (int): guild of the reminders, None for DMs
+            ch_id (int): delivery channel, None for DMs
+            ch_name (str): name of the delivery channel
+            author (int): author and target of the reminders
+            tz_str (str, optional): timezone of the instance, for entries without zone. Defaults to 'UTC'.
+            legacy (bool, optional): the instance uses legacy (utc) intervals. Defaults to False.
+            allow_repeating (bool, optional): the author may create intervals. Defaults to True.
+            keep_targets (bool, optional): use channel, author and target of the entry, if present (support only). Defaults to False.
+            max_entries (int, optional): entries after this limit are skipped. Defaults to None.
+            utcnow (datetime, optional): reference time of the import. Defaults to Clock.utcnow().
+        """
+        self.g_id = g_id
+        self.ch_id = ch_id
+        self.ch_name = ch_name
+        self.author = author
+
+        self.tz_str = tz_str
+        self.legacy = legacy
+        self.allow_repeating = allow_repeating
+        self.keep_targets = keep_targets
+        self.max_entries = max_entries
+        self.utcnow = utcnow or Clock.utcnow()
+
+        self.fmt = None
+        self.entries = 0
+        self.reminders = []
+        self.errors = []  # (entry no., message)
+        self.inserted = 0
+
+        self.parse_time = 0.0
+        self.commit_time = 0.0
+
+        self._entry_of = {}  # id(reminder) -> entry no.
+        self._rules = {}  # rule string -> (normalized rule, error), shared by all entries
+
+
+    # =====================
+    # readers
+    # =====================
+
+    @staticmethod
+    def _read_ics(fp):
+        """stream the VEVENTs of a calendar, nested components (alarms) are skipped
+
+        Yields:
+            dict: raw fields of the event
+        """
+        def events(lines):
+            event = None
+            depth = 0
+
+            for line in lines:
+                name, params, value = _ics_property(line)
+
+                if name == 'BEGIN':
+                    if value.upper() == 'VEVENT' and depth == 0:
+                        event = {'rrules': [], 'exrules': [], 'rdates': [], 'exdates': []}
+                    elif event is not None:
+                        depth += 1
+                elif name == 'END':
+                    if event is not None and depth:
+                        depth -= 1
+                    elif event is not None and value.upper() == 'VEVENT':
+                        yield event
+                        event = None
+
+                elif event is None or depth:
+                    continue
+                elif name == 'DTSTART':
+                    event['start'] = value
+                    event['tzid'] = params.get('TZID', None)
+                elif name == 'SUMMARY':
+                    event['title'] = _ics_unescape(value)
+                elif name == 'DESCRIPTION':
+                    event['msg'] = _ics_unescape(value)
+                elif name in ('RRULE', 'EXRULE'):
+                    event['rrules' if name == 'RRULE' else 'exrules'].append(value)
+                elif name in ('RDATE', 'EXDATE'):
+                    dates = event['rdates' if name == 'RDATE' else 'exdates']
+                    dates.extend((d, params.get('TZID', None)) for d in value.split(','))
+
+        def unfolded(text):
+            line = None
+            for raw in text:
+                raw = raw.rstrip('\r\n')
+                if raw[:1] in (' ', '\t') and line is not None:
+                    line += raw[1:]
+                    continue
+                if line:
+                    yield line
+                line = raw
+            if line:
+                yield line
+
+        text = io.TextIOWrapper(fp, encoding='utf-8-sig', newline='')
+        try:
+            yield from events(unfolded(text))
+        finally:
+            text.detach()
+
+
+    @staticmethod
+    def _read_csv(fp):
+        """stream the rows of a table with the columns of ReminderExport
+
+        Yields:
+            dict: raw fields of the row
+        """
+        text = io.TextIOWrapper(fp, encoding='utf-8-sig', newline='')
+        try:
+            for row in csv.DictReader(text):
+                tzid = row.get('timezone') or None
+                entry = {
+                    'title': row.get('title') or None,
+                    'msg': row.get('msg') or None,
+                    'start': row.get('first_at') or row.get('at') or None,
+                    'tzid': tzid,
+                    'rrules': (row.get('rrules') or '').split(),
+                    'exrules': (row.get('exrules') or '').split(),
+                    'rdates': [(d, tzid) for d in (row.get('rdates') or '').split()],
+                    'exdates': [(d, tzid) for d in (row.get('exdates') or '').split()],
+                }
+                for key in ('ch_id', 'ch_name', 'author', 'target', 'target_name'):
+                    entry[key] = row.get(key) or None
+
+                yield entry
+        finally:
+            text.detach()
+
+
+    # =====================
+    # validation
+    # =====================
+
+    def _to_utc(self, value: str, tzid: str):
+        """parse an iso date (basic or extended), times without offset are local to tzid
+           or the instance timezone
+        """
+        try:
+            date = isoparse(value.strip())
+        except (ValueError, OverflowError):
+            raise _EntryError(f'invalid date `{value}`')
+
+        zone = tzid or self.tz_str
+        if not date.tzinfo and Timezones.get(zone) is None:
+            raise _EntryError(f'unknown timezone `{zone}`')
+
+        try:
+            if date.tzinfo:
+                return date.astimezone(tz.UTC).replace(tzinfo=None)
+            return Timezones.to_utc(date, zone)
+        except (ValueError, OverflowError):
+            # the offset moves the date out of the supported range (year 1/9999)
+            raise _EntryError(f'date out of range `{value}`')
+
+
+    def _to_rule_time(self, utc):
+        """the rules of an interval are evaluated in the local time of the instance"""
+        return utc if self.legacy else Timezones.to_local(utc, self.tz_str)
+
+
+    def _rule(self, rule: str, dtstart):
+        """the normalized rule, starting at dtstart
+           the rule string is normalized once per import
+        """
+        rule = rule.upper()
+        if rule.startswith('RRULE:') or rule.startswith('EXRULE:'):
+            rule = rule.split(':', 1)[1]
+
+        # the rules are naive in the time base of the instance (like dtstart),
+        # an utc UNTIL (google, outlook, apple exports) is converted and applied after the normalization
+        until = None
+        match = _UTC_UNTIL.search(rule)
+        if match:
+            until = self._to_rule_time(self._to_utc(match.group(1), None))
+            rule = (rule[:match.start()] + rule[match.end():]).strip(';')
+
+        if rule not in self._rules:
+            self._rules[rule] = lib.input_parser.rrule_normalize(f'RRULE:{rule}', dtstart=dtstart)
+
+        normalized, info = self._rules[rule]
+        if not normalized:
+            raise _EntryError(f'invalid rule `{rule}`: {info}')
+
+        normalized = normalized.replace(dtstart=dtstart)
+        if until:
+            normalized = normalized.replace(until=until)
+
+        return str(normalized)
+
+
+    def _build(self, entry: dict) -> Reminder:
+        """validate the raw fields of an entry
+
+        Raises:
+            _EntryError: the entry is invalid
+
+        Returns:
+            Reminder: Reminder or IntervalReminder, not saved
+        """
+        if not entry.get('msg') and not entry.get('title'):
+            raise _EntryError('no message')
+        if not entry.get('start'):
+            raise _EntryError('no date')
+
+        title = entry.get('title', None)
+        msg = entry.get('msg', None)
+        if not msg:
+            # a calendar entry may only have a summary
+            title, msg = None, title
+        elif title == msg.splitlines()[0]:
+            # summary generated from the message (/reminder_export)
+            title = None
+        if title and len(title) > ReminderImport.TITLE_LEN:
+            raise _EntryError(f'the title is longer than {ReminderImport.TITLE_LEN} characters')
+        if len(msg) > ReminderImport.MSG_LEN:
+            # the reminder could not be delivered
+            raise _EntryError(f'the message is longer than {ReminderImport.MSG_LEN} characters')
+
+        start = self._to_utc(entry['start'], entry.get('tzid', None))
+        is_interval = bool(entry['rrules'] or entry['rdates'])
+
+        if is_interval:
+            if not self.allow_repeating:
+                raise _EntryError('you are not allowed to create repeating reminders')
+
+            rule_cnt = len(entry['rrules']) + len(entry['exrules']) + len(entry['rdates']) + len(entry['exdates'])
+            if rule_cnt > ReminderImport.MAX_RULES:
+                raise _EntryError(f'more than {ReminderImport.MAX_RULES} rules')
+
+            rem = IntervalReminder()
+            rem.first_at = self._to_rule_time(start)
+            rem.rrules = [self._rule(r, rem.first_at) for r in entry['rrules']]
+            rem.exrules = [self._rule(r, rem.first_at) for r in entry['exrules']]
+            rem.rdates = [self._to_rule_time(self._to_utc(d, tzid)) for d, tzid in entry['rdates']]
+            rem.exdates = [self._to_rule_time(self._to_utc(d, tzid)) for d, tzid in entry['exdates']]
+        else:
+            if start <= self.utcnow:
+                raise _EntryError('the date lies in the past')
+            rem = Reminder()
+            rem.at = start
+
+        rem.title = title
+        rem.msg = msg
+        rem.g_id = self.g_id
+        rem.ch_id = self.ch_id
+        rem.ch_name = self.ch_name
+        rem.author = self.author
+        rem.target = self.author
+        rem.target_name = f'<@{self.author}>'
+        rem.target_mention = f'<@{self.author}>'
+        rem.created_at = self.utcnow
+
+        if self.keep_targets:
+            try:
+                rem.ch_id = int(entry['ch_id']) if entry.get('ch_id') else rem.ch_id
+                rem.author = int(entry['author']) if entry.get('author') else rem.author
+                rem.target = int(entry['target']) if entry.get('target') else rem.author
+            except ValueError:
+                raise _EntryError('invalid channel, author or target id')
+            rem.ch_name = entry.get('ch_name') or rem.ch_name
+            rem.target_name = entry.get('target_name') or f'<@{rem.target}>'
+            rem.target_mention = f'<@{rem.target}>'
+
+        if is_interval:
+            # the settings are shared by all entries, no lookup per reminder
+            rem.at = rem.next_trigger(self.utcnow, tz_str=self.tz_str, legacy=self.legacy)
+            if not rem.at:
+                raise _EntryError('no future occurrence')
+
+        return rem
+
+
+    # =====================
+    # import
+    # =====================
+
+    def parse(self, fp, fmt: str):
+        """read and validate all entries of the file
+           invalid entries are added to the errors
+
+        Args:
+            fp: binary file, is not closed
+            fmt (str): one of FORMATS
+        """
+        if fmt == 'ics':
+            entries = ReminderImport._read_ics(fp)
+        elif fmt == 'csv':
+            entries = ReminderImport._read_csv(fp)
+        else:
+            raise ValueError(f'unknown import format {fmt}')
+
+        self.fmt = fmt
+        start = time.perf_counter()
+
+        try:
+            for entry in entries:
+                if self.max_entries is not None and self.entries >= self.max_entries:
+                    self.errors.append((self.entries+1, f'only {self.max_entries} entries can be imported at once, the rest is skipped'))
+                    break
+
+                self.entries += 1
+                try:
+                    rem = self._build(entry)
+                except _EntryError as e:
+                    self.errors.append((self.entries, str(e)))
+                except Exception as e:
+                    # unexpected input of the rule/date libraries, must not abort the import
+                    log.warning(f'entry {self.entries} of the {fmt} import failed: {e!r}')
+                    self.errors.append((self.entries, 'the entry cannot be imported'))
+                else:
+                    self._entry_of[id(rem)] = self.entries
+                    self.reminders.append(rem)
+
+        except (UnicodeDecodeError, csv.Error) as e:
+            self.errors.append((self.entries+1, f'the file cannot be read ({e})'))
+
+        self.parse_time += time.perf_counter() - start
+
+
+    def commit(self) -> int:
+        """save all valid reminders, rejected documents are added to the errors
+
+        Returns:
+            int: number of saved reminders
+        """
+        start = time.perf_counter()
+
+        failed = Connector.bulk_insert(self.reminders) if self.reminders else []
+        for rem, error in failed:
+            self.errors.append((self._entry_of.get(id(rem), 0), error))
+
+        self.inserted = len(self.reminders) - len(failed)
+        self.commit_time += time.perf_counter() - start
+
+        self.errors.sort(key=lambda e: e[0])
+        Analytics.reminder_import(self.fmt, self.inserted, self.entries - self.inserted, self.parse_time, self.commit_time)
+        log.info(f'imported {self.inserted}/{self.entries} entries ({self.fmt}), '
+                 f'parse {self.parse_time:.2f}s, commit {self.commit_time:.2f}s')
+
+        return self.inserted
+
+
+    def get_report(self, max_errors=None) -> str:
+        """summary and per-entry errors
+
+        Args:
+            max_errors (int, optional): list at most this many errors. Defaults to None.
+
+        Returns:
+            str: one line per error
+        """
+        total_time = self.parse_time + self.commit_time
+        rate = f', {self.entries/total_time:.0f} entries/s' if total_time > 0 else ''
+
+        lines = [f'{self.inserted} of {self.entries} entries imported in {total_time:.2f}s{rate}']
+        errors = self.errors if max_errors is None else self.errors[:max_errors]
+        lines.extend(f'#{entry}: {error}' for entry, error in errors)
+
+        if len(errors) < len(self.errors):
+            lines.append(f'... and {len(self.errors)-len(errors)} more errors')
+
+        return '\n'.join(lines)
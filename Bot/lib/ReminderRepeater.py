@@ -5,6 +5,7 @@ import dateutil.rrule as rr
 from lib.Connector import Connector
 from lib.Analytics import Analytics
 from lib.Reminder import Reminder, IntervalReminder
+from lib.Clock import Clock
 
 
 #====================
@@ -89,24 +90,24 @@ def add_rules(reminder, rrule=None, exrule=None, rdate=None, exdate=None) -> Int
         reminder.exdates.append(exdate)
 
 
-    reminder.at = reminder.next_trigger(datetime.utcnow())
+    reminder.at = reminder.next_trigger(Clock.utcnow())
     Connector.update_interval_rules(reminder)
     Connector.update_interval_at(reminder)
 
-    Analytics.ruleset_added()
+    Analytics.ruleset_added(shard=Analytics.shard_of(reminder.g_id))
 
     return reminder
 
 
 def rm_rules(reminder: IntervalReminder, rule_idx=None):
 
-    utcnow = datetime.utcnow()
+    utcnow = Clock.utcnow()
 
     if rule_idx is None:
         return reminder
 
     reminder.delete_rule_idx(rule_idx)
-    reminder.at = reminder.next_trigger(datetime.utcnow())
+    reminder.at = reminder.next_trigger(Clock.utcnow())
 
     rules_cnt = reminder.get_rule_cnt()
 
@@ -114,7 +115,7 @@ def rm_rules(reminder: IntervalReminder, rule_idx=None):
     # and .at is in the future, set it as default Reminder
     if rules_cnt == 0 and reminder.at and reminder.at > utcnow:
         reminder = _interval_to_reminder(reminder)
-        Analytics.ruleset_removed()
+        Analytics.ruleset_removed(shard=Analytics.shard_of(reminder.g_id))
         return reminder
 
     # if reminder has no further occurrence
@@ -126,7 +127,7 @@ def rm_rules(reminder: IntervalReminder, rule_idx=None):
     # the reminder is orphaned, a warning can be displayed by a higher layer
     Connector.update_interval_rules(reminder)
     Connector.update_interval_at(reminder)
-    Analytics.ruleset_removed()
+    Analytics.ruleset_removed(shard=Analytics.shard_of(reminder.g_id))
 
     return reminder
 
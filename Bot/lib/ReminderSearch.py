@@ -0,0 +1,81 @@
+import re
+import bisect
+
+from unidecode import unidecode
+
+
+_WORD = re.compile(r'\w+')
+
+
+def tokenize(text: str) -> list:
+    """lowercase ascii words of the text"""
+    return _WORD.findall(unidecode(text).lower()) if text else []
+
+
+class ReminderSearch:
+    """in-memory inverted index over the title and message of a reminder set
+
+       built once per listing session, all terms of a query must match
+       (the last term also as prefix, for partial words).
+       Hits are ranked by the weighted term count, ties keep the order of the set
+    """
+
+    TITLE_WEIGHT = 3
+    MSG_WEIGHT = 1
+
+    # a prefix match counts less than the full word
+    PREFIX_FACTOR = 0.5
+
+    # larger sets are searched with the text index of the database
+    SESSION_LIMIT = 2000
+
+
+    def __init__(self, reminders: list):
+        self.reminders = reminders
+        self._postings = {}  # word -> {reminder idx: score}
+
+        for idx, r in enumerate(reminders):
+            for weight, text in ((ReminderSearch.TITLE_WEIGHT, r.title), (ReminderSearch.MSG_WEIGHT, r.msg)):
+                for word in tokenize(text):
+                    posting = self._postings.setdefault(word, {})
+                    posting[idx] = posting.get(idx, 0) + weight
+
+        self._words = sorted(self._postings)
+
+
+    def _matches(self, term: str, prefix: bool) -> dict:
+        scores = dict(self._postings.get(term, {}))
+        if not prefix:
+            return scores
+
+        start = bisect.bisect_right(self._words, term)
+        for word in self._words[start:]:
+            if not word.startswith(term):
+                break
+            for idx, score in self._postings[word].items():
+                scores[idx] = max(scores.get(idx, 0), score * ReminderSearch.PREFIX_FACTOR)
+
+        return scores
+
+
+    def search(self, query: str) -> list:
+        """
+        Returns:
+            list: the matching reminders, best match first
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        scores = None
+        for i, term in enumerate(terms):
+            matches = self._matches(term, prefix=(i == len(terms)-1))
+            if scores is None:
+                scores = matches
+            else:
+                scores = {idx: score + matches[idx] for idx, score in scores.items() if idx in matches}
+
+            if not scores:
+                return []
+
+        return [self.reminders[idx] for idx in sorted(scores, key=lambda idx: (-scores[idx], idx))]
@@ -0,0 +1,583 @@
+import json
+import time
+import sqlite3
+import threading
+import contextlib
+from datetime import datetime
+
+import bson
+from bson import ObjectId
+
+from lib.Connector import Connector
+from lib.Reminder import Reminder, IntervalReminder
+from lib.CommunitySettings import CommunitySettings
+from lib.Counters import Counters
+from lib.ReminderSearch import ReminderSearch
+from lib.StorageBackend import StorageBackend
+
+
+import logging
+
+log = logging.getLogger('Remindme.SQLite')
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS settings (
+    g_id TEXT PRIMARY KEY,
+    doc TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS reminders (
+    id TEXT PRIMARY KEY,
+    g_id INTEGER,
+    author INTEGER,
+    at REAL,
+    doc BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reminders_at ON reminders (at);
+CREATE INDEX IF NOT EXISTS reminders_scope ON reminders (g_id, author);
+
+CREATE TABLE IF NOT EXISTS intervals (
+    id TEXT PRIMARY KEY,
+    g_id INTEGER,
+    author INTEGER,
+    at REAL,
+    doc BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS intervals_at ON intervals (at);
+CREATE INDEX IF NOT EXISTS intervals_scope ON intervals (g_id, author);
+
+CREATE TABLE IF NOT EXISTS delivered (
+    id TEXT PRIMARY KEY,
+    delivered_at REAL NOT NULL,
+    doc BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS delivered_at ON delivered (delivered_at);
+
+CREATE TABLE IF NOT EXISTS purges (
+    g_id TEXT PRIMARY KEY,
+    shard INTEGER NOT NULL,
+    queued_at REAL NOT NULL,
+    reminders INTEGER NOT NULL DEFAULT 0,
+    intervals INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class SQLiteBackend(StorageBackend):
+    """embedded storage for small deployments, tests and benchmarks
+       enabled with STORAGE_BACKEND=sqlite, the file is set by SQLITE_PATH
+
+       settings are stored as json, reminders/intervals as bson documents
+       (same content as in MongoDB) with the queried fields as indexed columns
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+        # the purge/migration workers access the db from threads
+        self._lock = threading.RLock()
+
+        # last migrated id per table
+        self._migrated = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+
+        log.info(f'using sqlite storage {path}')
+
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+    def _query(self, sql: str, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+
+    def _execute(self, sql: str, params=()) -> int:
+        """execute the statement
+
+        Returns:
+            int: number of changed rows
+        """
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount
+
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """BEGIN ... COMMIT, the transaction is rolled back if the block raises"""
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+
+
+    def ping(self):
+        self._query('SELECT 1')
+
+
+    # =====================
+    # guild purges
+    # =====================
+
+    def queue_guild_purge(self, guild_id: int, shard: int = 0):
+        self._execute('DELETE FROM settings WHERE g_id = ?', (str(guild_id),))
+        self._execute('INSERT OR IGNORE INTO purges (g_id, shard, queued_at) VALUES (?, ?, ?)',
+                      (str(guild_id), shard, time.time()))
+
+
+    def get_pending_purges(self):
+        rows = self._query('SELECT g_id, shard, queued_at, reminders, intervals FROM purges')
+        return [{'_id': g_id, 'shard': shard, 'queued_at': datetime.utcfromtimestamp(queued_at),
+                 'reminders': rems, 'intervals': intvls} for g_id, shard, queued_at, rems, intvls in rows]
+
+
+    def purge_guild_batch(self, guild_id: int, batch_size: int):
+
+        for table in ('reminders', 'intervals'):
+            with self._lock:
+                deleted = self._execute(f'DELETE FROM {table} WHERE id IN '
+                                        f'(SELECT id FROM {table} WHERE g_id = ? LIMIT ?)', (int(guild_id), batch_size))
+                if deleted:
+                    self._execute(f'UPDATE purges SET {table} = {table} + ? WHERE g_id = ?', (deleted, str(guild_id)))
+
+            if not deleted:
+                continue
+
+            if table == 'reminders':
+                Counters.reminders_changed(-deleted)
+                return (deleted, 0)
+            else:
+                Counters.intervals_changed(-deleted)
+                return (0, deleted)
+
+        return (0, 0)
+
+
+    def finish_guild_purge(self, guild_id: int):
+        with self._lock:
+            purge = [p for p in self.get_pending_purges() if p['_id'] == str(guild_id)]
+            self._execute('DELETE FROM purges WHERE g_id = ?', (str(guild_id),))
+
+        return purge[0] if purge else None
+
+
+    def migrate_schema_batch(self, kind: str, batch_size: int):
+        """rewrite documents of an older schema version
+           the progress isn't persisted, a restart scans the table again
+        """
+        last_id = self._migrated.get(kind, '')
+        rem_class = Reminder if kind == 'reminders' else IntervalReminder
+
+        with self._lock:
+            rows = self._query(f'SELECT id, doc FROM {kind} WHERE id > ? ORDER BY id LIMIT ?', (last_id, batch_size))
+            if not rows:
+                return (0, True)
+
+            converted = 0
+            for row in rows:
+                if bson.decode(row[1]).get('v') != Reminder.SCHEMA_VERSION:
+                    converted += self._store(kind, self._load(rem_class, row))
+
+        self._migrated[kind] = rows[-1][0]
+        return (converted, False)
+
+
+    # =====================
+    # settings
+    # =====================
+
+    def _get_settings(self, instance_id: int) -> dict:
+        rows = self._query('SELECT doc FROM settings WHERE g_id = ?', (str(instance_id),))
+        return json.loads(rows[0][0]) if rows else None
+
+
+    def _update_settings(self, instance_id: int, **fields) -> dict:
+        """upsert the given fields
+
+        Returns:
+            dict: the settings before the update, None if not existing
+        """
+        with self._lock:
+            old = self._get_settings(instance_id)
+
+            settings = dict(old or {})
+            settings.update(fields)
+            self._execute('INSERT OR REPLACE INTO settings (g_id, doc) VALUES (?, ?)', (str(instance_id), json.dumps(settings)))
+
+        return old
+
+
+    def _count_settings(self, field: str, value) -> int:
+        return self._query(f"SELECT COUNT(*) FROM settings WHERE json_extract(doc, '$.{field}') = ?", (value,))[0][0]
+
+
+    def get_timezone(self, instance_id: int):
+        return (self._get_settings(instance_id) or {}).get('timezone', 'UTC')
+
+    def set_timezone(self, instance_id: int, timezone_str):
+        self._update_settings(instance_id, timezone=timezone_str)
+
+    def get_reminder_type(self, instance_id: int):
+        name = (self._get_settings(instance_id) or {}).get('reminder_type', Connector.ReminderType.HYBRID.name)
+        return Connector.ReminderType[name]
+
+    def set_reminder_type(self, instance_id: int, reminder_type):
+        self._update_settings(instance_id, reminder_type=reminder_type.name)
+
+    def set_auto_delete(self, instance_id: int, delete_type):
+        self._update_settings(instance_id, auto_delete=delete_type.name)
+
+    def get_auto_delete(self, instance_id: int):
+        name = (self._get_settings(instance_id) or {}).get('auto_delete', Connector.AutoDelete.TIMEOUT.name)
+        return Connector.AutoDelete[name]
+
+    def set_community_mode(self, instance_id: int, comm_type):
+        self._update_settings(instance_id, community=comm_type.name)
+
+    def get_community_mode(self, instance_id: int):
+        name = (self._get_settings(instance_id) or {}).get('community', Connector.CommunityMode.DISABLED.name)
+        return Connector.CommunityMode[name]
+
+    def get_legacy_interval_count(self):
+        return self._count_settings('legacy_interval', True)
+
+    def set_legacy_interval(self, instance_id: int, mode: bool):
+        self._update_settings(instance_id, legacy_interval=mode)
+
+    def is_legacy_interval(self, instance_id: int) -> bool:
+        # legacy is assumed for backwards compatibility
+        settings = self._get_settings(instance_id)
+        return settings.get('legacy_interval', True) if settings else True
+
+    def get_experimental_count(self):
+        return self._count_settings('experimental', True)
+
+    def set_experimental(self, instance_id: int, mode: bool):
+        self._update_settings(instance_id, experimental=mode)
+
+    def is_experimental(self, instance_id: int):
+        return (self._get_settings(instance_id) or {}).get('experimental', False)
+
+    def get_community_count(self):
+        return self._count_settings('community', Connector.CommunityMode.ENABLED.name)
+
+    def set_community_settings(self, instance_id: int, settings: CommunitySettings):
+        self._update_settings(instance_id, community_settings=settings._to_json())
+
+    def set_community_setting(self, instance_id: int, setting_name: str, value: bool):
+        if not hasattr(CommunitySettings(), setting_name):
+            raise ValueError(f'{setting_name} is not an attribute of CommunitySettings')
+
+        with self._lock:
+            comm_settings = dict((self._get_settings(instance_id) or {}).get('community_settings', {}))
+            comm_settings[setting_name] = value
+            self._update_settings(instance_id, community_settings=comm_settings)
+
+    def get_community_settings(self, instance_id: int):
+        return CommunitySettings((self._get_settings(instance_id) or {}).get('community_settings', {}))
+
+    def set_moderators(self, guild_id: int, moderators: list):
+        self._update_settings(guild_id, moderators=list(map(str, moderators)))
+
+    def get_moderators(self, instance_id: int):
+        return list(map(int, (self._get_settings(instance_id) or {}).get('moderators', [])))
+
+    def is_moderator(self, user_roles: list):
+        if not user_roles:
+            return False
+        elif isinstance(user_roles[0], str):
+            pass
+        elif isinstance(user_roles[0], int):
+            user_roles = list(map(str, user_roles))
+        elif hasattr(user_roles[0], 'id'):
+            user_roles = list(map(lambda r: str(r.id), user_roles))
+        else:
+            raise TypeError('user_roles must hold entities of type str, int or entities must have .id attribute')
+
+        placeholders = ','.join('?' * len(user_roles))
+        rows = self._query(f"SELECT 1 FROM settings, json_each(settings.doc, '$.moderators') "
+                           f"WHERE json_each.value IN ({placeholders}) LIMIT 1", user_roles)
+        return len(rows) > 0
+
+
+    # =====================
+    # reminders
+    # =====================
+
+    @staticmethod
+    def _timestamp(at: datetime):
+        return datetime.timestamp(at) if at else None
+
+
+    @staticmethod
+    def _load(rem_class, row):
+        rem_id, doc = row
+        doc = bson.decode(doc)
+        doc['_id'] = ObjectId(rem_id)
+        return rem_class(doc)
+
+
+    def _insert(self, table: str, reminder: Reminder):
+        rem_id = ObjectId()
+        self._execute(f'INSERT INTO {table} (id, g_id, author, at, doc) VALUES (?, ?, ?, ?, ?)',
+                      (str(rem_id), reminder.g_id, reminder.author,
+                       self._timestamp(reminder.at), bson.encode(reminder._to_json())))
+        return rem_id
+
+
+    def _find(self, table: str, where: str, params=()):
+        rem_class = Reminder if table == 'reminders' else IntervalReminder
+        rows = self._query(f'SELECT id, doc FROM {table} WHERE {where}', params)
+        return [self._load(rem_class, row) for row in rows]
+
+
+    def _store(self, table: str, reminder: Reminder) -> bool:
+        """overwrite the stored document of the reminder"""
+        return self._execute(f'UPDATE {table} SET g_id = ?, author = ?, at = ?, doc = ? WHERE id = ?',
+                             (reminder.g_id, reminder.author, self._timestamp(reminder.at),
+                              bson.encode(reminder._to_json()), str(reminder._id))) > 0
+
+
+    def _modify(self, reminder_id, **fields) -> bool:
+        """set the given attributes on the reminder or interval with the id
+
+        Returns:
+            bool: True if the reminder was found
+        """
+        with self._lock:
+            for table in ('reminders', 'intervals'):
+                rems = self._find(table, 'id = ?', (str(reminder_id),))
+                if rems:
+                    for name, value in fields.items():
+                        setattr(rems[0], name, value)
+                    return self._store(table, rems[0])
+
+        return False
+
+
+    def add_reminder(self, reminder: Reminder):
+        rem_id = self._insert('reminders', reminder)
+        Counters.reminders_changed(1)
+        return rem_id
+
+    def add_interval(self, interval: IntervalReminder):
+        rem_id = self._insert('intervals', interval)
+        Counters.intervals_changed(1)
+        return rem_id
+
+    def update_interval_rules(self, interval: IntervalReminder):
+        self._modify(interval._id, rdates=interval.rdates, exdates=interval.exdates,
+                                   rrules=interval.rrules, exrules=interval.exrules)
+
+    def update_reminder_at(self, reminder: Reminder):
+        self._modify(reminder._id, at=reminder.at)
+
+    def update_interval_at(self, interval: IntervalReminder):
+        if not interval.at:
+            log.warning(f'Orphaned interval reminder {interval._id}.')
+        self._modify(interval._id, at=interval.at)
+
+    def delete_orphaned_intervals(self):
+        deleted = self._execute('DELETE FROM intervals WHERE at IS NULL')
+        Counters.intervals_changed(-deleted)
+        return deleted
+
+    def get_elapsed_reminders(self, timestamp):
+        log.warning('Requested reminder without deleting from db')
+        return self._find('reminders', 'at < ?', (timestamp,))
+
+    def pop_elapsed_reminders(self, timestamp):
+        now = time.time()
+
+        with self._lock:
+            rows = self._query('SELECT id, doc FROM reminders WHERE at < ?', (timestamp,))
+
+            # keep a copy for the snooze buttons of the delivered message
+            with self._transaction() as conn:
+                conn.executemany('INSERT OR REPLACE INTO delivered (id, delivered_at, doc) VALUES (?, ?, ?)',
+                                 [(rem_id, now, doc) for rem_id, doc in rows])
+                conn.executemany('DELETE FROM reminders WHERE id = ?', [(rem_id,) for rem_id, _ in rows])
+                conn.execute('DELETE FROM delivered WHERE delivered_at < ?', (now - Connector.DELIVERED_TTL,))
+
+        Counters.reminders_changed(-len(rows))
+        return [self._load(Reminder, row) for row in rows]
+
+    def get_pending_intervals(self, timestamp):
+        return self._find('intervals', 'at < ?', (timestamp,))
+
+    def get_reminder_cnt(self):
+        return self._query('SELECT COUNT(*) FROM reminders')[0][0]
+
+    def get_interval_cnt(self):
+        return self._query('SELECT COUNT(*) FROM intervals')[0][0]
+
+    def get_reminder_by_id(self, reminder_id):
+        rems = self._find('reminders', 'id = ?', (str(reminder_id),))
+        return rems[0] if rems else None
+
+    def get_interval_by_id(self, interval_id):
+        rems = self._find('intervals', 'id = ?', (str(interval_id),))
+        return rems[0] if rems else None
+
+    def get_snoozable_by_id(self, reminder_id):
+        rows = self._query('SELECT id, doc FROM delivered WHERE id = ? AND delivered_at >= ?',
+                           (str(reminder_id), time.time() - Connector.DELIVERED_TTL))
+        if rows:
+            return self._load(Reminder, rows[0])
+        else:
+            return self.get_interval_by_id(reminder_id)
+
+    def get_author_of_id(self, reminder_id):
+        for table in ('reminders', 'intervals'):
+            rows = self._query(f'SELECT author FROM {table} WHERE id = ?', (str(reminder_id),))
+            if rows:
+                return int(rows[0][0]) if rows[0][0] else None
+        return None
+
+    def delete_reminder(self, reminder_id):
+        deleted = self._execute('DELETE FROM reminders WHERE id = ?', (str(reminder_id),))
+        Counters.reminders_changed(-deleted)
+        return deleted > 0
+
+    def delete_interval(self, reminder_id):
+        deleted = self._execute('DELETE FROM intervals WHERE id = ?', (str(reminder_id),))
+        Counters.intervals_changed(-deleted)
+        return deleted > 0
+
+    def bulk_delete(self, reminders: list):
+        rem_ids = [(str(r._id),) for r in reminders if not isinstance(r, IntervalReminder)]
+        intvl_ids = [(str(r._id),) for r in reminders if isinstance(r, IntervalReminder)]
+
+        with self._transaction() as conn:
+            rem_cnt = conn.executemany('DELETE FROM reminders WHERE id = ?', rem_ids).rowcount
+            intvl_cnt = conn.executemany('DELETE FROM intervals WHERE id = ?', intvl_ids).rowcount
+
+        Counters.reminders_changed(-rem_cnt)
+        Counters.intervals_changed(-intvl_cnt)
+        return (rem_cnt, intvl_cnt)
+
+    def bulk_set_channel(self, reminders: list, channel_id: int, channel_name: str):
+        with self._lock:
+            return sum(self._modify(r._id, ch_id=int(channel_id), ch_name=str(channel_name)) for r in reminders)
+
+    def bulk_shift(self, reminders: list, delta):
+        modified = 0
+        with self._lock:
+            for r in filter(lambda r: r.at, reminders):
+                table = 'intervals' if isinstance(r, IntervalReminder) else 'reminders'
+                stored = self._find(table, 'id = ?', (str(r._id),))
+                # skip reminders which were delivered since they were read
+                if stored and stored[0].at == r.at:
+                    stored[0].at = r.at + delta
+                    modified += self._store(table, stored[0])
+
+        return modified
+
+    def bulk_insert(self, reminders: list):
+        failed = []
+        rem_cnt = intvl_cnt = 0
+
+        with self._transaction():
+            for r in reminders:
+                is_interval = isinstance(r, IntervalReminder)
+                try:
+                    r._id = self._insert('intervals' if is_interval else 'reminders', r)
+                except (sqlite3.Error, bson.errors.BSONError) as e:
+                    failed.append((r, str(e)))
+                    continue
+
+                if is_interval:
+                    intvl_cnt += 1
+                else:
+                    rem_cnt += 1
+
+        Counters.reminders_changed(rem_cnt)
+        Counters.intervals_changed(intvl_cnt)
+        return failed
+
+    def set_reminder_message(self, reminder_id, message: str):
+        return self._modify(reminder_id, msg=message)
+
+    def set_reminder_title(self, reminder_id, title: str):
+        return self._modify(reminder_id, title=title)
+
+    def set_reminder_img_url(self, reminder_id, img_url: str):
+        return self._modify(reminder_id, img_url=img_url)
+
+    def set_reminder_channel(self, reminder_id, channel_id: int, channel_name: str = None):
+        if channel_name:
+            return self._modify(reminder_id, ch_id=int(channel_id), ch_name=str(channel_name))
+        else:
+            return self._modify(reminder_id, ch_id=int(channel_id))
+
+    def get_guild_reminders(self, scope, user_roles=[], sort_return=True):
+        has_perms = False
+
+        if scope.guild_id and self.get_community_mode(scope.guild_id) == Connector.CommunityMode.ENABLED:
+            if self.is_moderator(user_roles):
+                has_perms = True
+
+        if not has_perms:
+            return self.get_scoped_reminders(scope, sort_return=sort_return)
+
+        rems = self._find('reminders', 'g_id = ?', (scope.guild_id,))
+        rems += self._find('intervals', 'g_id = ?', (scope.guild_id,))
+
+        return sorted(rems) if sort_return else rems
+
+    def search_reminders(self, scope, query: str, user_roles=[], limit=None):
+        # no text index, the reminders of the scope are searched in-memory
+        hits = ReminderSearch(self.get_guild_reminders(scope, user_roles)).search(query)
+        return hits[:limit or Connector.SEARCH_LIMIT]
+
+    def iter_reminders(self, scope, user_roles=[], all_users=False, batch_size=None):
+
+        if not all_users and scope.guild_id and self.get_community_mode(scope.guild_id) == Connector.CommunityMode.ENABLED:
+            all_users = self.is_moderator(user_roles)
+
+        if all_users and scope.guild_id:
+            where, params = 'g_id = ?', (scope.guild_id,)
+        elif scope.is_private and scope.user_id:
+            where, params = 'g_id IS NULL AND author = ?', (scope.user_id,)
+        elif scope.user_id and scope.guild_id:
+            where, params = 'g_id = ? AND author = ?', (scope.guild_id, scope.user_id)
+        else:
+            return
+
+        batch_size = batch_size or Connector.EXPORT_BATCH_SIZE
+
+        # keyset pagination, the lock is not held between two batches
+        for table, rem_class in (('reminders', Reminder), ('intervals', IntervalReminder)):
+            last_id = ''
+            while True:
+                rows = self._query(f'SELECT id, doc FROM {table} WHERE {where} AND id > ? ORDER BY id LIMIT ?',
+                                   params + (last_id, batch_size))
+                for row in rows:
+                    yield self._load(rem_class, row)
+
+                if len(rows) < batch_size:
+                    break
+                last_id = rows[-1][0]
+
+    def get_scoped_reminders(self, scope, sort_return=True):
+
+        if scope.is_private and scope.user_id:
+            where, params = 'g_id IS NULL AND author = ?', (scope.user_id,)
+        elif scope.user_id and scope.guild_id:
+            where, params = 'g_id = ? AND author = ?', (scope.guild_id, scope.user_id)
+        else:
+            return []
+
+        rems = self._find('reminders', where, params) + self._find('intervals', where, params)
+        return sorted(rems) if sort_return else rems
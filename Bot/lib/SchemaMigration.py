@@ -0,0 +1,65 @@
+import asyncio
+import logging
+
+import discord
+
+from lib.Connector import Connector
+from lib.Analytics import Analytics
+
+
+log = logging.getLogger('Remindme.Migration')
+
+
+class SchemaMigration:
+    """background conversion of reminders and intervals
+       into the current schema version (see Reminder.SCHEMA_VERSION)
+
+       documents are converted in small batches, the progress is stored
+       in the db and the migration resumes after a restart.
+       Reminder reads both versions, so the bot is fully functional
+       while the migration is running
+    """
+
+    # documents read per batch
+    BATCH_SIZE = 200
+
+    # seconds between two batches, limits the load on the db
+    BATCH_INTERVAL = 2.0
+
+    KINDS = ('reminders', 'intervals')
+
+    _task: asyncio.Task = None
+
+
+    @staticmethod
+    def init(bot: discord.Bot):
+        """start the migration on the loop of the bot
+        """
+        if SchemaMigration._task and not SchemaMigration._task.done():
+            return
+
+        SchemaMigration._task = bot.loop.create_task(SchemaMigration._worker())
+
+
+    @staticmethod
+    async def _worker():
+        for kind in SchemaMigration.KINDS:
+            total = 0
+            done = False
+
+            while not done:
+                try:
+                    # pymongo blocks, keep the loop free for the gateway
+                    converted, done = await asyncio.to_thread(Connector.migrate_schema_batch, kind, SchemaMigration.BATCH_SIZE)
+                except Exception as e:
+                    # retried with the next batch
+                    log.error(f'failed to migrate {kind}', exc_info=e)
+                    Analytics.register_exception(e)
+                    converted = 0
+
+                total += converted
+                if not done:
+                    await asyncio.sleep(SchemaMigration.BATCH_INTERVAL)
+
+            if total:
+                log.info(f'migrated {total} {kind} to the current schema')
@@ -0,0 +1,146 @@
+import os
+import sys
+import time
+import builtins
+import logging
+from contextlib import contextmanager
+
+
+log = logging.getLogger('Remindme.Startup')
+
+
+class StartupProfiler:
+    """timing of the process start, until the gateway is ready
+
+       phases (imports, init, each extension, gateway) are always recorded,
+       STARTUP_PROFILE=1 additionally traces every first import
+       of a module (cumulative and self time, like -X importtime).
+       The report is logged and exported once the bot is ready
+    """
+
+    # number of modules in the import report
+    TOP_IMPORTS = 20
+
+    _start = None
+    _ready = None
+    _phases = {}
+
+    _trace = False
+    _import = None
+    _imports = {}       # module -> [cumulative, self] seconds
+    _stack = []         # child time of the imports in progress
+
+
+    @staticmethod
+    def start():
+        """start the profiler, must be called before the heavy imports"""
+        if StartupProfiler._start is not None:
+            return
+
+        StartupProfiler._start = time.perf_counter()
+
+        if os.getenv('STARTUP_PROFILE', '0').lower() in ('1', 'true'):
+            StartupProfiler._trace = True
+            StartupProfiler._import = builtins.__import__
+            builtins.__import__ = StartupProfiler._traced_import
+
+
+    @staticmethod
+    def _traced_import(name, globals=None, locals=None, fromlist=(), level=0):
+        original = StartupProfiler._import
+
+        # only the first absolute import executes the module
+        if level or name in sys.modules:
+            return original(name, globals, locals, fromlist, level)
+
+        StartupProfiler._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = StartupProfiler._stack.pop()
+            if StartupProfiler._stack:
+                StartupProfiler._stack[-1] += elapsed
+
+            StartupProfiler._imports[name] = [elapsed, elapsed - children]
+
+
+    @staticmethod
+    def elapsed() -> float:
+        """seconds since the profiler was started"""
+        return time.perf_counter() - (StartupProfiler._start or time.perf_counter())
+
+
+    @staticmethod
+    def mark(phase: str):
+        """record the time from the profiler start until now as phase"""
+        StartupProfiler._phases[phase] = StartupProfiler.elapsed()
+
+
+    @staticmethod
+    @contextmanager
+    def phase(name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            StartupProfiler._phases[name] = StartupProfiler._phases.get(name, 0) + time.perf_counter() - start
+
+
+    @staticmethod
+    def stop_trace():
+        if StartupProfiler._import:
+            builtins.__import__ = StartupProfiler._import
+            StartupProfiler._import = None
+
+
+    @staticmethod
+    def ready():
+        """the gateway is ready, report the startup
+           only the first call (re-connects also fire on_ready) is reported
+        """
+        if StartupProfiler._ready is not None or StartupProfiler._start is None:
+            return
+
+        StartupProfiler._ready = StartupProfiler.elapsed()
+        if 'connect' in StartupProfiler._phases:
+            StartupProfiler._phases['gateway'] = StartupProfiler._ready - StartupProfiler._phases['connect']
+        StartupProfiler.stop_trace()
+
+        StartupProfiler.report()
+
+
+    @staticmethod
+    def report():
+        from lib.Analytics import Analytics
+
+        log.info(f'ready after {StartupProfiler._ready:.2f}s')
+        for name, duration in StartupProfiler._phases.items():
+            log.info(f'  {name:<40} {duration:7.3f}s')
+            Analytics.startup_phase(name, duration)
+        Analytics.startup_phase('ready', StartupProfiler._ready)
+
+        if StartupProfiler._trace:
+            log.info('slowest imports (cumulative / self):')
+            top = StartupProfiler.top_imports()
+            for name, (cumulative, self_time) in top:
+                log.info(f'  {name:<40} {cumulative:7.3f}s {self_time:7.3f}s')
+                Analytics.startup_import(name, cumulative)
+
+
+    @staticmethod
+    def top_imports(n: int = None):
+        """
+        Returns:
+            list: (module, [cumulative, self]) of the slowest top-level imports
+        """
+        n = n or StartupProfiler.TOP_IMPORTS
+        return sorted(StartupProfiler._imports.items(), key=lambda i: i[1][0], reverse=True)[:n]
+
+
+    @staticmethod
+    def summary() -> dict:
+        """phases and imports, for the benchmark"""
+        return {'phases': dict(StartupProfiler._phases),
+                'imports': {name: times for name, times in StartupProfiler._imports.items()}}
@@ -0,0 +1,197 @@
+class StorageBackend:
+    """interface of an alternative storage for the Connector
+
+       the Connector is the MongoDB implementation. If a backend is
+       installed (see Connector.init), every public Connector operation
+       is forwarded to the method of the same name of the backend.
+       Arguments and return values are identical to the Connector operation.
+
+       Implementations must keep the Counters up to date
+       when inserting/deleting reminders and intervals
+    """
+
+    def close(self):
+        pass
+
+    def ping(self):
+        raise NotImplementedError()
+
+
+    # =====================
+    # guild purges
+    # =====================
+
+    def queue_guild_purge(self, guild_id: int, shard: int = 0):
+        raise NotImplementedError()
+
+    def get_pending_purges(self):
+        raise NotImplementedError()
+
+    def purge_guild_batch(self, guild_id: int, batch_size: int):
+        raise NotImplementedError()
+
+    def finish_guild_purge(self, guild_id: int):
+        raise NotImplementedError()
+
+    def migrate_schema_batch(self, kind: str, batch_size: int):
+        raise NotImplementedError()
+
+
+    # =====================
+    # settings
+    # =====================
+
+    def get_timezone(self, instance_id: int):
+        raise NotImplementedError()
+
+    def set_timezone(self, instance_id: int, timezone_str):
+        raise NotImplementedError()
+
+    def get_reminder_type(self, instance_id: int):
+        raise NotImplementedError()
+
+    def set_reminder_type(self, instance_id: int, reminder_type):
+        raise NotImplementedError()
+
+    def set_auto_delete(self, instance_id: int, delete_type):
+        raise NotImplementedError()
+
+    def get_auto_delete(self, instance_id: int):
+        raise NotImplementedError()
+
+    def set_community_mode(self, instance_id: int, comm_type):
+        raise NotImplementedError()
+
+    def get_community_mode(self, instance_id: int):
+        raise NotImplementedError()
+
+    def get_legacy_interval_count(self):
+        raise NotImplementedError()
+
+    def set_legacy_interval(self, instance_id: int, mode: bool):
+        raise NotImplementedError()
+
+    def is_legacy_interval(self, instance_id: int) -> bool:
+        raise NotImplementedError()
+
+    def get_experimental_count(self):
+        raise NotImplementedError()
+
+    def set_experimental(self, instance_id: int, mode: bool):
+        raise NotImplementedError()
+
+    def is_experimental(self, instance_id: int):
+        raise NotImplementedError()
+
+    def get_community_count(self):
+        raise NotImplementedError()
+
+    def set_community_settings(self, instance_id: int, settings):
+        raise NotImplementedError()
+
+    def set_community_setting(self, instance_id: int, setting_name: str, value: bool):
+        raise NotImplementedError()
+
+    def get_community_settings(self, instance_id: int):
+        raise NotImplementedError()
+
+    def set_moderators(self, guild_id: int, moderators: list):
+        raise NotImplementedError()
+
+    def get_moderators(self, instance_id: int):
+        raise NotImplementedError()
+
+    def is_moderator(self, user_roles: list):
+        raise NotImplementedError()
+
+
+    # =====================
+    # reminders
+    # =====================
+
+    def add_reminder(self, reminder):
+        raise NotImplementedError()
+
+    def add_interval(self, interval):
+        raise NotImplementedError()
+
+    def update_interval_rules(self, interval):
+        raise NotImplementedError()
+
+    def update_reminder_at(self, reminder):
+        raise NotImplementedError()
+
+    def update_interval_at(self, interval):
+        raise NotImplementedError()
+
+    def delete_orphaned_intervals(self):
+        raise NotImplementedError()
+
+    def get_elapsed_reminders(self, timestamp):
+        raise NotImplementedError()
+
+    def pop_elapsed_reminders(self, timestamp):
+        raise NotImplementedError()
+
+    def get_pending_intervals(self, timestamp):
+        raise NotImplementedError()
+
+    def get_reminder_cnt(self):
+        raise NotImplementedError()
+
+    def get_interval_cnt(self):
+        raise NotImplementedError()
+
+    def get_reminder_by_id(self, reminder_id):
+        raise NotImplementedError()
+
+    def get_interval_by_id(self, interval_id):
+        raise NotImplementedError()
+
+    def get_snoozable_by_id(self, reminder_id):
+        raise NotImplementedError()
+
+    def get_author_of_id(self, reminder_id):
+        raise NotImplementedError()
+
+    def delete_reminder(self, reminder_id):
+        raise NotImplementedError()
+
+    def delete_interval(self, reminder_id):
+        raise NotImplementedError()
+
+    def set_reminder_message(self, reminder_id, message: str):
+        raise NotImplementedError()
+
+    def set_reminder_title(self, reminder_id, title: str):
+        raise NotImplementedError()
+
+    def set_reminder_img_url(self, reminder_id, img_url: str):
+        raise NotImplementedError()
+
+    def set_reminder_channel(self, reminder_id, channel_id: int, channel_name: str = None):
+        raise NotImplementedError()
+
+    def get_guild_reminders(self, scope, user_roles=[], sort_return=True):
+        raise NotImplementedError()
+
+    def search_reminders(self, scope, query: str, user_roles=[], limit=None):
+        raise NotImplementedError()
+
+    def iter_reminders(self, scope, user_roles=[], all_users=False, batch_size=None):
+        raise NotImplementedError()
+
+    def bulk_delete(self, reminders: list):
+        raise NotImplementedError()
+
+    def bulk_set_channel(self, reminders: list, channel_id: int, channel_name: str):
+        raise NotImplementedError()
+
+    def bulk_shift(self, reminders: list, delta):
+        raise NotImplementedError()
+
+    def bulk_insert(self, reminders: list):
+        raise NotImplementedError()
+
+    def get_scoped_reminders(self, scope, sort_return=True):
+        raise NotImplementedError()
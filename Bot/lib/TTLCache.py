@@ -0,0 +1,71 @@
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """small in-process cache with expiring entries
+       the oldest entries are evicted once maxsize is reached
+
+       entries can be invalidated by key or by an alias
+       (e.g. the database _id of a cached document)
+    """
+
+    _MISSING = object()
+
+    def __init__(self, ttl: float, maxsize: int = 10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+
+        self._entries = OrderedDict()
+        self._aliases = {}
+
+
+    def get(self, key, default=None):
+        """return the cached value, default if not cached or expired"""
+        entry = self._entries.get(key, TTLCache._MISSING)
+        if entry is TTLCache._MISSING:
+            return default
+
+        value, stored_at, _ = entry
+        if time.monotonic() - stored_at > self.ttl:
+            self.invalidate(key)
+            return default
+
+        return value
+
+
+    def contains(self, key) -> bool:
+        return self.get(key, TTLCache._MISSING) is not TTLCache._MISSING
+
+
+    def set(self, key, value, alias=None):
+        self.invalidate(key)
+
+        self._entries[key] = (value, time.monotonic(), alias)
+        if alias is not None:
+            self._aliases[alias] = key
+
+        while len(self._entries) > self.maxsize:
+            old_key, _ = next(iter(self._entries.items()))
+            self.invalidate(old_key)
+
+
+    def invalidate(self, key):
+        entry = self._entries.pop(key, None)
+        if entry and entry[2] is not None:
+            self._aliases.pop(entry[2], None)
+
+
+    def invalidate_alias(self, alias):
+        key = self._aliases.get(alias, TTLCache._MISSING)
+        if key is not TTLCache._MISSING:
+            self.invalidate(key)
+
+
+    def clear(self):
+        self._entries.clear()
+        self._aliases.clear()
+
+
+    def __len__(self):
+        return len(self._entries)
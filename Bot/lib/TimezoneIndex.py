@@ -0,0 +1,189 @@
+import bisect
+import difflib
+from datetime import datetime
+from functools import lru_cache
+
+from lib.Timezones import Timezones
+
+
+class TimezoneIndex:
+    """precomputed search index over all timezone names, for the autocomplete
+
+       every zone is reachable by its normalised name, each path component
+       (region, city), the country code/name and its abbreviations (CET, EST, ...).
+       Results are ranked exact > prefix > substring > fuzzy,
+       geo-referenced (common) zones first
+    """
+
+    MAX_RESULTS = 25  # discord limit of autocomplete choices
+
+    # abbreviations which are no zone name on their own
+    ABBREVIATIONS = {
+        'pst': ['PST8PDT', 'America/Los_Angeles'],
+        'pdt': ['PST8PDT', 'America/Los_Angeles'],
+        'cst': ['CST6CDT', 'America/Chicago'],
+        'cdt': ['CST6CDT', 'America/Chicago'],
+        'mdt': ['MST7MDT', 'America/Denver'],
+        'edt': ['EST5EDT', 'America/New_York'],
+    }
+
+    # rank of a match, lower is better
+    EXACT = 0
+    PREFIX = 1
+    WORD_PREFIX = 2
+    SUBSTRING = 3
+    FUZZY = 4
+
+    _zones = None       # all zone names
+    _common = None      # index of zone -> True if geo-referenced
+    _order = None       # index of zone -> position in the tie-break order
+    _names = None       # normalised full name per zone index
+    _exact = None       # key -> set of zone indices
+    _keys = None        # sorted list of (key, zone index)
+    _key_names = None   # sorted list of keys only (bisect)
+
+
+    @staticmethod
+    def normalise(value: str) -> str:
+        return value.strip().lower().replace('_', ' ')
+
+
+    @staticmethod
+    def build(zones: list = None):
+        """(re-)build the index
+
+        Args:
+            zones (list, optional): zone names to index. Defaults to all zones of the registry.
+        """
+        if zones is None:
+            zones = Timezones.zones()
+
+        zone_idx = {zone: i for i, zone in enumerate(zones)}
+        exact = {}
+
+        def add(key, i):
+            key = TimezoneIndex.normalise(key)
+            if key:
+                exact.setdefault(key, set()).add(i)
+
+        summer = datetime(2021, 7, 1)
+        winter = datetime(2021, 1, 1)
+
+        for i, zone in enumerate(zones):
+            add(zone, i)
+
+            # Europe/Isle_of_Man -> europe, isle of man, isle, of, man
+            for part in zone.split('/'):
+                add(part, i)
+                for word in TimezoneIndex.normalise(part).split(' ')[1:]:
+                    add(word, i)
+
+            # abbreviations observed by the zone
+            # the numeric ones (+03) are not helpful
+            tz_obj = Timezones.get(zone)
+            if tz_obj:
+                for date in (winter, summer):
+                    abbr = tz_obj.tzname(date)
+                    if abbr and abbr.isalpha():
+                        add(abbr, i)
+
+            code = Timezones.country_of(zone, default=None)
+            if code:
+                add(code, i)
+                add(Timezones.country_name(code) or '', i)
+
+        for abbr, abbr_zones in TimezoneIndex.ABBREVIATIONS.items():
+            for zone in abbr_zones:
+                if zone in zone_idx:
+                    add(abbr, zone_idx[zone])
+
+        keys = sorted((key, i) for key, indices in exact.items() for i in indices)
+
+        # ties are broken by: geo-referenced, shorter, alphabetical
+        tie_break = sorted(range(len(zones)), key=lambda i: (not Timezones.is_common(zones[i]), len(zones[i]), zones[i]))
+        order = [0] * len(zones)
+        for pos, i in enumerate(tie_break):
+            order[i] = pos
+
+        TimezoneIndex._zones = zones
+        TimezoneIndex._common = [Timezones.is_common(zone) for zone in zones]
+        TimezoneIndex._order = order
+        TimezoneIndex._names = [TimezoneIndex.normalise(zone) for zone in zones]
+        TimezoneIndex._exact = exact
+        TimezoneIndex._keys = keys
+        TimezoneIndex._key_names = [key for key, _ in keys]
+        TimezoneIndex._search.cache_clear()
+
+        # the first keystroke has the most candidates
+        for key in {key[0] for key in exact}:
+            TimezoneIndex._search(key, TimezoneIndex.MAX_RESULTS)
+
+
+    @staticmethod
+    def load():
+        """build the index, unless already built"""
+        if TimezoneIndex._zones is None:
+            TimezoneIndex.build()
+
+
+    @staticmethod
+    def search(value: str, limit: int = MAX_RESULTS) -> list:
+        """ranked zone names matching the (partial) user input
+
+        Args:
+            value (str): user input
+            limit (int, optional): max number of results. Defaults to 25.
+
+        Returns:
+            list: zone names, best match first
+        """
+        TimezoneIndex.load()
+        return list(TimezoneIndex._search(TimezoneIndex.normalise(value or ''), limit))
+
+
+    @staticmethod
+    @lru_cache(maxsize=2048)
+    def _search(query: str, limit: int) -> tuple:
+        zones = TimezoneIndex._zones
+        order = TimezoneIndex._order
+
+        if not query:
+            # no input yet, propose the geo-referenced zones
+            return tuple(z for i, z in enumerate(zones) if TimezoneIndex._common[i])[:limit]
+
+        rank = {}
+
+        def hit(i, score):
+            if score < rank.get(i, TimezoneIndex.FUZZY+1):
+                rank[i] = score
+
+        for i in TimezoneIndex._exact.get(query, ()):
+            hit(i, TimezoneIndex.EXACT)
+
+        # all keys starting with the query are a consecutive range
+        keys = TimezoneIndex._keys
+        names = TimezoneIndex._names
+        pos = bisect.bisect_left(TimezoneIndex._key_names, query)
+        while pos < len(keys) and keys[pos][0].startswith(query):
+            i = keys[pos][1]
+            hit(i, TimezoneIndex.PREFIX if names[i].startswith(query) else TimezoneIndex.WORD_PREFIX)
+            pos += 1
+
+        if len(rank) < limit:
+            for i, name in enumerate(names):
+                if query in name:
+                    hit(i, TimezoneIndex.SUBSTRING)
+
+        if not rank:
+            # typos (e.g. berln), only keys with the same initial and a similar length are compared
+            key_names = TimezoneIndex._key_names
+            lo = bisect.bisect_left(key_names, query[0])
+            hi = bisect.bisect_left(key_names, chr(ord(query[0])+1))
+            candidates = {key for key in key_names[lo:hi] if abs(len(key) - len(query)) <= 2}
+
+            for key in difflib.get_close_matches(query, candidates, n=limit, cutoff=0.7):
+                for i in TimezoneIndex._exact[key]:
+                    hit(i, TimezoneIndex.FUZZY)
+
+        ranked = sorted(rank, key=lambda i: (rank[i], order[i]))
+        return tuple(zones[i] for i in ranked[:limit])
@@ -0,0 +1,194 @@
+import bisect
+from datetime import datetime, timedelta
+
+from dateutil import tz
+
+import logging
+
+log = logging.getLogger('Remindme.Timezones')
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class _TransitionTable:
+    """utc offsets of a tzfile zone, indexed by the transition times
+       the lookup is identical to dateutil (fold=0 for ambiguous local times),
+       without creating tz-aware datetime objects
+
+       reads private attributes of tz.tzfile, raises AttributeError
+       if a dateutil release doesn't provide them
+    """
+
+    def __init__(self, zone: tz.tzfile):
+        self.trans_utc = list(zone._trans_list_utc)
+        self.trans_local = list(zone._trans_list)
+
+        if not zone._ttinfo_std:
+            # zone without any offset information
+            self.offsets = [0] * (len(self.trans_utc) + 1)
+        elif not self.trans_utc:
+            self.offsets = [zone._ttinfo_std.offset]
+        else:
+            # offsets[0] is the offset before the first transition
+            self.offsets = [zone._get_ttinfo(idx).offset for idx in range(-1, len(self.trans_utc))]
+
+
+    def to_local(self, utc: datetime) -> datetime:
+        ts = (utc - _EPOCH).total_seconds()
+        idx = bisect.bisect_right(self.trans_utc, ts)
+        return utc + timedelta(seconds=self.offsets[idx])
+
+
+    def to_utc(self, local: datetime) -> datetime:
+        ts = (local - _EPOCH).total_seconds()
+        idx = bisect.bisect_right(self.trans_local, ts)
+
+        # an ambiguous local time resolves to the first occurrence
+        if idx > 1 and ts < self.trans_local[idx-1] + self.offsets[idx-1] - self.offsets[idx]:
+            idx -= 1
+
+        return local - timedelta(seconds=self.offsets[idx])
+
+
+
+class Timezones:
+    """registry of the timezone data, shared by all modules
+
+       the zone list and country index are loaded once on first use,
+       tzinfo objects and the transition tables are cached per zone string
+    """
+
+    _zones = None
+    _common = None
+    _country_of = None
+
+    _tzinfos = {}
+    _tables = {}
+
+
+    @staticmethod
+    def zones() -> list:
+        """all zone names of the zoneinfo file, sorted"""
+        if Timezones._zones is None:
+            from dateutil.zoneinfo import getzoneinfofile_stream, ZoneInfoFile
+            Timezones._zones = sorted(ZoneInfoFile(getzoneinfofile_stream()).zones.keys())
+        return Timezones._zones
+
+
+    @staticmethod
+    def is_common(tz_str: str) -> bool:
+        """True if the zone is a geo-referenced (non-deprecated) zone"""
+        if Timezones._common is None:
+            from pytz import common_timezones as pytz_common_timezones
+            Timezones._common = frozenset(pytz_common_timezones)
+        return tz_str in Timezones._common
+
+
+    @staticmethod
+    def country_of(tz_str: str, default='UNK') -> str:
+        """ISO country code of the zone
+
+        Returns:
+            str: country code, default if the zone isn't assigned to a country
+        """
+        if Timezones._country_of is None:
+            from pytz import country_timezones
+            Timezones._country_of = {zone: code for code in country_timezones for zone in country_timezones[code]}
+        return Timezones._country_of.get(tz_str, default)
+
+
+    @staticmethod
+    def country_name(code: str) -> str:
+        from pytz import country_names
+        return country_names.get(code.upper(), None)
+
+
+    @staticmethod
+    def get(tz_str: str):
+        """interned tzinfo object of the zone string
+
+        Args:
+            tz_str (str): zone name, None for UTC
+
+        Returns:
+            tzinfo: None if the zone is invalid
+        """
+        tz_obj = Timezones._tzinfos.get(tz_str, None)
+        if tz_obj is None:
+            tz_obj = tz.gettz(tz_str)
+            # invalid user input isn't cached
+            if tz_obj is not None:
+                Timezones._tzinfos[tz_str] = tz_obj
+
+        return tz_obj
+
+
+    @staticmethod
+    def _table(tz_str: str):
+        """transition table of the zone
+
+        Returns:
+            _TransitionTable: None/False if the generic conversion must be used
+        """
+        table = Timezones._tables.get(tz_str, None)
+        if table is None:
+            tz_obj = Timezones.get(tz_str)
+            if not isinstance(tz_obj, tz.tzfile):
+                # utc, posix strings (UTC+3), ... use the generic conversion
+                return None
+
+            try:
+                table = _TransitionTable(tz_obj)
+            except AttributeError:
+                # internals of tzfile changed, fall back to the (slower) public conversion
+                log.warning(f'no transition table for {tz_str}, unsupported dateutil version')
+                table = False
+
+            Timezones._tables[tz_str] = table
+
+        return table
+
+
+    @staticmethod
+    def to_local(utc: datetime, tz_str: str) -> datetime:
+        """convert a non tz-aware utc time into the local time of the zone
+
+        Returns:
+            datetime: non tz-aware local time
+        """
+        table = Timezones._table(tz_str)
+        if table:
+            return table.to_local(utc)
+
+        return utc.replace(tzinfo=tz.UTC).astimezone(Timezones.get(tz_str)).replace(tzinfo=None)
+
+
+    @staticmethod
+    def to_local_many(utcs: list, tz_str: str) -> list:
+        """convert many utc times into the same zone, the zone is resolved once
+           None entries are kept
+
+        Returns:
+            list: non tz-aware local times
+        """
+        table = Timezones._table(tz_str)
+        if table:
+            return [table.to_local(utc) if utc else None for utc in utcs]
+
+        return [Timezones.to_local(utc, tz_str) if utc else None for utc in utcs]
+
+
+    @staticmethod
+    def to_utc(local: datetime, tz_str: str) -> datetime:
+        """convert a non tz-aware local time of the zone into utc
+           ambiguous times resolve to the first occurrence
+
+        Returns:
+            datetime: non tz-aware utc time
+        """
+        table = Timezones._table(tz_str)
+        if table:
+            return table.to_utc(local)
+
+        return local.replace(tzinfo=Timezones.get(tz_str)).astimezone(tz.UTC).replace(tzinfo=None)
@@ -6,27 +6,51 @@ import dateutil.parser
 from dateutil.relativedelta import *
 from dateutil import tz
 import dateutil.rrule as rr
-from parsedatetime import parsedatetime
 
-from lib.recurrent.src.recurrent.event_parser import RecurringEvent
+from lib.Clock import Clock
+from lib.Timezones import Timezones
 
 
-_parse_consts = parsedatetime.Constants(localeID='en_US', usePyICU=True)
-_parse_consts.useMeridian = False
-_parse_consts.use24 = True
-_parse_consts.dateFormats = {
-    'full': 'EEEE, d. MMMM yyyy',
-    'long': 'd. MMMM yyyy',
-    'medium': 'dd.MM.yyyy',
-    'short': 'dd.MM.yy',
-}
-_parse_consts.timeFormats = {
-    'full': 'HH:mm:ss v',
-    'long': 'HH:mm:ss z',
-    'medium': 'HH:mm:ss',
-    'short': 'HH:mm',
-}
-_parse_consts.dp_order = ['d', 'm', 'y']
+# parsedatetime (PyICU) and recurrent are slow to load
+# they are imported on first use (or by warmup), not during the startup
+_parse_consts = None
+
+
+def _get_parse_consts():
+    global _parse_consts
+
+    if _parse_consts is None:
+        from parsedatetime import parsedatetime
+
+        consts = parsedatetime.Constants(localeID='en_US', usePyICU=True)
+        consts.useMeridian = False
+        consts.use24 = True
+        consts.dateFormats = {
+            'full': 'EEEE, d. MMMM yyyy',
+            'long': 'd. MMMM yyyy',
+            'medium': 'dd.MM.yyyy',
+            'short': 'dd.MM.yy',
+        }
+        consts.timeFormats = {
+            'full': 'HH:mm:ss v',
+            'long': 'HH:mm:ss z',
+            'medium': 'HH:mm:ss',
+            'short': 'HH:mm',
+        }
+        consts.dp_order = ['d', 'm', 'y']
+        _parse_consts = consts
+
+    return _parse_consts
+
+
+def _recurring_event(now_date):
+    from lib.recurrent.src.recurrent.event_parser import RecurringEvent
+    return RecurringEvent(now_date=now_date, preferred_time_range=(0,12), parse_constants=_get_parse_consts())
+
+
+def warmup():
+    """load the parser dependencies, can be called from a thread"""
+    _recurring_event(datetime.utcnow())
 
 
 def num_to_emoji(num: int):
@@ -271,7 +295,7 @@ def _parse_fuzzy(input, utcnow, display_tz):
         # although the parser is ignoring them
         input = matched_regex.sub(replace_datetime.strftime('%d/%m/%Y %H:%M:%S.%f'), input)
 
-    r = RecurringEvent(now_date=localnow, preferred_time_range=(0,12), parse_constants=_parse_consts)
+    r = _recurring_event(localnow)
     remind_parse = r.parse(input)
 
     if remind_parse is None:
@@ -323,7 +347,7 @@ def parse(input, utcnow, timezone='UTC'):
     """
     err = False
 
-    display_tz = tz.gettz(timezone)
+    display_tz = Timezones.get(timezone)
     tz_now = utcnow.replace(tzinfo=tz.UTC).astimezone(display_tz) # create local time, used for some parsers
     
     # first split into the different arguments
@@ -372,22 +396,46 @@ def parse(input, utcnow, timezone='UTC'):
 
 
 
+def parse_duration(input, utcnow):
+    """parse a relative duration (2h, 1d 30m, ...)
+       months and years keep their calendar length when applied to a date
+
+    Args:
+        input (str): input string, provided by the user
+        utcnow (datetime): current utc time, reference for the calendar units
+
+    Returns:
+        (relativedelta, str): relativedelta: the duration, None on failure
+                              str: info string on why the parser failed
+    """
+    rx = re.compile(r'[^a-zA-Z0-9-]') # allow negative sign
+    args = list(filter(lambda a: a != None and a != '', rx.split(input)))
+    args = _join_spaced_args(list(map(_split_arg, args)))
+
+    shifted, info, ex = _parse_relative(args, utcnow)
+    if shifted == utcnow:
+        return (None, info or '• the duration must not be 0\n')
+
+    return (relativedelta(shifted, utcnow), info)
+
+
+
 def rrule_to_english(rrule, now=None):
     """convert a rrule or rrule string back to an english natural interval
        can aswell suport datetime objects as input
 
     Args:
         rrule (rrule.rrule or str or datetime.datetime): input argument 
-        now (datetime.datetime, optional): current time for parser. Defaults to utcnow()
+        now (datetime.datetime, optional): current time for parser. Defaults to Clock.utcnow()
 
     Returns:
         [str]: description of inputted interval or date in english
     """
     
     if not now:
-        now = datetime.utcnow()
+        now = Clock.utcnow()
 
-    r = RecurringEvent(now_date=now, preferred_time_range=(0,12), parse_constants=_parse_consts)
+    r = _recurring_event(now)
     text = r.format(rrule)
     
     return text
@@ -43,7 +43,7 @@ def check_user_permission(guild_id: int, user_roles: list, required_perms:Commun
         (required_perms.foreign and active_settings.restrict_foreign) or\
         (required_perms.settings):
 
-        Analytics.command_denied()
+        Analytics.command_denied(shard=Analytics.shard_of(guild_id))
         return False
     else:
         return True
@@ -1,4 +1,8 @@
 import os
+from lib.StartupProfiler import StartupProfiler
+StartupProfiler.start()
+
+import asyncio
 import discord
 from discord.ext import tasks
 import logging
@@ -12,15 +16,21 @@ from discord.ext.servercount import ServerCount
 
 from lib.Connector import Connector
 from lib.Analytics import Analytics, Types
+from lib.LoopWatchdog import LoopWatchdog
+from lib.InteractionTiming import InteractionTiming
+from lib.GuildPurge import GuildPurge
+from lib.SchemaMigration import SchemaMigration
+from lib.ChangeListener import ChangeListener
+from lib.LogPipeline import LogPipeline
+from lib.ChannelIndex import ChannelIndex
+import lib.input_parser
 
 FEEDBACK_CHANNEL = 872104333007785984
 FEEDBACK_MENTION = 872107119988588566
 
 
-logging.basicConfig(level=logging.INFO) # general 3rd party
-
-handler = logging.FileHandler(filename='./logs/discord.log', encoding='utf-8', mode='w')
-handler.setFormatter(logging.Formatter('%(asctime)s:%(levelname)s:%(name)s: %(message)s'))
+# console + file are written by a listener thread, not by the event loop
+LogPipeline.init('./logs/discord.log', level=logging.INFO) # general 3rd party
 
 logging.getLogger('discord').setLevel(logging.WARNING) # reduce warning for discord lib
 
@@ -31,6 +41,12 @@ logging.getLogger('Remindme.Creation').setLevel(logging.DEBUG)
 logging.getLogger('Remindme.Core').setLevel(logging.DEBUG)
 logging.getLogger('Remindme.Admin').setLevel(logging.DEBUG)
 logging.getLogger('Remindme.Settings').setLevel(logging.DEBUG)
+logging.getLogger('Remindme.Watchdog').setLevel(logging.DEBUG)
+logging.getLogger('Remindme.Timing').setLevel(logging.DEBUG)
+logging.getLogger('Remindme.Purge').setLevel(logging.DEBUG)
+logging.getLogger('Remindme.Migration').setLevel(logging.DEBUG)
+logging.getLogger('Remindme.Changes').setLevel(logging.DEBUG)
+logging.getLogger('Remindme.Startup').setLevel(logging.DEBUG)
 
 # tmp verbosity
 logging.getLogger('ext.servercount').setLevel(logging.DEBUG)
@@ -38,9 +54,6 @@ logging.getLogger('ext.servercount').setLevel(logging.DEBUG)
 log = logging.getLogger('Remindme')
 log.setLevel(logging.DEBUG) # own code
 
-# root logger inherits handler to all other loggers
-logging.getLogger().addHandler(handler)
-
 
 token: str = os.getenv('BOT_TOKEN')
 intents = discord.Intents.none()
@@ -106,7 +119,7 @@ async def log_exception(ctx: discord.ApplicationContext, error: Exception, error
         error (Exception): _description_
         error_id (str): _description_
     """
-    Analytics.register_exception(error)
+    Analytics.register_exception(error, shard=ctx.guild.shard_id if ctx.guild else 0)
     if isinstance(error, discord.NotFound):
         log.warning('interaction timed out (not found)')
     else:
@@ -121,6 +134,8 @@ async def log_exception(ctx: discord.ApplicationContext, error: Exception, error
 
 @bot.event
 async def on_ready():
+    StartupProfiler.ready()
+
     log.info('Logged in as')
     log.info(bot.user)
     log.info(bot.user.id)
@@ -129,12 +144,21 @@ async def on_ready():
     config_help()
 
     await bot.change_presence(activity=discord.Game(name='/remindme'))
+
+    # opt-in, only runs if LOOP_WATCHDOG_MS is set
+    LoopWatchdog.init()
+
     log.debug('starting basic statistics loops')
 
     if not update_community_count.is_running():
         update_community_count.start()
     if not update_experimental_count.is_running():
         update_experimental_count.start()
+    if not update_shard_stats.is_running():
+        update_shard_stats.start()
+
+    # the parser is initialized after the gateway connect, not on the first command
+    await asyncio.to_thread(lib.input_parser.warmup)
 
 
 @bot.event
@@ -186,20 +210,47 @@ async def on_error(event_method, *args, **kwargs):
 
 @bot.event
 async def on_guild_remove(guild):
-    del_rem, del_intvl = Connector.delete_guild(guild.id)
+    # reminders are deleted in the background
+    # the deleted counts are reported once the purge is done
+    GuildPurge.queue(guild)
+    ChannelIndex.guild_removed(guild.id)
     
     Analytics.guild_removed()
-    Analytics.reminder_deleted(Types.DeleteAction.KICK, count=del_rem)
-    Analytics.interval_deleted(Types.DeleteAction.KICK, count=del_intvl)
 
     log.debug(f'removed from guild (total count: {len(bot.guilds)})')
 
 
+@bot.event
+async def on_guild_available(guild):
+    # dispatched for every guild after a (re-)identify
+    ChannelIndex.guild_available(guild.id)
+
+
+
+
+@bot.event
+async def on_guild_channel_create(channel):
+    ChannelIndex.channel_created(channel)
+
+
+@bot.event
+async def on_guild_channel_update(before, after):
+    ChannelIndex.channel_updated(after)
+
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    ChannelIndex.channel_deleted(channel)
+
+
 
 
 @bot.event
 async def on_guild_join(guild):
 
+    # re-joined before all reminders were deleted
+    GuildPurge.cancel(guild.id)
+
     # new guilds do not use the legacy mode
     Connector.set_legacy_interval(guild.id, False)
 
@@ -288,6 +339,11 @@ async def update_community_count():
     Analytics.guild_cnt(len(bot.guilds))
 
 
+@tasks.loop(minutes=1)
+async def update_shard_stats():
+    Analytics.shard_stats(bot)
+
+
 @update_community_count.before_loop
 async def update_community_count_before():
     await bot.wait_until_ready()
@@ -299,20 +355,35 @@ async def update_experimental_count_before():
 
 
 
+def load_extensions():
+    extensions = [f'cogs.{filename[:-3]}' for filename in os.listdir(Path(__file__).parent / 'cogs') if filename.endswith('.py')]
+    extensions += ['discord.ext.help.help', 'discord.ext.servercount.servercount']
+
+    for ext in extensions:
+        with StartupProfiler.phase(f'extension.{ext.split(".")[-1]}'):
+            bot.load_extension(ext)
+
+
 def main():
-    Connector.init()
-    Analytics.init()
+    StartupProfiler.mark('imports')
 
-    for filename in os.listdir(Path(__file__).parent / 'cogs'):
-        if filename.endswith('.py'):
-            bot.load_extension(f'cogs.{filename[:-3]}')
+    with StartupProfiler.phase('init'):
+        Connector.init()
+        Analytics.init(bot)
+        InteractionTiming.init(bot)
+        GuildPurge.init(bot)
+        SchemaMigration.init(bot)
+        ChangeListener.init(bot)
 
-    bot.load_extension('discord.ext.help.help')
-    bot.load_extension('discord.ext.servercount.servercount')
+    load_extensions()
 
     set_tokens()
+    StartupProfiler.mark('connect')
     bot.run(token)
 
+    Analytics.close()
+    LogPipeline.close()
+
 
 
 
@@ -0,0 +1,293 @@
+import time
+import random
+import asyncio
+import itertools
+from collections import defaultdict, deque
+
+import discord
+
+from lib.Clock import Clock
+
+
+_snowflakes = itertools.count(100000000000000000)
+
+def snowflake() -> int:
+    return next(_snowflakes)
+
+
+class FakeResponse:
+    """minimal aiohttp response, required to construct discord.HTTPException"""
+
+    def __init__(self, status: int, reason: str):
+        self.status = status
+        self.reason = reason
+
+
+class FakeHTTP:
+    """stub of the Discord HTTP layer
+
+       every request waits for the configured latency.
+       The per-channel rate limit (messages per period) is simulated
+       by waiting for the bucket to reset, as discord.py does on a 429.
+       All sent messages are recorded with their send time (Clock.utcnow)
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, rate_limit: int = 5, rate_period: float = 5.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.rate_period = rate_period
+
+        self.requests = 0
+        self.rate_limited = 0
+        self.rate_limit_wait = 0.0
+
+        # (channel_id, content, embed, utc send time)
+        self.sent = []
+
+        self._buckets = defaultdict(deque)
+
+
+    async def request(self, bucket=None):
+        self.requests += 1
+
+        if bucket is not None and self.rate_limit:
+            history = self._buckets[bucket]
+            now = time.monotonic()
+            while history and now - history[0] > self.rate_period:
+                history.popleft()
+
+            if len(history) >= self.rate_limit:
+                retry_after = self.rate_period - (now - history[0])
+                self.rate_limited += 1
+                self.rate_limit_wait += retry_after
+                await asyncio.sleep(retry_after)
+                history.popleft()
+
+            history.append(time.monotonic())
+
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            # still yield to the loop, like a real request
+            await asyncio.sleep(0)
+
+
+    async def send(self, channel_id: int, content=None, embed=None, forbidden=False):
+        await self.request(bucket=channel_id)
+
+        if forbidden:
+            raise discord.Forbidden(FakeResponse(403, 'Forbidden'), 'Missing Permissions')
+
+        self.sent.append((channel_id, content, embed, Clock.utcnow()))
+        return FakeMessage(channel_id, content)
+
+
+
+class FakeMessage:
+    def __init__(self, channel_id: int, content=None):
+        self.id = snowflake()
+        self.channel_id = channel_id
+        self.content = content
+
+    async def edit(self, **kwargs):
+        pass
+
+    async def delete(self, **kwargs):
+        pass
+
+
+class FakeUser:
+    def __init__(self, http: FakeHTTP, user_id: int = None, bot=False, dm_forbidden=False):
+        self.http = http
+        self.id = user_id or snowflake()
+        self.bot = bot
+        self.name = f'user{self.id}'
+        self.display_name = self.name
+        self.mention = f'<@{self.id}>'
+        self.avatar = None
+        self.default_avatar = discord.Asset._from_default_avatar(None, 0)
+        self.roles = []
+        self.dm_forbidden = dm_forbidden
+
+    async def create_dm(self):
+        return FakeDM(self)
+
+
+class FakeDM:
+    def __init__(self, user: FakeUser):
+        self.user = user
+        self.id = user.id
+
+    async def send(self, content=None, embed=None, **kwargs):
+        return await self.user.http.send(self.id, content, embed, forbidden=self.user.dm_forbidden)
+
+
+class FakeMember(FakeUser):
+    def __init__(self, http: FakeHTTP, guild, permissions: discord.Permissions, **kwargs):
+        super().__init__(http, **kwargs)
+        self.guild = guild
+        self.guild_permissions = permissions
+
+
+class FakeTextChannel:
+    """text channel with fixed permissions of the bot
+       forbidden simulates a permission change discord reports on send
+    """
+
+    def __init__(self, guild, permissions: discord.Permissions = None, forbidden=False, name=None):
+        self.guild = guild
+        self.id = snowflake()
+        self.name = name or f'channel{self.id}'
+        self.permissions = permissions if permissions is not None else guild.me.guild_permissions
+        self.forbidden = forbidden
+
+    def permissions_for(self, member):
+        return self.permissions
+
+    async def send(self, content=None, embed=None, **kwargs):
+        return await self.guild.http.send(self.id, content, embed, forbidden=self.forbidden)
+
+    def history(self, limit=None):
+        return FakeHistory([])
+
+
+class FakeThread(discord.Thread):
+    """thread (isinstance checks of the bot must pass)
+       only the attributes used by the bot are set
+    """
+
+    def __init__(self, guild, permissions: discord.Permissions = None, locked=False, name=None):
+        self.guild = guild
+        self.id = snowflake()
+        self.name = name or f'thread{self.id}'
+        self.locked = locked
+        self.permissions = permissions if permissions is not None else guild.me.guild_permissions
+
+    def __repr__(self):
+        return f'<FakeThread id={self.id} locked={self.locked}>'
+
+    def permissions_for(self, member):
+        return self.permissions
+
+    async def send(self, content=None, embed=None, **kwargs):
+        # discord rejects messages into locked threads
+        return await self.guild.http.send(self.id, content, embed, forbidden=self.locked)
+
+
+class FakeHistory:
+    def __init__(self, messages):
+        self.messages = messages
+
+    async def flatten(self):
+        return self.messages
+
+
+class FakeGuild:
+    def __init__(self, bot, shard_id: int = 0, permissions: discord.Permissions = None):
+        self.bot = bot
+        self.http = bot.http
+        self.id = snowflake()
+        self.name = f'guild{self.id}'
+        self.shard_id = shard_id
+        self.channels = {}
+        self.default_role = None
+
+        if permissions is None:
+            permissions = discord.Permissions(send_messages=True, read_messages=True, embed_links=True)
+        self.me = FakeMember(self.http, self, permissions, user_id=bot.user.id, bot=True)
+
+    def add_channel(self, channel):
+        self.channels[channel.id] = channel
+        return channel
+
+    def get_channel_or_thread(self, channel_id: int):
+        return self.channels.get(channel_id)
+
+    def get_channel(self, channel_id: int):
+        return self.channels.get(channel_id)
+
+
+class FakeBot:
+    """stand-in for the AutoShardedBot, as used by the cogs
+
+       guilds, channels and users are registered by the test,
+       unknown ids raise NotFound like the api
+    """
+
+    def __init__(self, shard_count: int = 1, http: FakeHTTP = None):
+        self.http = http or FakeHTTP()
+        self.shard_count = shard_count
+        self.shards = {i: None for i in range(shard_count)}
+        self.user = FakeUser(self.http, bot=True)
+        self.latency = 0.0
+
+        self._guilds = {}
+        self._users = {}
+        self._ready = asyncio.Event()
+
+    @property
+    def guilds(self):
+        return list(self._guilds.values())
+
+    @property
+    def loop(self):
+        return asyncio.get_event_loop()
+
+    def add_guild(self, **kwargs) -> FakeGuild:
+        guild = FakeGuild(self, **kwargs)
+        self._guilds[guild.id] = guild
+        return guild
+
+    def add_user(self, **kwargs) -> FakeUser:
+        user = FakeUser(self.http, **kwargs)
+        self._users[user.id] = user
+        return user
+
+    def get_guild(self, guild_id: int):
+        return self._guilds.get(guild_id)
+
+    def get_user(self, user_id: int):
+        return self._users.get(user_id)
+
+    async def fetch_user(self, user_id: int):
+        await self.http.request()
+        if user_id not in self._users:
+            raise discord.NotFound(FakeResponse(404, 'Not Found'), 'Unknown User')
+        return self._users[user_id]
+
+    async def fetch_channel(self, channel_id: int):
+        await self.http.request()
+        for guild in self._guilds.values():
+            if channel_id in guild.channels:
+                return guild.channels[channel_id]
+        raise discord.NotFound(FakeResponse(404, 'Not Found'), 'Unknown Channel')
+
+    async def wait_until_ready(self):
+        # the task loops of the cogs are driven by the test
+        await self._ready.wait()
+
+    def is_ready(self):
+        return self._ready.is_set()
+
+
+class FakeContext:
+    """application context of a slash command"""
+
+    def __init__(self, bot: FakeBot, author: FakeUser, guild: FakeGuild = None, channel=None):
+        self.bot = bot
+        self.author = author
+        self.guild = guild
+        self.channel = channel
+        self.channel_id = channel.id if channel else None
+        self.interaction = None
+        self.responses = []
+
+    async def defer(self, ephemeral=False):
+        await self.bot.http.request()
+
+    async def respond(self, content=None, embed=None, **kwargs):
+        await self.bot.http.request()
+        self.responses.append((content, embed))
+        return FakeMessage(self.channel_id, content)
@@ -0,0 +1,187 @@
+"""offline load test of the reminder delivery
+
+inserts N due reminders into the memory backend and delivers them with
+the real ReminderModule against a simulated Discord. Reports throughput,
+delivery lag and memory usage
+
+run from within ./Bot:
+    python -m testing.loadGenerator -n 10000 --latency 40
+"""
+import re
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tracemalloc
+import resource
+from datetime import datetime, timedelta
+
+import discord
+
+from lib.Connector import Connector
+from lib.Reminder import Reminder, IntervalReminder
+from testing.memoryBackend import MemoryBackend
+from testing.fakeDiscord import FakeBot, FakeHTTP, FakeTextChannel, FakeThread
+
+
+_MSG_ID = re.compile(r'load (\d+)\b')
+
+
+def _percentile(values: list, q: float):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    idx = min(len(values)-1, int(round(q * (len(values)-1))))
+    return values[idx]
+
+
+def build_world(args, bot: FakeBot):
+    """create guilds, channels and users
+       the channel mix follows the failure fractions of the arguments
+
+    Returns:
+        tuple(list, list): list of (guild, channel_id), list of users
+    """
+    no_embed = discord.Permissions(send_messages=True, read_messages=True)
+    targets = []
+
+    for g in range(args.guilds):
+        guild = bot.add_guild(shard_id=g % args.shards)
+
+        for _ in range(args.channels):
+            roll = random.random()
+            if roll < args.forbidden:
+                channel = guild.add_channel(FakeTextChannel(guild, forbidden=True))
+            elif roll < args.forbidden + args.locked:
+                channel = guild.add_channel(FakeThread(guild, locked=True))
+            elif roll < args.forbidden + args.locked + args.no_embed:
+                channel = guild.add_channel(FakeTextChannel(guild, permissions=no_embed))
+            elif roll < args.forbidden + args.locked + args.no_embed + args.missing:
+                # deleted channel, fetch raises NotFound
+                channel = FakeTextChannel(guild)
+            else:
+                channel = guild.add_channel(FakeTextChannel(guild))
+
+            targets.append((guild, channel.id))
+
+    users = [bot.add_user(dm_forbidden=random.random() < args.dm_forbidden) for _ in range(args.users)]
+    return targets, users
+
+
+def insert_reminders(args, targets: list, users: list, now: datetime):
+    """insert N reminders, due within the last spread seconds
+
+    Returns:
+        dict: message index -> due date
+    """
+    due = {}
+
+    for i in range(args.n):
+        is_interval = random.random() < args.intervals
+        rem = IntervalReminder() if is_interval else Reminder()
+
+        user = random.choice(users)
+        rem.author = user.id
+        rem.target = user.id
+        rem.target_mention = user.mention
+        rem.target_name = user.name
+        rem.msg = f'load {i}'
+        rem.created_at = now - timedelta(days=1)
+        rem.at = now - timedelta(seconds=random.uniform(0, args.spread))
+
+        if random.random() >= args.dm:
+            guild, ch_id = random.choice(targets)
+            rem.g_id = guild.id
+            rem.ch_id = ch_id
+            rem.ch_name = 'load'
+
+        if is_interval:
+            rem.first_at = rem.at
+            rem.rrules.append(f'DTSTART:{rem.at:%Y%m%dT%H%M%S}\nRRULE:FREQ=DAILY')
+            Connector.add_interval(rem)
+        else:
+            Connector.add_reminder(rem)
+
+        due[i] = rem.at
+
+    return due
+
+
+async def run(args):
+    random.seed(args.seed)
+
+    MemoryBackend.install()
+    http = FakeHTTP(latency=args.latency/1000, jitter=args.jitter/1000,
+                    rate_limit=args.rate_limit, rate_period=args.rate_period)
+    bot = FakeBot(shard_count=args.shards, http=http)
+
+    targets, users = build_world(args, bot)
+
+    now = datetime.utcnow()
+    due = insert_reminders(args, targets, users, now)
+
+    # the cog starts its loops, they wait for the (never set) ready event
+    from cogs.ReminderModule import ReminderModule
+    cog = ReminderModule(bot)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    await cog.check_pending_reminders()
+    await cog.check_pending_intervals()
+
+    elapsed = time.perf_counter() - start
+    _, mem_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    cog.cog_unload()
+
+    # the lag is measured from the due date to the first message containing the reminder
+    lags = {}
+    for _, content, embed, sent_at in http.sent:
+        text = ' '.join(filter(None, [content, embed.description if embed else None]))
+        for match in _MSG_ID.finditer(text):
+            idx = int(match.group(1))
+            if idx in due and idx not in lags:
+                lags[idx] = (sent_at - due[idx]).total_seconds()
+
+    lag_values = list(lags.values())
+
+    print(f'reminders:      {args.n} ({len(lags)} delivered, {args.n - len(lags)} not delivered)')
+    print(f'elapsed:        {elapsed:.2f}s')
+    print(f'throughput:     {len(lags)/elapsed if elapsed else 0:.1f} reminders/s')
+    print(f'http requests:  {http.requests} ({http.rate_limited} rate limited, {http.rate_limit_wait:.1f}s waited)')
+    print(f'lag p50:        {_percentile(lag_values, 0.50):.2f}s')
+    print(f'lag p95:        {_percentile(lag_values, 0.95):.2f}s')
+    print(f'lag p99:        {_percentile(lag_values, 0.99):.2f}s')
+    print(f'lag max:        {max(lag_values, default=0):.2f}s')
+    print(f'memory peak:    {mem_peak/1024/1024:.1f} MiB (traced), {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024:.1f} MiB (max rss)')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='offline load test of the reminder delivery')
+    parser.add_argument('-n', type=int, default=1000, help='number of due reminders')
+    parser.add_argument('--guilds', type=int, default=50)
+    parser.add_argument('--channels', type=int, default=5, help='channels per guild')
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--shards', type=int, default=1)
+    parser.add_argument('--spread', type=float, default=60, help='reminders are due within the last N seconds')
+    parser.add_argument('--intervals', type=float, default=0.1, help='fraction of repeating reminders')
+    parser.add_argument('--dm', type=float, default=0.1, help='fraction of DM reminders')
+    parser.add_argument('--forbidden', type=float, default=0.02, help='fraction of channels rejecting messages')
+    parser.add_argument('--locked', type=float, default=0.01, help='fraction of locked threads')
+    parser.add_argument('--no-embed', type=float, default=0.05, help='fraction of channels without embed permissions')
+    parser.add_argument('--missing', type=float, default=0.02, help='fraction of deleted channels')
+    parser.add_argument('--dm-forbidden', type=float, default=0.05, help='fraction of users with closed DMs')
+    parser.add_argument('--latency', type=float, default=0, help='http latency in ms')
+    parser.add_argument('--jitter', type=float, default=0, help='additional random http latency in ms')
+    parser.add_argument('--rate-limit', type=int, default=5, help='messages per channel and rate period, 0 to disable')
+    parser.add_argument('--rate-period', type=float, default=5.0, help='seconds')
+    parser.add_argument('--seed', type=int, default=0)
+
+    args = parser.parse_args(argv)
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from lib.Connector import Connector
+from lib.SQLiteBackend import SQLiteBackend
+
+
+class MemoryBackend(SQLiteBackend):
+    """Connector storage which only lives in memory
+       used by the offline test harness, nothing is persisted
+    """
+
+    def __init__(self):
+        super().__init__(':memory:')
+
+
+    def next_due(self):
+        """earliest due date of all reminders and intervals
+
+        Returns:
+            datetime: non tz-aware utc time, None if nothing is scheduled
+        """
+        at = self._query('SELECT MIN(at) FROM (SELECT at FROM reminders UNION ALL SELECT at FROM intervals)')[0][0]
+        return datetime.fromtimestamp(at) if at is not None else None
+
+
+    @staticmethod
+    def install():
+        """replace the storage of the Connector with a new, empty memory backend
+
+        Returns:
+            MemoryBackend: the installed backend
+        """
+        if Connector.backend is not None:
+            Connector.backend.close()
+
+        Connector.backend = MemoryBackend()
+        return Connector.backend
@@ -0,0 +1,188 @@
+"""replay of the interval scheduling in virtual time
+
+creates repeating reminders in several timezones and runs the real
+scan/reschedule loops of the ReminderModule against the memory backend.
+The virtual clock jumps from one loop tick to the next tick with a due
+reminder, a year of firings (including the DST transitions) runs in seconds
+
+every delivery is checked against the local wall time of its rule,
+missed/duplicate firings are counted against the rule expansion
+
+run from within ./Bot:
+    python -m testing.schedulerSimulation -n 500 --days 365
+"""
+import re
+import sys
+import math
+import time
+import asyncio
+import argparse
+from collections import Counter
+from datetime import datetime, timedelta
+
+from dateutil import tz
+import dateutil.rrule as rr
+
+from lib.Clock import Clock, VirtualClock
+from lib.Connector import Connector
+from lib.Reminder import IntervalReminder
+from testing.memoryBackend import MemoryBackend
+from testing.fakeDiscord import FakeBot, FakeHTTP, FakeTextChannel
+
+
+_MSG_ID = re.compile(r'sim (\d+)\b')
+
+DEFAULT_ZONES = 'UTC,Europe/Berlin,America/New_York,Australia/Sydney,Asia/Kolkata'
+
+# (name, local hour, local minute, rrule kwargs)
+# 02:30/01:30 fall into the skipped/repeated hour of the DST transitions
+RULES = [
+    ('daily 09:00', 9, 0, dict(freq=rr.DAILY)),
+    ('daily 02:30', 2, 30, dict(freq=rr.DAILY)),
+    ('daily 01:30', 1, 30, dict(freq=rr.DAILY)),
+    ('weekly mo,fr 18:15', 18, 15, dict(freq=rr.WEEKLY, byweekday=(rr.MO, rr.FR))),
+    ('monthly last day 12:00', 12, 0, dict(freq=rr.MONTHLY, bymonthday=-1)),
+]
+
+
+def _local(utc: datetime, zone) -> datetime:
+    return utc.replace(tzinfo=tz.UTC).astimezone(zone).replace(tzinfo=None)
+
+
+def create_intervals(args, bot: FakeBot, start: datetime, end: datetime):
+    """one guild per timezone, the intervals are distributed round robin
+
+    Returns:
+        dict: message index -> (rule name, zone name, wall time in s, expected firings)
+    """
+    channels = []
+    for zone_name in args.zones.split(','):
+        guild = bot.add_guild()
+        Connector.set_timezone(guild.id, zone_name)
+        Connector.set_legacy_interval(guild.id, args.legacy)
+        channels.append((guild, guild.add_channel(FakeTextChannel(guild)), zone_name))
+
+    intervals = {}
+
+    for i in range(args.n):
+        guild, channel, zone_name = channels[i % len(channels)]
+        rule_name, hour, minute, kwargs = RULES[(i // len(channels)) % len(RULES)]
+
+        zone = tz.UTC if args.legacy else tz.gettz(zone_name)
+        local_start = _local(start, zone)
+        dtstart = local_start.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        rule = rr.rrule(dtstart=dtstart, **kwargs)
+
+        rem = IntervalReminder()
+        rem.author = bot.user.id
+        rem.target = bot.user.id
+        rem.target_mention = bot.user.mention
+        rem.target_name = bot.user.name
+        rem.g_id = guild.id
+        rem.ch_id = channel.id
+        rem.ch_name = channel.name
+        rem.msg = f'sim {i}'
+        rem.created_at = start
+        rem.first_at = rule.after(dtstart, inc=True)
+        rem.rrules.append(str(rule))
+        rem.at = rem.next_trigger(start)
+        Connector.add_interval(rem)
+
+        expected = len(rule.between(local_start, _local(end, zone)))
+        intervals[i] = (rule_name, zone_name, hour*3600 + minute*60, expected)
+
+    return intervals
+
+
+async def run(args):
+    start = datetime.fromisoformat(args.start)
+    end = start + timedelta(days=args.days)
+
+    clock = VirtualClock(start)
+    Clock.install(clock)
+
+    backend = MemoryBackend.install()
+    http = FakeHTTP(rate_limit=0)
+    bot = FakeBot(http=http)
+
+    intervals = create_intervals(args, bot, start, end)
+
+    from cogs.ReminderModule import ReminderModule
+    cog = ReminderModule(bot)
+
+    ticks = 0
+    wall_start = time.perf_counter()
+
+    while True:
+        next_due = backend.next_due()
+        if next_due is None or next_due >= end:
+            break
+
+        # the loops only see reminders due before the tick
+        steps = max(1, math.ceil((next_due - clock.now).total_seconds() / args.step))
+        clock.advance(timedelta(seconds=steps*args.step))
+
+        await cog.check_pending_intervals()
+        await cog.check_pending_reminders()
+        ticks += 1
+
+    wall_time = time.perf_counter() - wall_start
+    cog.cog_unload()
+    Clock.reset()
+
+    fired = Counter()
+    off_schedule = Counter()
+    examples = []
+
+    for _, content, embed, sent_at in http.sent:
+        text = ' '.join(filter(None, [content, embed.description if embed else None]))
+        match = _MSG_ID.search(text)
+        if not match or int(match.group(1)) not in intervals:
+            continue
+
+        idx = int(match.group(1))
+
+        rule_name, zone_name, wall_target, _ = intervals[idx]
+        fired[idx] += 1
+
+        local_sent = _local(sent_at, tz.UTC if args.legacy else tz.gettz(zone_name))
+        wall = local_sent.hour*3600 + local_sent.minute*60 + local_sent.second
+        if (wall - wall_target) % 86400 > args.step:
+            off_schedule[(rule_name, zone_name)] += 1
+            if len(examples) < args.examples:
+                examples.append(f'  sim {idx} ({rule_name}, {zone_name}) fired at {local_sent} local')
+
+    expected = sum(e for *_, e in intervals.values())
+    missed = sum(max(0, e - fired[i]) for i, (*_, e) in intervals.items())
+    duplicate = sum(max(0, fired[i] - e) for i, (*_, e) in intervals.items())
+    total = sum(fired.values())
+
+    print(f'intervals:      {args.n} over {args.days} days ({args.zones})')
+    print(f'loop ticks:     {ticks} (step {args.step}s)')
+    print(f'firings:        {total} of {expected} expected, {missed} missed, {duplicate} duplicate')
+    print(f'wall time:      {wall_time:.2f}s ({total/wall_time if wall_time else 0:.0f} firings/s, '
+          f'{(end-start).total_seconds()/wall_time if wall_time else 0:.0f}x real time)')
+    print(f'off schedule:   {sum(off_schedule.values())}')
+    for (rule_name, zone_name), cnt in sorted(off_schedule.items()):
+        print(f'  {rule_name:<24} {zone_name:<20} {cnt}')
+    if examples:
+        print('examples:')
+        print('\n'.join(examples))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='replay of the interval scheduling in virtual time')
+    parser.add_argument('-n', type=int, default=200, help='number of intervals')
+    parser.add_argument('--days', type=int, default=365, help='simulated time span')
+    parser.add_argument('--start', default='2023-01-01T00:00:00', help='virtual start time (utc)')
+    parser.add_argument('--step', type=int, default=45, help='period of the scan loop in seconds')
+    parser.add_argument('--zones', default=DEFAULT_ZONES, help='comma separated timezones')
+    parser.add_argument('--legacy', action='store_true', help='use the legacy (utc) interval mode')
+    parser.add_argument('--examples', type=int, default=10, help='number of off schedule firings to print')
+
+    args = parser.parse_args(argv)
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
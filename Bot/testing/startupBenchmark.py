@@ -0,0 +1,86 @@
+"""cold start benchmark, until the bot would connect to the gateway
+
+every run is a fresh interpreter, which imports the bot and loads all
+extensions. The database init and the gateway handshake are not part of
+the benchmark, in production the time-to-ready is reported by the
+StartupProfiler (log + startup_phase metric)
+
+run from within ./Bot:
+    python -m testing.startupBenchmark --runs 10 --profile
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+
+
+BOT_DIR = Path(__file__).resolve().parent.parent
+
+CHILD = """
+import json
+from lib.StartupProfiler import StartupProfiler
+StartupProfiler.start()
+
+import remindmeBot
+StartupProfiler.mark('imports')
+remindmeBot.load_extensions()
+StartupProfiler.mark('connect')
+
+print(json.dumps(StartupProfiler.summary()))
+"""
+
+
+def run_once(profile: bool):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(BOT_DIR), env.get('PYTHONPATH')]))
+    env['STARTUP_PROFILE'] = '1' if profile else '0'
+    # read on import of the AdminModule, no admin commands are registered by the benchmark
+    env.setdefault('ADMIN_GUILD', '0')
+
+    # the bot writes into ./logs
+    with tempfile.TemporaryDirectory() as cwd:
+        os.mkdir(os.path.join(cwd, 'logs'))
+
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, '-c', CHILD], cwd=cwd, env=env,
+                              capture_output=True, text=True)
+        wall = time.perf_counter() - start
+
+    if proc.returncode != 0:
+        raise RuntimeError(f'benchmark run failed (exit code {proc.returncode}):\n{proc.stderr}')
+
+    summary = json.loads(proc.stdout.strip().splitlines()[-1])
+    summary['wall'] = wall
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='cold start benchmark')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--profile', action='store_true', help='trace the imports of the last run')
+    args = parser.parse_args(argv)
+
+    runs = [run_once(profile=False) for _ in range(args.runs)]
+
+    print(f'{"phase":<40} {"median":>8} {"min":>8} {"max":>8}')
+    rows = [('process (incl. interpreter)', [r['wall'] for r in runs])]
+    for phase in runs[0]['phases']:
+        rows.append((phase, [r['phases'][phase] for r in runs]))
+
+    for phase, values in rows:
+        print(f'{phase:<40} {statistics.median(values):7.3f}s {min(values):7.3f}s {max(values):7.3f}s')
+
+    if args.profile:
+        imports = run_once(profile=True)['imports']
+        print('\nslowest imports (cumulative / self):')
+        for name, (cumulative, self_time) in sorted(imports.items(), key=lambda i: i[1][0], reverse=True)[:25]:
+            print(f'  {name:<40} {cumulative:7.3f}s {self_time:7.3f}s')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""rendering time of the reminder listing table
+
+builds the rows of a listing (local time per reminder) and renders the
+code table, split into discord messages. The previous implementation
+(per-row astimezone, string concatenation, rfind split) is the baseline
+
+run from within ./Bot:
+    python -m testing.tableBenchmark --rows 10000
+"""
+import sys
+import time
+import random
+import argparse
+import statistics
+from datetime import datetime, timedelta
+
+from dateutil import tz
+
+from lib.Connector import Connector  # before Reminder, circular import
+from lib.Reminder import Reminder
+from lib.Timezones import Timezones
+from cogs.ReminderListing import ReminderListing
+import util.formatting
+
+
+HEADERS = ['No.', 'Next', 'Channel', 'Message']
+WORDS = ['meeting', 'dentist', 'raid', 'standup', 'birthday', 'deploy', 'water the plants', 'stream', 'exam']
+
+
+def legacy_generate_code_table(col_headers, content_rows, description=''):
+    col_cnt = len(col_headers)
+    padding = 1
+
+    max_row_lens = []
+    for col_h in col_headers:
+        max_row_lens.append(len(str(col_h)))
+
+    for row in content_rows:
+        for i, col in enumerate(row):
+            max_row_lens[i] = max(max_row_lens[i], len(str(col)))
+
+    table_width = (col_cnt*2)*padding + sum(max_row_lens) + (max(col_cnt-1, 0))
+
+    header_fields = '|'.join([str.center(str(col), max_row_lens[i]+2*padding, ' ') for i, col in enumerate(col_headers)])
+    header_spacer = '|'.join(['-'*(max_row_lens[i]+padding*2) for i, _ in enumerate(col_headers)])
+
+    header_str = '|{:s}|\n'.format('-'*table_width)
+    header_str += f'|{header_fields}|\n'
+    header_str += f'|{header_spacer}|\n'
+    footer_str = f'|{header_spacer}|'
+
+    content = ''
+    for row in content_rows:
+        content += '|'
+        content += '|'.join(
+            [' '*padding + str.ljust(str(cell), max_row_lens[i]+padding, ' ') if (i==0)
+              else str.rjust(str(cell), max_row_lens[i]+padding, ' ') + ' '*padding
+              for i, cell in enumerate(row)])
+        content += '|\n'
+
+    table_str = description + '\n' + header_str + content + footer_str
+    out_list = []
+
+    while table_str:
+        if len(table_str) < 2000-6:
+            out_list.append('```' + table_str + '```')
+            table_str = ''
+        else:
+            latest_newline = table_str[:2000-6].rfind('\n')
+            out_list.append('```' + table_str[:latest_newline+1] + '```')
+            table_str = table_str[latest_newline+1:]
+
+    return out_list
+
+
+def legacy_reminder_list(reminders, tz_str, author_id=None):
+    rows = []
+    for i, r in enumerate(reminders):
+        at_local = r.at.replace(tzinfo=tz.UTC).astimezone(Timezones.get(tz_str)) if r.at else None
+        content = r.title[0:26] if r.title else r.msg[0:26]
+        sfx = '*' if author_id and r.author != author_id else ''
+        max_ch_len = 33-min(len(content), 26)
+
+        rows.append((str(i+1)+'.'+sfx,
+                    at_local.strftime('%d.%b %H:%M') if at_local else '-',
+                    (r.ch_name or 'Unknown')[0:max_ch_len],
+                    content))
+
+    return '\n'.join(legacy_generate_code_table(HEADERS, rows, description='Given in your server timezone'))
+
+
+def generate_reminders(n, rng):
+    now = datetime(2022, 1, 1)
+    return [Reminder({'msg': ' '.join(rng.choices(WORDS, k=rng.randint(1, 6))),
+                      'ch_name': rng.choice(['general', 'reminders', 'bot-spam', 'x']),
+                      'author': rng.choice([1, 2, 3]),
+                      'at': now + timedelta(minutes=rng.randint(0, 500_000))})
+            for _ in range(n)]
+
+
+def measure(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='rendering time of the reminder listing table')
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--tz', default='Europe/Berlin')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    reminders = generate_reminders(args.rows, random.Random(args.seed))
+
+    legacy, legacy_out = measure(lambda: legacy_reminder_list(reminders, args.tz, author_id=1), args.repeat)
+    current, current_out = measure(lambda: ReminderListing._create_reminder_list(reminders, args.tz, author_id=1), args.repeat)
+    assert legacy_out == current_out, 'rendered tables differ'
+
+    table_rows = [(str(i), r.at.strftime('%d.%b %H:%M'), r.ch_name, r.msg[:26]) for i, r in enumerate(reminders)]
+    table, pages = measure(lambda: util.formatting.generate_code_table(HEADERS, table_rows), args.repeat)
+
+    print(f'{args.rows} rows, {len(pages)} messages')
+    print(f'{"":<18} {"median":>10} {"min":>10}')
+    for name, samples in [('legacy listing', legacy), ('listing', current), ('table only', table)]:
+        print(f'{name:<18} {statistics.median(samples):8.1f}ms {min(samples):8.1f}ms')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""keystroke latency of the timezone autocomplete
+
+types each query character by character and measures the previous
+substring filter against the search index (cold: empty result cache)
+
+run from within ./Bot:
+    python -m testing.timezoneBenchmark
+"""
+import sys
+import time
+import argparse
+
+from dateutil.zoneinfo import getzoneinfofile_stream, ZoneInfoFile
+
+from lib.TimezoneIndex import TimezoneIndex
+
+
+QUERIES = ['Europe/Berlin', 'new york', 'kolkata', 'cet', 'est', 'de', 'germany', 'sao paulo', 'berln', 'utc']
+
+
+def legacy_search(zones, value):
+    user_input = value.upper()
+    return list(filter(lambda z: user_input in z.upper(), zones))
+
+
+def measure(fn, queries, repeat):
+    """
+    Returns:
+        list: latency per keystroke in µs
+    """
+    samples = []
+    for _ in range(repeat):
+        for query in queries:
+            for end in range(1, len(query)+1):
+                start = time.perf_counter_ns()
+                fn(query[:end])
+                samples.append((time.perf_counter_ns() - start) / 1000)
+    return sorted(samples)
+
+
+def report(name, samples):
+    p = lambda q: samples[min(len(samples)-1, int(q*len(samples)))]
+    print(f'{name:<14} mean {sum(samples)/len(samples):9.1f}µs   p50 {p(0.5):9.1f}µs   p99 {p(0.99):9.1f}µs   max {samples[-1]:9.1f}µs')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='keystroke latency of the timezone autocomplete')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--show', action='store_true', help='print the results of the full queries')
+    args = parser.parse_args(argv)
+
+    zones = list(ZoneInfoFile(getzoneinfofile_stream()).zones.keys())
+
+    start = time.perf_counter()
+    TimezoneIndex.build()
+    print(f'index build    {(time.perf_counter()-start)*1000:.1f}ms')
+
+    def cold(value):
+        TimezoneIndex._search.cache_clear()
+        return TimezoneIndex.search(value)
+
+    report('legacy', measure(lambda v: legacy_search(zones, v), QUERIES, args.repeat))
+    report('index (cold)', measure(cold, QUERIES, args.repeat))
+    report('index (warm)', measure(TimezoneIndex.search, QUERIES, args.repeat))
+
+    if args.show:
+        for query in QUERIES:
+            print(f'{query!r}: {TimezoneIndex.search(query)[:5]}')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
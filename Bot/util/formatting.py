@@ -1,65 +1,132 @@
-def generate_code_table(col_headers, content_rows, description=''):
-    """generate an ascii table with the given content
-        col width is chosen to match the longest content of content_rows
-        auto-split into multiple strings if table exceeds discord limit of 2000 chars
+CODE_BLOCK = '```'
+
+# discord limit of a message, an embed description allows up to 4096
+MESSAGE_LIMIT = 2000
+
+
+def measure_columns(col_headers, content_rows):
+    """width of each column, single pass over all cells
+       the cells are converted into str in-place of a new row list
+
+    Args:
+        col_headers (list): header names
+        content_rows (list<list>): all rows
+
+    Returns:
+        tuple: (list<int> widths, list<list<str>> rows)
+    """
+    widths = [len(str(col_h)) for col_h in col_headers]
+    str_rows = []
+
+    for row in content_rows:
+        cells = [str(cell) for cell in row]
+        for i, cell in enumerate(cells):
+            if len(cell) > widths[i]:
+                widths[i] = len(cell)
+        str_rows.append(cells)
+
+    return widths, str_rows
+
+
+def render_table_lines(col_headers, content_rows, padding=1):
+    """render each line of the ascii table, without newlines
+       the first column is left aligned, all others are right aligned
 
     Args:
         col_headers (list): a list with the header names, length determins column count
         content_rows (list<list>): list containing all rows, each row is list with all columns of that row
+        padding (int, optional): spaces around each cell. Defaults to 1.
+
+    Returns:
+        list<str>: header, content and footer lines
     """
+    widths, rows = measure_columns(col_headers, content_rows)
     col_cnt = len(col_headers)
-    row_cnt = len(content_rows)
-    padding = 1
 
-    max_row_lens = []
-    for col_h in col_headers:
-        max_row_lens.append(len(str(col_h)))
+    # table width does not count outer | |
+    #             padding around vals + max col width     + separator for each col
+    table_width = (col_cnt*2)*padding + sum(widths) + (max(col_cnt-1, 0))
 
-    for row in content_rows:
-        for i, col in enumerate(row):
-            max_row_lens[i] = max(max_row_lens[i], len(str(col)))
-            pass
-
-    # table width does not count outer | | 
-    #             padding around vals + max col width     + separator for each col 
-    table_width = (col_cnt*2)*padding + sum(max_row_lens) + (max(col_cnt-1, 0))
-
-    
-    # first construct the table header and the footer
     pad_space = ' ' * padding
-    header_fields = '|'.join([str.center(str(col), max_row_lens[i]+2*padding, ' ') for i, col in enumerate(col_headers)])
-    header_spacer = '|'.join(['-'*(max_row_lens[i]+padding*2) for i, _ in enumerate(col_headers)])
-    
-    header_str = '|{:s}|\n'.format('-'*table_width)
-    header_str += f'|{header_fields}|\n'
-    header_str += f'|{header_spacer}|\n'
+    header_fields = '|'.join([str(col).center(widths[i]+2*padding, ' ') for i, col in enumerate(col_headers)])
+    header_spacer = '|'.join(['-'*(w+padding*2) for w in widths])
 
-    footer_str = f'|{header_spacer}|'
+    lines = [f'|{"-"*table_width}|', f'|{header_fields}|', f'|{header_spacer}|']
 
+    # padded widths are computed once, not per cell
+    first_w = widths[0] + padding if widths else 0
+    rest_w = [w + padding for w in widths[1:]]
+    for cells in rows:
+        fields = [pad_space + cells[0].ljust(first_w)]
+        fields.extend([cell.rjust(w) + pad_space for cell, w in zip(cells[1:], rest_w)])
+        lines.append('|' + '|'.join(fields) + '|')
 
-    content = ''
-    for row in content_rows:
-        content += '|'
-        content += '|'.join(\
-            [' '*padding + str.ljust(str(cell), max_row_lens[i]+padding, ' ') if (i==0) \
-              else str.rjust(str(cell), max_row_lens[i]+padding, ' ') + ' '*padding \
-              for i, cell in enumerate(row)])
+    lines.append(f'|{header_spacer}|')
+    return lines
 
-        content += '|\n'
-        pass
 
+def paginate_lines(lines, limit=MESSAGE_LIMIT, wrap=CODE_BLOCK):
+    """pack the lines into as few chunks as possible, in one pass
+       each chunk is wrapped into the given code block and doesn't exceed limit
 
-    table_str = description + '\n' + header_str + content + footer_str
+    Args:
+        lines (list<str>): lines without newline
+        limit (int, optional): max length of a chunk. Defaults to MESSAGE_LIMIT.
+        wrap (str, optional): prefix/suffix of each chunk. Defaults to CODE_BLOCK.
+
+    Returns:
+        list<str>: the chunks
+    """
+    budget = limit - 2*len(wrap)
     out_list = []
+    chunk = []
+    chunk_len = 0
+
+    last = len(lines) - 1
+    for i, line in enumerate(lines):
+        # all but the last line keep their newline
+        if i != last:
+            line += '\n'
+
+        # lines above the budget can only be hard-split
+        while len(line) > budget:
+            if chunk:
+                out_list.append(wrap + ''.join(chunk) + wrap)
+                chunk, chunk_len = [], 0
+            out_list.append(wrap + line[:budget] + wrap)
+            line = line[budget:]
+
+        # the final chunk must stay below the budget
+        fits = chunk_len + len(line) <= (budget if i != last else budget-1)
+        if not fits and chunk:
+            out_list.append(wrap + ''.join(chunk) + wrap)
+            chunk, chunk_len = [], 0
+
+        chunk.append(line)
+        chunk_len += len(line)
+
+    if chunk:
+        out_list.append(wrap + ''.join(chunk) + wrap)
+
+    return out_list
+
+
+def generate_code_table(col_headers, content_rows, description='', limit=MESSAGE_LIMIT):
+    """generate an ascii table with the given content
+        col width is chosen to match the longest content of content_rows
+        auto-split into multiple strings if table exceeds discord limit of 2000 chars
+
+    Args:
+        col_headers (list): a list with the header names, length determins column count
+        content_rows (list<list>): list containing all rows, each row is list with all columns of that row
+        description (str, optional): text above the table. Defaults to ''.
+        limit (int, optional): max length of each returned string. Defaults to MESSAGE_LIMIT.
+
+    Returns:
+        list<str>: the table, split into code blocks
+    """
+    lines = description.split('\n')
+    lines.extend(render_table_lines(col_headers, content_rows))
+
+    return paginate_lines(lines, limit=limit)
 
-    while table_str:
-        if len(table_str) < 2000-6:
-            out_list.append('```' + table_str + '```')
-            table_str = ''
-        else:
-            latest_newline = table_str[:2000-6].rfind('\n')
-            out_list.append('```' + table_str[:latest_newline+1] + '```')
-            table_str = table_str[latest_newline+1:]
-
-    
-    return out_list
\ No newline at end of file
@@ -4,11 +4,15 @@ import re
 from typing import Union
 
 import discord
+from bson import ObjectId
+from bson.errors import InvalidId
 
 from lib.Connector import Connector, Reminder
 from lib.Analytics import Analytics, Types
 from lib.CommunitySettings import CommunitySettings, CommunityAction
 import lib.permissions
+from lib.InteractionTiming import InteractionTiming
+from lib.Clock import Clock
 
 import logging
 
@@ -23,6 +27,18 @@ class CustomView(discord.ui.View):
         self.message: Union[discord.Message, discord.Interaction, discord.WebhookMessage] = message
         self.open_interaction = None
 
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # not a permission check, only used to time the callback
+        custom_id = interaction.data.get('custom_id')
+        item = next((c for c in self.children if getattr(c, 'custom_id', None) == custom_id), None)
+        callback = getattr(item.callback, 'func', item.callback) if item else None
+        name = getattr(callback, '__name__', 'unknown')
+
+        InteractionTiming.start(interaction, 'component', f'{type(self).__name__}.{name}')
+        return True
+
+
     def disable_all(self):
         """disable all components in this view
            and stop the view
@@ -152,35 +168,120 @@ class MulitDropdownView(CustomView):
         self.stop()
 
 
-class UndeliveredView(CustomView):
+class PersistentView(CustomView):
+    """base view for components attached to delivered reminders
+
+       the view never times out and holds no reminder state.
+       each component carries a stable custom_id which encodes
+       the action and the reminder id, clicks are resolved from the db
+       by `dispatch_persistent` (this also works after a restart)
+
+       the object is only needed to render the components,
+       call `release` once the message was sent
+    """
+
+    PREFIX = 'rmd'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(timeout=None, *args, **kwargs)
+
+
+    @staticmethod
+    def encode_id(action: str, reminder_id, arg=None) -> str:
+        parts = [PersistentView.PREFIX, action, str(reminder_id)]
+        if arg is not None:
+            parts.append(str(arg))
+        return ':'.join(parts)
+
+
+    @staticmethod
+    def decode_id(custom_id: str):
+        """parse a custom_id created by `encode_id`
+
+        Returns:
+            tuple: (action, reminder_id, arg), None if the id is not a persistent id
+        """
+        parts = (custom_id or '').split(':')
+        if len(parts) < 3 or parts[0] != PersistentView.PREFIX:
+            return None
+
+        try:
+            r_id = ObjectId(parts[2])
+        except InvalidId:
+            return None
+
+        arg = parts[3] if len(parts) > 3 else None
+        return (parts[1], r_id, arg)
+
+
+    def release(self):
+        """stop listening for the rendered components
+           the view store drops the object, clicks are routed by custom_id
+        """
+        self.stop()
+
+
+    @staticmethod
+    async def disable_message(interaction: discord.Interaction, style: discord.ButtonStyle, **kwargs):
+        """disable all components of the clicked message
+           the pressed button is highlighted with the given style
+
+        Args:
+            interaction (discord.Interaction): the component interaction
+            style (discord.ButtonStyle): style of the pressed button
+            kwargs: forwarded to edit_message
+        """
+        view = discord.ui.View.from_message(interaction.message, timeout=None)
+
+        for child in view.children:
+            if isinstance(child, discord.ui.Button):
+                if child.custom_id == interaction.data.get('custom_id'):
+                    child.style = style
+                else:
+                    child.style = discord.ButtonStyle.secondary
+            child.disabled = True
+
+        await interaction.response.edit_message(view=view, **kwargs)
+        view.stop()
+
+
+class UndeliveredView(PersistentView):
+
+    ACTION_DELETE = 'undelivered_del'
+
     def __init__(self, reminder_id, *args, **kwargs):
         super().__init__(*args , **kwargs)
         self.r_id = reminder_id
 
+        self.add_item(discord.ui.Button(emoji='🗑️', style=discord.ButtonStyle.red,
+                                        custom_id=PersistentView.encode_id(UndeliveredView.ACTION_DELETE, reminder_id)))
 
-    # This one is similar to the confirmation button except sets the inner value to `False`
-    @discord.ui.button(emoji='🗑️', style=discord.ButtonStyle.red)
-    async def cancel(self, button: discord.ui.Button, interaction: discord.Interaction):
 
-        # modify button colors
-        if not Connector.delete_reminder(self.r_id):
-            Connector.delete_interval(self.r_id)
+    @staticmethod
+    async def delete(interaction: discord.Interaction, reminder_id, arg):
 
-        self.disable_all()
-        await interaction.response.edit_message(view=self)
+        if not Connector.delete_reminder(reminder_id):
+            Connector.delete_interval(reminder_id)
 
-        self.value = False
-        self.stop()
+        await PersistentView.disable_message(interaction, discord.ButtonStyle.secondary)
 
 
-class SnoozeView(CustomView):
-    def __init__(self, reminder: Reminder, *args, **kwargs):
+class SnoozeView(PersistentView):
+
+    ACTION_SNOOZE = 'snooze'
+
+    def __init__(self, reminder_id, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.reminder = reminder
-        self.r_id = reminder._id
+        self.r_id = reminder_id
 
+        self.add_item(discord.ui.Button(label='+15m', emoji='⏱️', style=discord.ButtonStyle.blurple,
+                                        custom_id=PersistentView.encode_id(SnoozeView.ACTION_SNOOZE, reminder_id, 15*60)))
+        self.add_item(discord.ui.Button(label='+60m', emoji='⏱️', style=discord.ButtonStyle.blurple,
+                                        custom_id=PersistentView.encode_id(SnoozeView.ACTION_SNOOZE, reminder_id, 60*60)))
 
-    async def snooze_reminder(self, button: discord.ui.Button, interaction: discord.Interaction, delay_seconds: int):
+
+    @staticmethod
+    async def snooze_reminder(interaction: discord.Interaction, reminder_id, delay_seconds):
         
         if interaction.guild:
             # call will fail if community mode is enabled
@@ -189,17 +290,21 @@ class SnoozeView(CustomView):
                 await interaction.response.send_message(embed=err_eb)
                 return
 
+        reminder = Connector.get_snoozable_by_id(reminder_id)
+        if not reminder:
+            await interaction.response.send_message('This reminder cannot be snoozed anymore', ephemeral=True)
+            return
+
         # convert to json and back to reminder object
         # this automatically converts intervals to reminders
-        snoozed = Reminder(self.reminder._to_json())
-        user_name = interaction.user.display_name
+        snoozed = Reminder(reminder._to_json())
 
         snoozed._id = None
-        snoozed.created_at = datetime.utcnow()
+        snoozed.created_at = Clock.utcnow()
         snoozed.msg = (snoozed.msg+f' (snoozed)')[:25]
-        snoozed.at = self.reminder.at + timedelta(seconds=delay_seconds)
+        snoozed.at = reminder.at + timedelta(seconds=int(delay_seconds))
 
-        if interaction.user.id != self.reminder.author:
+        if interaction.user.id != reminder.author:
             # convert reminder into DM reminder
             # if anyone but author pressed snooze button
             snoozed.g_id = None
@@ -209,41 +314,64 @@ class SnoozeView(CustomView):
 
         else:
             Connector.add_reminder(snoozed)
+            await PersistentView.disable_message(interaction, discord.ButtonStyle.green)
 
-            self.disable_all()
-            button.style = discord.ButtonStyle.green
-            await interaction.response.edit_message(view=self)
-            self.stop()
+    
 
+class SnoozeIntervalView(SnoozeView):
 
-    @discord.ui.button(label='+15m', emoji='⏱️', style=discord.ButtonStyle.blurple)
-    async def snooze_15(self, button: discord.ui.Button, interaction: discord.Interaction):
-        await self.snooze_reminder(button, interaction, 15*60)
+    ACTION_DELETE = 'intvl_del'
 
-    @discord.ui.button(label='+60m', emoji='⏱️', style=discord.ButtonStyle.blurple)
-    async def snooze_60(self, button: discord.ui.Button, interaction: discord.Interaction):
-        await self.snooze_reminder(button, interaction, 60*60)
+    def __init__(self, reminder_id, *args, **kwargs):
+        super().__init__(reminder_id, *args, **kwargs)
 
-    
+        self.add_item(discord.ui.Button(emoji='🗑️', style=discord.ButtonStyle.danger,
+                                        custom_id=PersistentView.encode_id(SnoozeIntervalView.ACTION_DELETE, reminder_id)))
 
-class SnoozeIntervalView(SnoozeView):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
 
-    async def delete(self, button: discord.ui.Button, interaction: discord.Interaction):
+    @staticmethod
+    async def delete(interaction: discord.Interaction, reminder_id, arg):
 
-        if interaction.user.id != self.reminder.author:
+        if interaction.user.id != Connector.get_author_of_id(reminder_id):
             await interaction.response.send_message('You do not have permissions to delete this reminder', ephemeral=True)
             return
 
-        Connector.delete_interval(self.r_id)
-        self.disable_all()
-        button.style = discord.ButtonStyle.danger
+        Connector.delete_interval(reminder_id)
+        await PersistentView.disable_message(interaction, discord.ButtonStyle.danger,
+                                             embed=discord.Embed(title='Deleted Reminder', description='The reminder was deleted by its author', color=0x409fe2)) # cyan blue
 
-        await interaction.response.edit_message(view=self, embed=discord.Embed(title='Deleted Reminder', description='The reminder was deleted by its author', color=0x409fe2)) # cyan blue
-        self.stop()
 
 
-    @discord.ui.button(emoji='🗑️', style=discord.ButtonStyle.danger)
-    async def del_reminder(self, button: discord.ui.Button, interaction: discord.Interaction):
-        await self.delete(button, interaction)
\ No newline at end of file
+_PERSISTENT_ACTIONS = {
+    UndeliveredView.ACTION_DELETE: UndeliveredView.delete,
+    SnoozeView.ACTION_SNOOZE: SnoozeView.snooze_reminder,
+    SnoozeIntervalView.ACTION_DELETE: SnoozeIntervalView.delete,
+}
+
+
+async def dispatch_persistent(interaction: discord.Interaction) -> bool:
+    """route a component interaction of a persistent view
+       to its handler
+
+    Args:
+        interaction (discord.Interaction): any incoming interaction
+
+    Returns:
+        bool: True if the interaction was handled
+    """
+    if interaction.type != discord.InteractionType.component:
+        return False
+
+    parsed = PersistentView.decode_id(interaction.data.get('custom_id'))
+    if not parsed:
+        return False
+
+    action, r_id, arg = parsed
+    handler = _PERSISTENT_ACTIONS.get(action)
+    if not handler:
+        log.warning(f'unknown persistent action {action}')
+        return False
+
+    InteractionTiming.start(interaction, 'component', f'persistent.{action}')
+    await handler(interaction, r_id, arg)
+    return True
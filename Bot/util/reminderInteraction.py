@@ -2,8 +2,6 @@ import discord
 from enum import Enum
 from datetime import datetime, timedelta
 from dateutil import tz
-from unidecode import unidecode
-import validators
 import logging
 
 import util.interaction
@@ -13,6 +11,10 @@ import lib.input_parser
 import lib.ReminderRepeater
 from lib.Reminder import Reminder, IntervalReminder
 from lib.Connector import Connector
+from lib.Clock import Clock
+from lib.Timezones import Timezones
+from lib.ChannelIndex import ChannelIndex
+from lib.ReminderSearch import ReminderSearch
 from lib.Analytics import Analytics, Types
 
 log = logging.getLogger('Remindme.Listing')
@@ -29,6 +31,8 @@ class STM():
         self.page:int=0
         self.reminders:list[Reminder] = []
         self.tz_str:str = None
+        self.search:str = None  # shown reminders are filtered by this query
+        self.search_index:ReminderSearch = None  # None if the db is searched
 
 
 class ReminderChannelEdit(util.interaction.CustomView):
@@ -41,6 +45,7 @@ class ReminderChannelEdit(util.interaction.CustomView):
         self.drop_down:discord.ui.Select = None
         self.dd_is_category = False  # is True when drop down holds categories, False on text channels
         self.drop_down_cat=None  # id of selected category, if dd holds text channels, on category mode: don't care
+        self.page = 0  # page of the categories/channels, wraps around
 
         self.update_category_dropdown()
         self.open_interaction = None
@@ -56,32 +61,33 @@ class ReminderChannelEdit(util.interaction.CustomView):
         if self.dd_is_category:
             cat_id = interaction.data['values'][0] # min/max selection is 1
             self.drop_down_cat = int(cat_id)
+            self.page = 0
             await self.update_channel_dropdown(int(cat_id), interaction)
         else:
             await interaction.response.defer()
 
 
+    def _update_page_buttons(self, page_cnt):
+        self.prev_page.disabled = page_cnt <= 1
+        self.next_page.disabled = page_cnt <= 1
+
+
     async def update_channel_dropdown(self, category_id: int, interaction: discord.Interaction):
 
         dd_search = [x for x in self.children if isinstance(x, discord.ui.Select)]
         dropDown_instance = dd_search[0] if dd_search else None
 
-        shown_channels = []
-
-        if self.drop_down_cat == -1:
-            shown_channels = list(filter(lambda ch: (isinstance(ch, discord.TextChannel) or isinstance(ch, discord.VoiceChannel)) and ch.category_id is None, self.stm.ctx.guild.channels))
-        else:
-            # limit to 25 entries
-            shown_channels = list(filter(lambda ch: (isinstance(ch, discord.TextChannel) or isinstance(ch, discord.VoiceChannel)) and ch.category_id is not None and ch.category_id==self.drop_down_cat, self.stm.ctx.guild.channels))[0:25]
+        shown_channels, page_cnt = ChannelIndex.channels(self.stm.ctx.guild, category_id, self.page)
+        self._update_page_buttons(page_cnt)
 
         rule_options = [discord.SelectOption(
-                    label=(('#️⃣ ' if isinstance(c, discord.TextChannel) else '🔉 ') + unidecode(c.name)[:23]) or '*unknown channel name*',
-                    value=str(c.id),
-                    default=(c.id==self.reminder.ch_id)) for c in shown_channels]
+                    label=label,
+                    value=str(ch_id),
+                    default=(ch_id==self.reminder.ch_id)) for ch_id, label in shown_channels]
         
         # delet old dropdown
         #self.children.remove(dropDown_instance)
-        dropDown_instance.placeholder = 'Select a text-channel'
+        dropDown_instance.placeholder = 'Select a text-channel' if page_cnt <= 1 else f'Select a text-channel ({self.page % page_cnt + 1}/{page_cnt})'
         if not rule_options:
             dropDown_instance.options = [
                 discord.SelectOption(
@@ -103,23 +109,19 @@ class ReminderChannelEdit(util.interaction.CustomView):
 
 
     def update_category_dropdown(self):
-        # show only the first 25 categories
-        cat_list = list(filter(lambda ch: isinstance(ch, discord.CategoryChannel), self.stm.ctx.guild.channels))[0:24]
-        rule_options = [
-                discord.SelectOption(
-                    label='No category',
-                    value=str(-1),
-                    default=False
-                )
-            ]
-        rule_options.extend([discord.SelectOption(
-                            label=unidecode(c.name)[:25] or '*unknown category name*',
-                            value=str(c.id),
-                            default=False) for c in cat_list])
+        categories, page_cnt = ChannelIndex.categories(self.stm.ctx.guild, self.page)
+        self._update_page_buttons(page_cnt)
 
+        rule_options = [discord.SelectOption(
+                            label=label,
+                            value=str(cat_id),
+                            default=False) for cat_id, label in categories]
+
+        if self.drop_down:
+            self.remove_item(self.drop_down)
 
         self.drop_down = discord.ui.Select(
-                placeholder='Select a category',
+                placeholder='Select a category' if page_cnt <= 1 else f'Select a category ({self.page % page_cnt + 1}/{page_cnt})',
                 min_values=1,
                 max_values=1,
                 options=rule_options,
@@ -133,6 +135,26 @@ class ReminderChannelEdit(util.interaction.CustomView):
         self.dd_is_category = True
 
 
+    async def _turn_page(self, step: int, interaction: discord.Interaction):
+        self.page += step
+
+        if self.dd_is_category:
+            self.update_category_dropdown()
+            await interaction.response.edit_message(view=self)
+        else:
+            await self.update_channel_dropdown(self.drop_down_cat, interaction)
+
+
+    @discord.ui.button(emoji='⏪', style=discord.ButtonStyle.secondary, row=2)
+    async def prev_page(self, button:  discord.ui.Button, interaction: discord.Interaction):
+        await self._turn_page(-1, interaction)
+
+
+    @discord.ui.button(emoji='⏩', style=discord.ButtonStyle.secondary, row=2)
+    async def next_page(self, button:  discord.ui.Button, interaction: discord.Interaction):
+        await self._turn_page(1, interaction)
+
+
     @discord.ui.button(label='Select', style=discord.ButtonStyle.green, row=2)
     async def select_btn(self, button:  discord.ui.Button, interaction: discord.Interaction):
         embed=None
@@ -251,6 +273,27 @@ class RuleModal(discord.ui.Modal):
 
 
 
+class SearchModal(discord.ui.Modal):
+    def __init__(self, query, custom_callback, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.custom_callback = custom_callback
+
+        self.add_item(
+            discord.ui.InputText(
+                label='Search title and message',
+                placeholder='leave empty to show all reminders',
+                value=query,
+                required=False,
+                style=discord.InputTextStyle.singleline
+            )
+        )
+
+
+    async def callback(self, interaction: discord.Interaction):
+        await self.custom_callback(interaction, (self.children[0].value or '').strip())
+
+
+
 class EditModal(discord.ui.Modal):
     def __init__(self, reminder: Reminder, tz_str:str, custom_callback, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -287,7 +330,7 @@ class EditModal(discord.ui.Modal):
         if not isinstance(self.reminder, IntervalReminder):
             self.add_item(discord.ui.InputText(
                 label='Remind at (iso)',
-                value=self.reminder.at.replace(tzinfo=tz.UTC).astimezone(tz=tz.gettz(tz_str)).isoformat(), # add +02:00 for server timezone
+                value=self.reminder.at.replace(tzinfo=tz.UTC).astimezone(tz=Timezones.get(tz_str)).isoformat(), # add +02:00 for server timezone
                 required=True,
                 style=discord.InputTextStyle.singleline
                 )
@@ -323,6 +366,7 @@ class EditModal(discord.ui.Modal):
         if new_imgurl != self.reminder.img_url:
             # check if the given url is actually valid
             try:
+                import validators  # slow import, rarely used
                 success = validators.url(new_imgurl)
             except:
                 success = False
@@ -453,7 +497,7 @@ class ReminderIntervalAddView(util.interaction.CustomView):
 
         action_str = 'single date' if mode==RuleMode.DATE_ADD else 'date exception'
 
-        utcnow = datetime.utcnow()
+        utcnow = Clock.utcnow()
         date, info = lib.input_parser.parse(user_input, utcnow, self.stm.tz_str)
         interval = date-utcnow if date else utcnow # set to error if not defined
 
@@ -477,7 +521,7 @@ class ReminderIntervalAddView(util.interaction.CustomView):
 
         else:
             # success
-            localized_date = date.replace(tzinfo=tz.UTC).astimezone(tz.gettz(self.stm.tz_str))
+            localized_date = date.replace(tzinfo=tz.UTC).astimezone(Timezones.get(self.stm.tz_str))
 
             eb = discord.Embed(title=f'New {action_str}',
                            description='Do you want to add the date `{:s}`? as a new {:s}.'\
@@ -815,12 +859,13 @@ class ReminderEditView(util.interaction.CustomView):
 
         if view.value:
             # delete the reminder
+            shard = self.stm.ctx.guild.shard_id if self.stm.ctx.guild else 0
             if isinstance(self.reminder, IntervalReminder):
                 Connector.delete_interval(self.reminder._id)
-                Analytics.interval_deleted(Types.DeleteAction.LISTING)
+                Analytics.interval_deleted(Types.DeleteAction.LISTING, shard=shard)
             else:
                 Connector.delete_reminder(self.reminder._id)
-                Analytics.reminder_deleted(Types.DeleteAction.LISTING)
+                Analytics.reminder_deleted(Types.DeleteAction.LISTING, shard=shard)
 
             # go back to previous view
             self.disable_all()
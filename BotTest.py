@@ -6,6 +6,17 @@ import unit_tests.TimezoneParseTest as TPT
 import unit_tests.AbsParseTest as AbPT
 import unit_tests.CombineParseTest as CPT
 import unit_tests.IntervalTest as ITT
+import unit_tests.DurationParseTest as DPT
+import unit_tests.SQLiteBackendTest as SQLT
+import unit_tests.TimezoneIndexTest as TZIT
+import unit_tests.TimezonesTest as TZT
+import unit_tests.LogPipelineTest as LPT
+import unit_tests.FormattingTest as FMT
+import unit_tests.ChannelIndexTest as CIT
+import unit_tests.ReminderSearchTest as RST
+import unit_tests.BulkEditTest as BET
+import unit_tests.ReminderExportTest as RET
+import unit_tests.ReminderImportTest as RIT
 
 
 if __name__ == '__main__':
@@ -17,4 +28,16 @@ if __name__ == '__main__':
     main(module=TPT, exit=False)
     main(module=CPT, exit=False)
     main(module=ITT, exit=False)
+    main(module=DPT, exit=False)
+
+    main(module=SQLT, exit=False)
+    main(module=TZIT, exit=False)
+    main(module=TZT, exit=False)
+    main(module=LPT, exit=False)
+    main(module=FMT, exit=False)
+    main(module=CIT, exit=False)
+    main(module=RST, exit=False)
+    main(module=BET, exit=False)
+    main(module=RET, exit=False)
+    main(module=RIT, exit=False)
     
\ No newline at end of file
@@ -0,0 +1,138 @@
+import sqlite3
+import unittest
+from unittest.mock import MagicMock, patch
+
+from datetime import datetime, timedelta
+
+from lib.Connector import Connector  # KEEP first, circular import
+from lib.Reminder import Reminder, IntervalReminder
+from lib.SQLiteBackend import SQLiteBackend
+
+
+def _reminder(rem_class, rem_id, at):
+    return rem_class({'_id': rem_id, 'msg': 'test', 'g_id': 1, 'ch_id': 2, 'author': 3, 'at': at})
+
+
+
+class SQLiteBulkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = SQLiteBackend(':memory:')
+        self.utcnow = datetime(year=2021, month=1, day=1)
+
+        self.rems = []
+        for rem_class in (Reminder, Reminder, IntervalReminder):
+            rem = _reminder(rem_class, None, self.utcnow)
+            rem._id = self.backend.add_interval(rem) if rem_class is IntervalReminder else self.backend.add_reminder(rem)
+            self.rems.append(rem)
+
+
+    def tearDown(self):
+        self.backend.close()
+
+
+    def test_delete(self):
+        self.assertEqual(self.backend.bulk_delete(self.rems[1:]), (1, 1))
+        self.assertEqual(self.backend.get_reminder_cnt(), 1)
+        self.assertEqual(self.backend.get_interval_cnt(), 0)
+
+
+    def test_delete_rollback(self):
+        conn = self.backend._conn
+        # fails after the reminders are deleted
+        conn.execute('DROP TABLE intervals')
+
+        with self.assertRaises(sqlite3.OperationalError):
+            self.backend.bulk_delete(self.rems)
+
+        self.assertFalse(conn.in_transaction)
+        self.assertEqual(self.backend.get_reminder_cnt(), 2)
+
+
+    def test_insert(self):
+        new = [_reminder(Reminder, None, self.utcnow), _reminder(IntervalReminder, None, self.utcnow)]
+        self.assertEqual(self.backend.bulk_insert(new), [])
+        self.assertEqual(self.backend.get_reminder_cnt(), 3)
+        self.assertEqual(self.backend.get_interval_by_id(new[1]._id).msg, 'test')
+
+
+    def test_insert_rollback(self):
+        insert = self.backend._insert
+        calls = []
+        def failing_insert(table, reminder):
+            calls.append(table)
+            if len(calls) > 1:
+                raise MemoryError()
+            return insert(table, reminder)
+
+        new = [_reminder(Reminder, None, self.utcnow), _reminder(Reminder, None, self.utcnow)]
+        with patch.object(self.backend, '_insert', side_effect=failing_insert):
+            with self.assertRaises(MemoryError):
+                self.backend.bulk_insert(new)
+
+        self.assertFalse(self.backend._conn.in_transaction)
+        self.assertEqual(self.backend.get_reminder_cnt(), 2)
+
+
+    def test_set_channel(self):
+        self.assertEqual(self.backend.bulk_set_channel(self.rems, 5, 'general'), 3)
+        self.assertEqual(self.backend.get_interval_by_id(self.rems[2]._id).ch_id, 5)
+
+
+    def test_shift(self):
+        # delivered (rescheduled) since it was read, must not be shifted again
+        stale = _reminder(Reminder, self.rems[0]._id, self.utcnow - timedelta(days=1))
+
+        self.assertEqual(self.backend.bulk_shift([stale] + self.rems[1:], timedelta(hours=1)), 2)
+        self.assertEqual(self.backend.get_reminder_by_id(self.rems[0]._id).at, self.utcnow)
+        self.assertEqual(self.backend.get_reminder_by_id(self.rems[1]._id).at, self.utcnow + timedelta(hours=1))
+
+
+
+class MongoBulkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.db, self.due_buckets = Connector.db, Connector.due_buckets
+        Connector.db = MagicMock()
+        Connector.due_buckets = True
+
+        self.at = datetime(year=2021, month=1, day=1)
+        self.rems = [_reminder(Reminder, 1, self.at), _reminder(Reminder, 2, self.at)]
+
+
+    def tearDown(self):
+        Connector.db, Connector.due_buckets = self.db, self.due_buckets
+
+
+    def test_shift_filter(self):
+        Connector.db.reminders.bulk_write.return_value = MagicMock(modified_count=2)
+        Connector.bulk_shift(self.rems, timedelta(hours=1))
+
+        ops = Connector.db.reminders.bulk_write.call_args.args[0]
+        self.assertFalse(Connector.db.intervals.bulk_write.called)
+
+        # v2 documents store a date, v1 documents a float timestamp
+        at_filter = ops[0]._filter['$or']
+        self.assertIn({'at': self.at}, at_filter)
+        v1_filter = [f['at'] for f in at_filter if not isinstance(f['at'], datetime)][0]
+        self.assertTrue(v1_filter['$gt'] < self.at.timestamp() < v1_filter['$lt'])
+
+
+    def test_shift_buckets(self):
+        # the second reminder was delivered and rescheduled since it was read
+        Connector.db.reminders.bulk_write.return_value = MagicMock(modified_count=1)
+        Connector.db.reminders.find.return_value = [{'_id': 1, 'at': self.at + timedelta(hours=1)},
+                                                    {'_id': 2, 'at': self.at + timedelta(days=1)}]
+
+        Connector.bulk_shift(self.rems, timedelta(hours=1))
+
+        ops = Connector.db.due_buckets.bulk_write.call_args.args[0]
+        self.assertEqual(len(ops), 2)
+        self.assertEqual(ops[0]._doc, {'$addToSet': {'reminders': 1}})
+        self.assertEqual(ops[1]._doc, {'$pull': {'reminders': 1}})
+
+
+    def test_shift_unchanged(self):
+        Connector.db.reminders.bulk_write.return_value = MagicMock(modified_count=0)
+        self.assertEqual(Connector.bulk_shift(self.rems, timedelta(hours=1)), 0)
+        self.assertFalse(Connector.db.due_buckets.bulk_write.called)
@@ -0,0 +1,79 @@
+import unittest
+from types import SimpleNamespace
+
+import discord
+
+from Bot.lib.ChannelIndex import ChannelIndex, NO_CATEGORY
+
+
+def _channel(cls, ch_id, name, position, category_id=None, guild=None):
+    # the index only reads these attributes, no state/gateway required
+    channel = cls.__new__(cls)
+    channel.id = ch_id
+    channel.name = name
+    channel.position = position
+    channel.guild = guild
+    if cls is not discord.CategoryChannel:
+        channel.category_id = category_id
+    return channel
+
+
+class ChannelIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        ChannelIndex._guilds.clear()
+
+        self.guild = SimpleNamespace(id=1, channels=[])
+        self.guild.channels = [
+            _channel(discord.CategoryChannel, 100, 'Général', 1, guild=self.guild),
+            _channel(discord.CategoryChannel, 101, 'Voice', 0, guild=self.guild),
+            _channel(discord.VoiceChannel, 10, 'talk', 0, 100, guild=self.guild),
+            _channel(discord.TextChannel, 11, 'b', 2, 100, guild=self.guild),
+            _channel(discord.TextChannel, 12, 'a', 1, 100, guild=self.guild),
+            _channel(discord.TextChannel, 13, 'lobby', 0, guild=self.guild),
+        ]
+
+
+    def test_sorted(self):
+        categories, page_cnt = ChannelIndex.categories(self.guild)
+        self.assertEqual(page_cnt, 1)
+        self.assertEqual(categories, [(NO_CATEGORY, 'No category'), (101, 'Voice'), (100, 'General')])
+
+        channels, _ = ChannelIndex.channels(self.guild, 100)
+        self.assertEqual([ch_id for ch_id, _ in channels], [12, 11, 10])
+
+        channels, _ = ChannelIndex.channels(self.guild, NO_CATEGORY)
+        self.assertEqual([ch_id for ch_id, _ in channels], [13])
+
+
+    def test_events(self):
+        ChannelIndex.categories(self.guild)
+
+        moved = _channel(discord.TextChannel, 13, 'lobby', 5, 100, guild=self.guild)
+        ChannelIndex.channel_updated(moved)
+        ChannelIndex.channel_deleted(self.guild.channels[3])
+        ChannelIndex.channel_created(_channel(discord.TextChannel, 14, 'new', 3, 101, guild=self.guild))
+
+        self.assertEqual([c for c, _ in ChannelIndex.channels(self.guild, 100)[0]], [12, 13, 10])
+        self.assertEqual(ChannelIndex.channels(self.guild, NO_CATEGORY)[0], [])
+        self.assertEqual([c for c, _ in ChannelIndex.channels(self.guild, 101)[0]], [14])
+
+
+    def test_guild_available(self):
+        ChannelIndex.categories(self.guild)
+
+        # channel created while the gateway was disconnected, no event
+        self.guild.channels.append(_channel(discord.TextChannel, 14, 'missed', 3, guild=self.guild))
+        self.assertEqual([c for c, _ in ChannelIndex.channels(self.guild, NO_CATEGORY)[0]], [13])
+
+        ChannelIndex.guild_available(self.guild.id)
+        self.assertEqual([c for c, _ in ChannelIndex.channels(self.guild, NO_CATEGORY)[0]], [13, 14])
+
+
+    def test_paging(self):
+        self.guild.channels = [_channel(discord.TextChannel, i, f'ch-{i}', i, guild=self.guild) for i in range(60)]
+
+        pages = [ChannelIndex.channels(self.guild, NO_CATEGORY, page) for page in range(4)]
+        self.assertEqual([page_cnt for _, page_cnt in pages], [3, 3, 3, 3])
+        self.assertEqual([len(channels) for channels, _ in pages], [25, 25, 10, 25])
+        self.assertEqual(pages[3], pages[0])
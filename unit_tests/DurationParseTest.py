@@ -0,0 +1,42 @@
+import unittest
+
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+
+import Bot.lib.input_parser as p
+
+
+
+class DurationParseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.utcnow = datetime(year=2021, month=1, day=1)
+
+
+    def test_units(self):
+        delta, _ = p.parse_duration('1h 30m', self.utcnow)
+        self.assertEqual(delta, relativedelta(hours=1, minutes=30))
+
+        delta, _ = p.parse_duration('2 weeks 3 days', self.utcnow)
+        self.assertEqual(delta, relativedelta(days=17))
+
+
+    def test_calendar_units(self):
+        # months keep their calendar length
+        delta, _ = p.parse_duration('1 month', self.utcnow)
+        self.assertEqual(datetime(year=2021, month=2, day=28) + delta, datetime(year=2021, month=3, day=28))
+
+
+    def test_negative(self):
+        delta, _ = p.parse_duration('-1h', self.utcnow)
+        self.assertEqual(delta, relativedelta(hours=-1))
+
+
+    def test_invalid(self):
+        delta, info = p.parse_duration('0m', self.utcnow)
+        self.assertEqual(delta, None)
+        self.assertNotEqual(info, '')
+
+        delta, info = p.parse_duration('tomorrow', self.utcnow)
+        self.assertEqual(delta, None)
+        self.assertNotEqual(info, '')
@@ -0,0 +1,46 @@
+import unittest
+
+from Bot.util.formatting import generate_code_table, paginate_lines
+
+
+class FormattingTest(unittest.TestCase):
+
+    HEADERS = ['No.', 'Next', 'Channel', 'Message']
+
+
+    def _rows(self, n):
+        return [(f'{i}.', '01.Jan 10:00', 'general', 'x'*(i % 26)) for i in range(n)]
+
+
+    def test_small_table(self):
+        table = generate_code_table(['a', 'bb'], [('xyz', 1), ('', 12345)], description='desc')
+
+        self.assertEqual(table, ['```desc\n'
+                                 '|-------------|\n'
+                                 '|  a  |   bb  |\n'
+                                 '|-----|-------|\n'
+                                 '| xyz |     1 |\n'
+                                 '|     | 12345 |\n'
+                                 '|-----|-------|```'])
+
+
+    def test_pagination(self):
+        for limit in [2000, 4096]:
+            table = generate_code_table(FormattingTest.HEADERS, self._rows(5000), limit=limit)
+
+            self.assertGreater(len(table), 1)
+            for chunk in table:
+                self.assertLessEqual(len(chunk), limit)
+                self.assertTrue(chunk.startswith('```') and chunk.endswith('```'))
+
+            # only complete lines are split
+            lines = ''.join(c[3:-3] for c in table).split('\n')
+            self.assertEqual(len(lines), 1 + 3 + 5000 + 1)
+            self.assertEqual(len(set(len(l) for l in lines[1:])), 1)
+
+
+    def test_long_line(self):
+        chunks = paginate_lines(['a'*5000, 'b'], limit=2000)
+
+        self.assertTrue(all(len(c) <= 2000 for c in chunks))
+        self.assertEqual(''.join(c[3:-3] for c in chunks), 'a'*5000 + '\nb')
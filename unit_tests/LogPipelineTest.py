@@ -0,0 +1,85 @@
+import logging
+import unittest
+from unittest import mock
+
+from Bot.lib.LogPipeline import RateLimitFilter, SamplingFilter
+
+
+def _record(msg='hot loop %d', args=(1,), level=logging.DEBUG, name='Remindme.Test', lineno=10):
+    return logging.LogRecord(name, level, 'module.py', lineno, msg, args, None)
+
+
+class RateLimitFilterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('Bot.lib.LogPipeline.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.filter = RateLimitFilter(rate=3, period=60)
+
+
+    def test_rate(self):
+        passed = [self.filter.filter(_record()) for _ in range(5)]
+        self.assertEqual(passed, [True, True, True, False, False])
+
+        # every call site has its own window
+        self.assertTrue(self.filter.filter(_record(lineno=11)))
+
+
+    def test_suppressed_next_window(self):
+        for _ in range(5):
+            self.filter.filter(_record())
+
+        self.now += 30
+        self.assertFalse(self.filter.filter(_record()))
+
+        self.now += 30
+        record = _record()
+        self.assertTrue(self.filter.filter(record))
+        self.assertEqual(record.suppressed, 3)
+        self.assertEqual(record.getMessage(), 'hot loop 1 [3 similar suppressed]')
+
+        # the count is reported once
+        record = _record()
+        self.assertTrue(self.filter.filter(record))
+        self.assertFalse(hasattr(record, 'suppressed'))
+
+
+    def test_warning_bypass(self):
+        for _ in range(3):
+            self.filter.filter(_record())
+
+        self.assertFalse(self.filter.filter(_record(level=logging.DEBUG)))
+        self.assertTrue(self.filter.filter(_record(level=logging.WARNING)))
+        self.assertTrue(self.filter.filter(_record(level=logging.ERROR)))
+
+        # above max_level nothing is counted
+        self.now += 60
+        record = _record()
+        self.filter.filter(record)
+        self.assertEqual(record.suppressed, 1)
+
+
+
+class SamplingFilterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.filter = SamplingFilter({'Remindme.Connector': 0.1, 'Remindme': 0.5})
+
+
+    def test_child_logger(self):
+        self.assertEqual(self.filter._rate('Remindme.Connector.cache'), 0.1)
+        self.assertEqual(self.filter._rate('Remindme.Module'), 0.5)
+        self.assertEqual(self.filter._rate('discord.gateway'), None)
+
+
+    def test_sampling(self):
+        with mock.patch('Bot.lib.LogPipeline.random.random', return_value=0.3):
+            self.assertFalse(self.filter.filter(_record(name='Remindme.Connector.cache')))
+            self.assertTrue(self.filter.filter(_record(name='Remindme.Module')))
+            self.assertTrue(self.filter.filter(_record(name='discord.gateway')))
+
+            # warnings are never sampled
+            self.assertTrue(self.filter.filter(_record(name='Remindme.Connector', level=logging.WARNING)))
@@ -0,0 +1,127 @@
+import io
+import csv
+import unittest
+from unittest.mock import patch
+
+from datetime import datetime
+
+import orjson
+
+from lib.Connector import Connector  # KEEP first, circular import
+from lib.Reminder import Reminder, IntervalReminder
+from lib.ReminderExport import ReminderExport, _ics_escape, _ics_line
+from lib.SQLiteBackend import SQLiteBackend
+
+
+class ReminderExportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.reminder = Reminder({'_id': 'r1', 'msg': 'water the plants\nand the garden', 'title': None,
+                                  'g_id': 1, 'ch_id': 2, 'ch_name': 'general', 'author': 3,
+                                  'at': datetime(2021, 1, 1, 10), 'created_at': datetime(2020, 12, 31, 9)})
+        self.interval = IntervalReminder({'_id': 'i1', 'msg': 'standup', 'title': 'Daily; team, A',
+                                          'g_id': 1, 'ch_id': 2, 'author': 3, 'at': datetime(2021, 1, 4, 8),
+                                          'first_at': datetime(2021, 1, 1, 9),
+                                          'rrules': ['DTSTART:20210101T090000\nRRULE:FREQ=DAILY;BYDAY=MO,TU'],
+                                          'exdates': [datetime(2021, 1, 5, 9)]})
+
+
+    def _export(self, fmt, reminders, **kwargs):
+        fp = io.BytesIO()
+        cnt = ReminderExport.write(fp, reminders, fmt, **kwargs)
+        self.assertEqual(cnt, len(reminders))
+        return fp.getvalue()
+
+
+    def test_json(self):
+        data = orjson.loads(self._export('json', [self.reminder, self.interval], tz_str='Europe/Berlin'))
+
+        self.assertEqual(data[0]['kind'], 'reminder')
+        self.assertEqual(data[0]['at'], '2021-01-01T10:00:00Z')
+        self.assertEqual(data[0]['timezone'], None)
+
+        # interval rules are local to the timezone
+        self.assertEqual(data[1]['timezone'], 'Europe/Berlin')
+        self.assertEqual(data[1]['first_at'], '2021-01-01T09:00:00')
+        self.assertEqual(data[1]['rrules'], ['FREQ=DAILY;BYDAY=MO,TU'])
+        self.assertEqual(data[1]['exdates'], ['2021-01-05T09:00:00'])
+
+        self.assertEqual(orjson.loads(self._export('json', [])), [])
+
+
+    def test_csv(self):
+        rows = list(csv.DictReader(io.StringIO(self._export('csv', [self.reminder, self.interval]).decode('utf-8'))))
+
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['msg'], 'water the plants\nand the garden')
+        self.assertEqual(rows[1]['title'], 'Daily; team, A')
+        self.assertEqual(rows[1]['rrules'], 'FREQ=DAILY;BYDAY=MO,TU')
+
+
+    def test_ics(self):
+        ics = self._export('ics', [self.reminder, self.interval], tz_str='Europe/Berlin').decode('utf-8')
+        lines = ics.split('\r\n')
+
+        self.assertEqual(lines[0], 'BEGIN:VCALENDAR')
+        self.assertIn('DTSTART:20210101T100000Z', lines)
+        # the first line of the message is the summary
+        self.assertIn('SUMMARY:water the plants', lines)
+        self.assertIn('DESCRIPTION:water the plants\\nand the garden', lines)
+
+        self.assertIn('DTSTART;TZID=Europe/Berlin:20210101T090000', lines)
+        self.assertIn('RRULE:FREQ=DAILY;BYDAY=MO,TU', lines)
+        self.assertIn('EXDATE;TZID=Europe/Berlin:20210105T090000', lines)
+        self.assertIn('SUMMARY:Daily\\; team\\, A', lines)
+
+
+    def test_ics_escape(self):
+        self.assertEqual(_ics_escape('a\\b;c,d\r\ne\nf'), 'a\\\\b\\;c\\,d\\ne\\nf')
+
+
+    def test_ics_fold(self):
+        self.assertEqual(_ics_line('SUMMARY:short'), b'SUMMARY:short\r\n')
+
+        # 2 and 4 byte characters must not be split at the fold
+        for char in ['ü', '😀']:
+            line = 'DESCRIPTION:' + char * 100
+            folded = _ics_line(line)
+
+            parts = folded[:-2].split(b'\r\n')
+            self.assertTrue(len(parts) > 1)
+            for i, part in enumerate(parts):
+                self.assertTrue(len(part) <= 75)
+                # the continuation lines start with a space
+                if i > 0:
+                    self.assertEqual(part[:1], b' ')
+                    part = part[1:]
+                part.decode('utf-8')
+
+            self.assertEqual(b''.join(p if i == 0 else p[1:] for i, p in enumerate(parts)).decode('utf-8'), line)
+
+
+
+class IterRemindersTest(unittest.TestCase):
+
+    def setUp(self):
+        Connector.backend = SQLiteBackend(':memory:')
+        for i in range(3):
+            Connector.add_reminder(Reminder({'msg': f'test {i}', 'g_id': 1, 'ch_id': 2, 'author': 3, 'at': datetime(2021, 1, 1)}))
+
+
+    def tearDown(self):
+        Connector.backend.close()
+        Connector.backend = None
+
+
+    def test_instrumented(self):
+        scope = Connector.Scope(is_private=False, guild_id=1, user_id=3)
+
+        with patch('lib.Connector.Analytics') as analytics:
+            reminders = Connector.iter_reminders(scope)
+            # nothing is recorded before the iteration
+            self.assertFalse(analytics.db_operation.called)
+
+            self.assertEqual(ReminderExport.write(io.BytesIO(), reminders, 'json'), 3)
+
+        analytics.db_operation.assert_called_once()
+        analytics.db_documents.assert_called_once_with('iter_reminders', 'reminders,intervals', 3)
@@ -0,0 +1,174 @@
+import io
+import unittest
+from unittest.mock import patch
+
+from datetime import datetime
+
+from lib.Connector import Connector  # KEEP first, circular import
+from lib.Reminder import Reminder, IntervalReminder
+from lib.Clock import Clock
+from lib.ReminderExport import ReminderExport
+from lib.ReminderImport import ReminderImport
+from lib.SQLiteBackend import SQLiteBackend
+
+
+_CALENDAR = '\r\n'.join([
+    'BEGIN:VCALENDAR',
+    'VERSION:2.0',
+    'BEGIN:VEVENT',
+    'DTSTART:20210301T100000Z',
+    'SUMMARY:Dentist\\, bring the card',
+    'DESCRIPTION:Dentist\\, bring the card\\nGrüße an Dr. Müller, sie ist über die Straße gezo',
+    ' gen',
+    'BEGIN:VALARM',
+    'DESCRIPTION:must be ignored',
+    'END:VALARM',
+    'END:VEVENT',
+    'BEGIN:VEVENT',
+    'DTSTART;TZID=Europe/Berlin:20210104T090000',
+    'RRULE:FREQ=WEEKLY;BYDAY=MO,TU',
+    'EXDATE;TZID=Europe/Berlin:20210105T090000',
+    'SUMMARY:Standup',
+    'END:VEVENT',
+    'END:VCALENDAR',
+    ''
+])
+
+
+class ReminderImportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.utcnow = datetime(2021, 1, 1)
+        Clock.install(lambda: self.utcnow)
+        Connector.backend = SQLiteBackend(':memory:')
+
+
+    def tearDown(self):
+        Clock.reset()
+        Connector.backend.close()
+        Connector.backend = None
+
+
+    def _import(self, data: bytes, fmt: str, **kwargs):
+        imp = ReminderImport(1, 2, 'general', 3, tz_str='Europe/Berlin', legacy=False, utcnow=self.utcnow, **kwargs)
+        imp.parse(io.BytesIO(data), fmt)
+        return imp
+
+
+    def _export(self, reminders, fmt: str) -> bytes:
+        fp = io.BytesIO()
+        ReminderExport.write(fp, reminders, fmt, tz_str='Europe/Berlin')
+        return fp.getvalue()
+
+
+    def test_ics(self):
+        imp = self._import(_CALENDAR.encode('utf-8'), 'ics')
+        self.assertEqual(imp.errors, [])
+
+        rem, intvl = imp.reminders
+        self.assertIs(type(rem), Reminder)
+        self.assertEqual(rem.at, datetime(2021, 3, 1, 10))
+        self.assertEqual(rem.title, None)
+        self.assertEqual(rem.msg, 'Dentist, bring the card\nGrüße an Dr. Müller, sie ist über die Straße gezogen')
+
+        self.assertIs(type(intvl), IntervalReminder)
+        self.assertEqual(intvl.first_at, datetime(2021, 1, 4, 9))
+        self.assertEqual(intvl.exdates, [datetime(2021, 1, 5, 9)])
+        self.assertEqual(intvl.msg, 'Standup')
+        # 09:00 Berlin (UTC+1)
+        self.assertEqual(intvl.at, datetime(2021, 1, 4, 8))
+
+
+    def test_round_trip(self):
+        ics_imp = self._import(_CALENDAR.encode('utf-8'), 'ics')
+        csv_imp = self._import(self._export(ics_imp.reminders, 'csv'), 'csv')
+        self.assertEqual(csv_imp.errors, [])
+
+        ics = self._export(ics_imp.reminders, 'ics')
+        self.assertEqual(self._export(csv_imp.reminders, 'ics'), ics)
+
+        # the exported calendar imports into the same reminders
+        self.assertEqual(self._export(self._import(ics, 'ics').reminders, 'ics'), ics)
+
+
+    def test_commit(self):
+        imp = self._import(_CALENDAR.encode('utf-8'), 'ics')
+        self.assertEqual(imp.commit(), 2)
+
+        self.assertEqual(Connector.get_reminder_cnt(), 1)
+        self.assertEqual(Connector.get_interval_cnt(), 1)
+        self.assertTrue(imp.get_report().startswith('2 of 2 entries imported'))
+
+
+    def test_error_report(self):
+        data = '\n'.join([
+            'msg,at,rrules',
+            'valid,2021-02-01T10:00:00Z,',
+            'no date,,',
+            'bad date,2021-13-01,',
+            'in the past,2020-01-01T10:00:00Z,',
+            'out of range,9999-12-31T23:00:00-12:00,',
+            'bad rule,2021-02-01T10:00:00,FREQ=SOMETIMES',
+            ',2021-02-01T10:00:00Z,',
+        ])
+
+        imp = self._import(data.encode('utf-8'), 'csv')
+        self.assertEqual(len(imp.reminders), 1)
+        self.assertEqual([entry for entry, _ in imp.errors], [2, 3, 4, 5, 6, 7])
+
+        imp.commit()
+        report = imp.get_report(max_errors=2).splitlines()
+        self.assertTrue(report[0].startswith('1 of 7 entries imported'))
+        self.assertEqual(report[1], '#2: no date')
+        self.assertTrue(report[2].startswith('#3: invalid date'))
+        self.assertEqual(report[3], '... and 4 more errors')
+
+
+    def test_unexpected_error(self):
+        # errors of the rule expansion are reported per entry
+        with patch.object(IntervalReminder, 'next_trigger', side_effect=RuntimeError('expansion failed')):
+            with self.assertLogs('Remindme.Import', level='WARNING'):
+                imp = self._import(_CALENDAR.encode('utf-8'), 'ics')
+
+        self.assertEqual(len(imp.reminders), 1)
+        self.assertEqual(imp.errors, [(2, 'the entry cannot be imported')])
+
+
+    def test_utc_until(self):
+        # google calendar export, UNTIL is in UTC
+        data = '\r\n'.join([
+            'BEGIN:VCALENDAR',
+            'BEGIN:VEVENT',
+            'DTSTART;TZID=Europe/Berlin:20210105T090000',
+            'RRULE:FREQ=WEEKLY;BYDAY=TU;UNTIL=20210119T080000Z',
+            'SUMMARY:Standup',
+            'END:VEVENT',
+            'END:VCALENDAR',
+        ])
+
+        imp = self._import(data.encode('utf-8'), 'ics')
+        self.assertEqual(imp.errors, [])
+
+        # the rule is local to Europe/Berlin, 08:00 UTC is 09:00 local
+        intvl = imp.reminders[0]
+        self.assertIn('UNTIL=20210119T090000', intvl.rrules[0])
+        self.assertEqual(intvl.next_trigger(datetime(2021, 1, 19, 7), tz_str='Europe/Berlin', legacy=False), datetime(2021, 1, 19, 8))
+        self.assertEqual(intvl.next_trigger(datetime(2021, 1, 19, 9), tz_str='Europe/Berlin', legacy=False), None)
+
+
+    def test_message_length(self):
+        data = '\n'.join([
+            'msg,at',
+            f'{"x" * ReminderImport.MSG_LEN},2021-02-01T10:00:00Z',
+            f'{"x" * (ReminderImport.MSG_LEN+1)},2021-02-01T10:00:00Z',
+        ])
+
+        imp = self._import(data.encode('utf-8'), 'csv')
+        self.assertEqual(len(imp.reminders), 1)
+        self.assertEqual(imp.errors, [(2, f'the message is longer than {ReminderImport.MSG_LEN} characters')])
+
+
+    def test_limit(self):
+        imp = self._import(_CALENDAR.encode('utf-8'), 'ics', max_entries=1)
+        self.assertEqual(len(imp.reminders), 1)
+        self.assertEqual(imp.errors[0][0], 2)
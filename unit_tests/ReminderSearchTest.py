@@ -0,0 +1,105 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from Bot.lib.ReminderSearch import ReminderSearch, tokenize
+from lib.Connector import Connector
+
+
+class ReminderSearchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.reminders = [
+            SimpleNamespace(title=None, msg='water the plants'),
+            SimpleNamespace(title='Dentist', msg='bring the insurance card'),
+            SimpleNamespace(title='Raid', msg='dentist appointment was moved'),
+            SimpleNamespace(title=None, msg='Überweisung an den Zahnarzt'),
+        ]
+        self.index = ReminderSearch(self.reminders)
+
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize('Überweisung, an den Zahnarzt!'), ['uberweisung', 'an', 'den', 'zahnarzt'])
+        self.assertEqual(tokenize(None), [])
+
+
+    def test_ranking(self):
+        # the title weighs more than the message
+        self.assertEqual(self.index.search('dentist'), [self.reminders[1], self.reminders[2]])
+
+
+    def test_all_terms(self):
+        self.assertEqual(self.index.search('dentist moved'), [self.reminders[2]])
+        self.assertEqual(self.index.search('dentist plants'), [])
+        self.assertEqual(self.index.search(''), [])
+
+
+    def test_prefix(self):
+        # the last word may be incomplete
+        self.assertEqual(self.index.search('uberw'), [self.reminders[3]])
+        self.assertEqual(self.index.search('the pla'), [self.reminders[0]])
+        self.assertEqual(self.index.search('pla the'), [])
+
+
+
+class ConnectorSearchTest(unittest.TestCase):
+    # the text index has g_id as prefix, mongo rejects $text queries
+    # without an equality match on it
+
+    def setUp(self):
+        self.db = Connector.db
+        Connector.db = MagicMock()
+        for collection in (Connector.db.reminders, Connector.db.intervals):
+            collection.find.return_value.sort.return_value.limit.return_value = []
+
+        Connector.db.reminders.find.side_effect = self._find
+        self.found = [{'_id': 1, 'g_id': '1', 'author': '3', 'msg': 'dentist', 'score': 1.0},
+                      {'_id': 2, 'g_id': 1, 'author': 3, 'msg': 'dentist appointment', 'score': 2.0}]
+
+
+    def tearDown(self):
+        Connector.db = self.db
+
+
+    def _find(self, query_filter, projection):
+        docs = [d for d in self.found if d['g_id'] == query_filter['g_id']]
+        cursor = MagicMock()
+        cursor.sort.return_value.limit.return_value = docs
+        return cursor
+
+
+    def _filters(self):
+        return [c.args[0] for c in Connector.db.reminders.find.call_args_list + Connector.db.intervals.find.call_args_list]
+
+
+    def test_guild_equality(self):
+        scope = Connector.Scope(is_private=False, guild_id=1, user_id=3)
+        with patch.object(Connector, '_has_guild_scope', return_value=False):
+            hits = Connector.search_reminders(scope, 'dentist')
+
+        # best match first, both schema versions are found
+        self.assertEqual([rem._id for rem in hits], [2, 1])
+
+        filters = self._filters()
+        self.assertEqual(len(filters), 4)
+        for query_filter in filters:
+            self.assertIn(query_filter['g_id'], ['1', 1])
+            self.assertEqual(query_filter['$text'], {'$search': 'dentist'})
+        self.assertEqual(set(type(f['g_id']) for f in filters), {str, int})
+
+
+    def test_moderator(self):
+        scope = Connector.Scope(is_private=False, guild_id=1, user_id=3)
+        with patch.object(Connector, '_has_guild_scope', return_value=True):
+            Connector.search_reminders(scope, 'dentist')
+
+        for query_filter in self._filters():
+            self.assertNotIn('author', query_filter)
+
+
+    def test_private(self):
+        scope = Connector.Scope(is_private=True, user_id=3)
+        with patch.object(Connector, '_has_guild_scope', return_value=False):
+            self.assertEqual(Connector.search_reminders(scope, 'dentist'), [])
+
+        self.assertEqual([f['g_id'] for f in self._filters()], [None, None])
@@ -0,0 +1,100 @@
+import sqlite3
+import unittest
+
+from datetime import datetime, timedelta
+
+from lib.Connector import Connector  # KEEP first, circular import
+from lib.Reminder import Reminder, IntervalReminder
+from lib.SQLiteBackend import SQLiteBackend
+
+
+class _FailingConnection:
+    # sqlite3.Connection attributes are read-only, wrap it to inject an error
+    def __init__(self, conn, fail_on):
+        self._conn = conn
+        self._fail_on = fail_on
+
+    def execute(self, sql, params=()):
+        return self._conn.execute(sql, params)
+
+    def executemany(self, sql, params):
+        if sql.startswith(self._fail_on):
+            raise sqlite3.OperationalError('disk I/O error')
+        return self._conn.executemany(sql, params)
+
+
+class SQLiteBackendTest(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = SQLiteBackend(':memory:')
+        self.utcnow = datetime(year=2021, month=1, day=1)
+
+
+    def tearDown(self):
+        self.backend.close()
+
+
+    def _reminder(self, at, **fields):
+        rem = Reminder({'msg': 'test', 'g_id': 1, 'ch_id': 2, 'author': 3, 'at': at})
+        for name, value in fields.items():
+            setattr(rem, name, value)
+        rem._id = self.backend.add_reminder(rem)
+        return rem
+
+
+    def test_add_get(self):
+        rem = self._reminder(self.utcnow, title='Raid')
+        stored = self.backend.get_reminder_by_id(rem._id)
+
+        self.assertEqual(stored._id, rem._id)
+        self.assertEqual(stored.title, 'Raid')
+        self.assertEqual(stored.at, self.utcnow)
+        self.assertEqual(self.backend.get_reminder_cnt(), 1)
+
+
+    def test_scope(self):
+        self._reminder(self.utcnow)
+        self._reminder(self.utcnow, author=4)
+
+        scope = Connector.Scope(is_private=False, guild_id=1, user_id=3)
+        self.assertEqual(len(self.backend.get_scoped_reminders(scope)), 1)
+
+        scope = Connector.Scope(is_private=True, user_id=3)
+        self.assertEqual(self.backend.get_scoped_reminders(scope), [])
+
+
+    def test_pop_elapsed(self):
+        due = self._reminder(self.utcnow)
+        later = self._reminder(self.utcnow + timedelta(hours=1))
+
+        popped = self.backend.pop_elapsed_reminders((self.utcnow + timedelta(minutes=1)).timestamp())
+        self.assertEqual([r._id for r in popped], [due._id])
+
+        self.assertIsNone(self.backend.get_reminder_by_id(due._id))
+        self.assertIsNotNone(self.backend.get_reminder_by_id(later._id))
+        # the delivered copy stays snoozable
+        self.assertEqual(self.backend.get_snoozable_by_id(due._id)._id, due._id)
+
+
+    def test_pop_elapsed_rollback(self):
+        due = self._reminder(self.utcnow)
+        timestamp = (self.utcnow + timedelta(minutes=1)).timestamp()
+
+        conn = self.backend._conn
+        self.backend._conn = _FailingConnection(conn, 'DELETE FROM reminders')
+        with self.assertRaises(sqlite3.OperationalError):
+            self.backend.pop_elapsed_reminders(timestamp)
+        self.backend._conn = conn
+
+        # neither the copy nor the delete are kept, and no transaction is left open
+        self.assertFalse(conn.in_transaction)
+        self.assertIsNone(self.backend.get_snoozable_by_id(due._id))
+        self.assertEqual([r._id for r in self.backend.pop_elapsed_reminders(timestamp)], [due._id])
+
+
+    def test_orphaned_intervals(self):
+        intvl = IntervalReminder({'msg': 'test', 'g_id': 1, 'ch_id': 2, 'author': 3, 'at': None})
+        self.backend.add_interval(intvl)
+
+        self.assertEqual(self.backend.delete_orphaned_intervals(), 1)
+        self.assertEqual(self.backend.get_interval_cnt(), 0)
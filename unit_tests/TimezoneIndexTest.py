@@ -0,0 +1,48 @@
+import unittest
+
+from Bot.lib.TimezoneIndex import TimezoneIndex
+
+
+class TimezoneIndexTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        TimezoneIndex.load()
+
+
+    def test_limit(self):
+        self.assertTrue(len(TimezoneIndex.search('a')) <= TimezoneIndex.MAX_RESULTS)
+        self.assertTrue(len(TimezoneIndex.search('')) <= TimezoneIndex.MAX_RESULTS)
+
+
+    def test_case_insensitive(self):
+        self.assertEqual(TimezoneIndex.search('europe/berlin')[0], 'Europe/Berlin')
+
+
+    def test_city(self):
+        self.assertEqual(TimezoneIndex.search('new york')[0], 'America/New_York')
+        self.assertTrue('Asia/Kolkata' in TimezoneIndex.search('kolk'))
+
+
+    def test_prefix_first(self):
+        # zones starting with the input are ranked before word/substring matches
+        res = TimezoneIndex.search('euro')
+        self.assertTrue(res[0].startswith('Europe/'))
+
+
+    def test_country(self):
+        self.assertTrue('Europe/Berlin' in TimezoneIndex.search('de'))
+        self.assertTrue('Europe/Berlin' in TimezoneIndex.search('germany'))
+
+
+    def test_abbreviation(self):
+        self.assertTrue('Europe/Berlin' in TimezoneIndex.search('cet'))
+        self.assertTrue('PST8PDT' in TimezoneIndex.search('pst'))
+
+
+    def test_fuzzy(self):
+        self.assertTrue('Europe/Berlin' in TimezoneIndex.search('berln'))
+
+
+    def test_no_match(self):
+        self.assertEqual(TimezoneIndex.search('xxxxxxxxxx'), [])
@@ -0,0 +1,61 @@
+import unittest
+from unittest import mock
+
+from datetime import datetime, timedelta
+from dateutil import tz
+
+from Bot.lib.Timezones import Timezones, _TransitionTable
+
+
+class TimezonesTest(unittest.TestCase):
+    # the transition tables must give the same result as dateutil,
+    # including the skipped/repeated hour of the daylight saving transitions
+
+    ZONES = ['Europe/Berlin', 'America/New_York', 'Australia/Lord_Howe', 'Asia/Kolkata', 'UTC', 'UTC+3']
+
+
+    def _dateutil_local(self, utc, tz_str):
+        return utc.replace(tzinfo=tz.UTC).astimezone(tz.gettz(tz_str)).replace(tzinfo=None)
+
+    def _dateutil_utc(self, local, tz_str):
+        return local.replace(tzinfo=tz.gettz(tz_str)).astimezone(tz.UTC).replace(tzinfo=None)
+
+
+    def test_year(self):
+        for tz_str in TimezonesTest.ZONES:
+            d = datetime(year=2021, month=1, day=1)
+            while d.year == 2021:
+                self.assertEqual(Timezones.to_local(d, tz_str), self._dateutil_local(d, tz_str))
+                self.assertEqual(Timezones.to_utc(d, tz_str), self._dateutil_utc(d, tz_str))
+                d += timedelta(hours=1)
+
+
+    def test_daylight_saving(self):
+        # 02:30 doesn't exist on the 28th of march, exists twice on the 31st of october
+        for local in [datetime(2021, 3, 28, 2, 30), datetime(2021, 10, 31, 2, 30)]:
+            self.assertEqual(Timezones.to_utc(local, 'Europe/Berlin'), self._dateutil_utc(local, 'Europe/Berlin'))
+
+        self.assertEqual(Timezones.to_utc(datetime(2021, 10, 31, 2, 30), 'Europe/Berlin'), datetime(2021, 10, 31, 0, 30))
+
+
+    def test_fallback(self):
+        # dateutil without the tzfile internals uses the public conversion
+        Timezones._tables.pop('Asia/Tokyo', None)
+        with mock.patch.object(_TransitionTable, '__init__', side_effect=AttributeError):
+            with self.assertLogs('Remindme.Timezones', level='WARNING'):
+                utc = Timezones.to_utc(datetime(2021, 1, 1, 9), 'Asia/Tokyo')
+        self.assertEqual(utc, datetime(2021, 1, 1, 0))
+        self.assertEqual(Timezones.to_local(utc, 'Asia/Tokyo'), datetime(2021, 1, 1, 9))
+        Timezones._tables.pop('Asia/Tokyo', None)
+
+
+    def test_interned(self):
+        self.assertIs(Timezones.get('Europe/Berlin'), Timezones.get('Europe/Berlin'))
+        self.assertIsNone(Timezones.get('Not/AZone'))
+
+
+    def test_country(self):
+        self.assertEqual(Timezones.country_of('Europe/Berlin'), 'DE')
+        self.assertEqual(Timezones.country_of('UTC'), 'UNK')
+        self.assertTrue(Timezones.is_common('Europe/Berlin'))
+        self.assertTrue('Europe/Berlin' in Timezones.zones())